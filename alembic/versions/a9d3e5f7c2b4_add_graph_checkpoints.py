@@ -0,0 +1,56 @@
+"""add_graph_checkpoints
+
+Revision ID: a9d3e5f7c2b4
+Revises: f2c8a6d4b1e9
+Create Date: 2026-04-02 10:14:27.518903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9d3e5f7c2b4'
+down_revision: Union[str, None] = 'f2c8a6d4b1e9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('graph_checkpoints',
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('thread_id', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('checkpoint_ns', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('checkpoint_id', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('parent_checkpoint_id', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('checkpoint_type', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('checkpoint', sa.LargeBinary(), nullable=False),
+    sa.Column('metadata_type', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('checkpoint_metadata', sa.LargeBinary(), nullable=False),
+    sa.PrimaryKeyConstraint('thread_id', 'checkpoint_ns', 'checkpoint_id')
+    )
+    op.create_index('ix_graph_checkpoints_created_at', 'graph_checkpoints', ['created_at'], unique=False)
+    op.create_table('graph_checkpoint_writes',
+    sa.Column('thread_id', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('checkpoint_ns', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('checkpoint_id', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('task_id', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('idx', sa.Integer(), nullable=False),
+    sa.Column('channel', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('value_type', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('value', sa.LargeBinary(), nullable=False),
+    sa.Column('task_path', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.PrimaryKeyConstraint('thread_id', 'checkpoint_ns', 'checkpoint_id', 'task_id', 'idx')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('graph_checkpoint_writes')
+    op.drop_index('ix_graph_checkpoints_created_at', table_name='graph_checkpoints')
+    op.drop_table('graph_checkpoints')
@@ -0,0 +1,54 @@
+"""add_dense_vector_index
+
+Revision ID: b3f1c9d2e4a7
+Revises: 0473a98e38ea
+Create Date: 2026-03-02 10:14:22.418305
+
+"""
+from typing import Sequence, Union
+import math
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+from app.config import get_settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f1c9d2e4a7'
+down_revision: Union[str, None] = '0473a98e38ea'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    settings = get_settings()
+
+    if settings.VECTOR_INDEX_TYPE == "ivfflat":
+        # IVFFlat trains its lists on the rows that already exist, so size them from the current corpus
+        row_count = op.get_bind().execute(sa.text("SELECT count(*) FROM document_vectors;")).scalar()
+        lists = max(1, row_count // 1000) if row_count <= 1_000_000 else int(math.sqrt(row_count))
+
+        with op.get_context().autocommit_block():
+            op.execute(f"""
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS document_vectors_dense_ivfflat_idx
+                ON document_vectors
+                USING ivfflat (dense_embedding vector_cosine_ops)
+                WITH (lists = {lists});
+            """)
+    else:
+        with op.get_context().autocommit_block():
+            op.execute("""
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS document_vectors_dense_hnsw_idx
+                ON document_vectors
+                USING hnsw (dense_embedding vector_cosine_ops)
+                WITH (m = 16, ef_construction = 64);
+            """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS document_vectors_dense_hnsw_idx;")
+    op.execute("DROP INDEX IF EXISTS document_vectors_dense_ivfflat_idx;")
@@ -0,0 +1,31 @@
+"""add_thread_summary
+
+Revision ID: b4e8f1a6d3c7
+Revises: a9d3e5f7c2b4
+Create Date: 2026-04-09 09:41:53.206174
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4e8f1a6d3c7'
+down_revision: Union[str, None] = 'a9d3e5f7c2b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('threads', sa.Column('summary', sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+    op.add_column('threads', sa.Column('summarized_until', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('threads', 'summarized_until')
+    op.drop_column('threads', 'summary')
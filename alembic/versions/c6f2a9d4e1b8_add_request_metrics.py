@@ -0,0 +1,48 @@
+"""add_request_metrics
+
+Revision ID: c6f2a9d4e1b8
+Revises: b4e8f1a6d3c7
+Create Date: 2026-04-16 10:12:37.418205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6f2a9d4e1b8'
+down_revision: Union[str, None] = 'b4e8f1a6d3c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('request_metrics',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('chat_id', sa.Integer(), nullable=True),
+    sa.Column('channel', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('intent', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('total_ms', sa.Float(), nullable=False),
+    sa.Column('ttft_ms', sa.Float(), nullable=True),
+    sa.Column('stages', sa.JSON(), nullable=False),
+    sa.Column('prompt_tokens', sa.Integer(), nullable=False),
+    sa.Column('completion_tokens', sa.Integer(), nullable=False),
+    sa.Column('cost_usd', sa.Float(), nullable=False),
+    sa.Column('model', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.ForeignKeyConstraint(['chat_id'], ['chats.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_request_metrics_created_at'), 'request_metrics', ['created_at'], unique=False)
+    op.create_index(op.f('ix_request_metrics_chat_id'), 'request_metrics', ['chat_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_request_metrics_chat_id'), table_name='request_metrics')
+    op.drop_index(op.f('ix_request_metrics_created_at'), table_name='request_metrics')
+    op.drop_table('request_metrics')
@@ -0,0 +1,38 @@
+"""add_corpus_version
+
+Revision ID: c8d4e2a1f9b6
+Revises: b3f1c9d2e4a7
+Create Date: 2026-03-05 14:32:08.117942
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8d4e2a1f9b6'
+down_revision: Union[str, None] = 'b3f1c9d2e4a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('corpus_version',
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute(
+        "INSERT INTO corpus_version (id, version, created_at, updated_at) VALUES (1, 0, now(), now());"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('corpus_version')
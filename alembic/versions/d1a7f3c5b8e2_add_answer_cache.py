@@ -0,0 +1,50 @@
+"""add_answer_cache
+
+Revision ID: d1a7f3c5b8e2
+Revises: c8d4e2a1f9b6
+Create Date: 2026-03-09 11:05:41.602317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+import pgvector
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd1a7f3c5b8e2'
+down_revision: Union[str, None] = 'c8d4e2a1f9b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('answer_cache',
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('question', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('question_embedding', pgvector.sqlalchemy.vector.VECTOR(dim=384), nullable=False),
+    sa.Column('answer', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('context', sa.JSON(), nullable=False),
+    sa.Column('corpus_version', sa.Integer(), nullable=False),
+    sa.Column('hit_count', sa.Integer(), nullable=False),
+    sa.Column('last_hit_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_answer_cache_corpus_version'), 'answer_cache', ['corpus_version'], unique=False)
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS answer_cache_question_hnsw_idx
+        ON answer_cache
+        USING hnsw (question_embedding vector_cosine_ops);
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS answer_cache_question_hnsw_idx;")
+    op.drop_index(op.f('ix_answer_cache_corpus_version'), table_name='answer_cache')
+    op.drop_table('answer_cache')
@@ -0,0 +1,80 @@
+"""halfvec_dense_embedding
+
+Revision ID: e7b2c4d9a1f3
+Revises: d1a7f3c5b8e2
+Create Date: 2026-03-12 09:41:18.230954
+
+"""
+from typing import Sequence, Union
+import math
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+from app.config import get_settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b2c4d9a1f3'
+down_revision: Union[str, None] = 'd1a7f3c5b8e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _create_dense_index(opclass: str) -> None:
+    settings = get_settings()
+
+    if settings.VECTOR_INDEX_TYPE == "ivfflat":
+        row_count = op.get_bind().execute(sa.text("SELECT count(*) FROM document_vectors;")).scalar()
+        lists = max(1, row_count // 1000) if row_count <= 1_000_000 else int(math.sqrt(row_count))
+
+        op.execute(f"""
+            CREATE INDEX IF NOT EXISTS document_vectors_dense_ivfflat_idx
+            ON document_vectors
+            USING ivfflat (dense_embedding {opclass})
+            WITH (lists = {lists});
+        """)
+    else:
+        op.execute(f"""
+            CREATE INDEX IF NOT EXISTS document_vectors_dense_hnsw_idx
+            ON document_vectors
+            USING hnsw (dense_embedding {opclass})
+            WITH (m = 16, ef_construction = 64);
+        """)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The column type changes under the indexes, so they are rebuilt with the halfvec operator class.
+    # Rows are converted in place, float32 -> float16 keeps cosine rankings practically unchanged.
+    op.execute("DROP INDEX IF EXISTS document_vectors_dense_hnsw_idx;")
+    op.execute("DROP INDEX IF EXISTS document_vectors_dense_ivfflat_idx;")
+    op.execute("""
+        ALTER TABLE document_vectors
+        ALTER COLUMN dense_embedding TYPE halfvec(384)
+        USING dense_embedding::halfvec(384);
+    """)
+    _create_dense_index("halfvec_cosine_ops")
+
+    # Coarse index for SEMANTIC_SEARCH_MODE=binary: Hamming shortlist on 1 bit per dimension,
+    # the shortlist is then rescored with the exact cosine distance
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS document_vectors_dense_binary_hnsw_idx
+        ON document_vectors
+        USING hnsw ((binary_quantize(dense_embedding)::bit(384)) bit_hamming_ops)
+        WITH (m = 16, ef_construction = 64);
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS document_vectors_dense_binary_hnsw_idx;")
+    op.execute("DROP INDEX IF EXISTS document_vectors_dense_hnsw_idx;")
+    op.execute("DROP INDEX IF EXISTS document_vectors_dense_ivfflat_idx;")
+    op.execute("""
+        ALTER TABLE document_vectors
+        ALTER COLUMN dense_embedding TYPE vector(384)
+        USING dense_embedding::vector(384);
+    """)
+    _create_dense_index("vector_cosine_ops")
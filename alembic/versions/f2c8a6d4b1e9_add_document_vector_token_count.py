@@ -0,0 +1,55 @@
+"""add_document_vector_token_count
+
+Revision ID: f2c8a6d4b1e9
+Revises: e7b2c4d9a1f3
+Create Date: 2026-03-16 14:22:07.583190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+import tiktoken
+
+from app.config import get_settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c8a6d4b1e9'
+down_revision: Union[str, None] = 'e7b2c4d9a1f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_ROWS = 1000
+
+settings = get_settings()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('document_vectors', sa.Column('token_count', sa.Integer(), nullable=True))
+
+    # Existing chunks are counted once here, new ones are counted at ingest. Same encoding and
+    # special token handling as count_tokens, inlined so the migration doesn't load app.agents
+    encoding = tiktoken.get_encoding(settings.CONTEXT_TOKEN_ENCODING)
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.text("SELECT id, content FROM document_vectors WHERE id > :last_id ORDER BY id LIMIT :limit"),
+            {"last_id": last_id, "limit": BACKFILL_BATCH_ROWS},
+        ).all()
+        if not rows:
+            break
+
+        connection.execute(
+            sa.text("UPDATE document_vectors SET token_count = :token_count WHERE id = :id"),
+            [{"id": row.id, "token_count": len(encoding.encode(row.content, disallowed_special=()))} for row in rows],
+        )
+        last_id = rows[-1].id
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('document_vectors', 'token_count')
@@ -0,0 +1,137 @@
+import argparse
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+from sqlmodel import select
+
+from app.agents.context import count_tokens
+from app.agents.database import BulkVectorLoader, VectorDatabase
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models.document import Document, DocumentVector
+
+settings = get_settings()
+
+SAMPLE_TEXT = (
+    "Dapodik adalah sistem pendataan pendidikan yang dikelola oleh Kementerian. "
+    "Operator sekolah melakukan sinkronisasi data peserta didik, pendidik dan sarana prasarana. "
+    "BPMP Provinsi Papua mendampingi satuan pendidikan dalam penjaminan mutu dan rapor pendidikan. "
+)
+
+
+def load_chunks(n_chunks: int, source: str = None):
+    """Chunks from converted markdown files when given, otherwise synthetic ones of similar size."""
+    if source:
+        vector_db = VectorDatabase(model_name=settings.EMBEDDING_MODEL)
+        texts = [path.read_text(encoding="utf-8") for path in sorted(Path(source).glob("*.md"))]
+        chunks = [chunk for text in texts for chunk in vector_db.text_splitter.split_text(text)]
+        if chunks:
+            return (chunks * (n_chunks // len(chunks) + 1))[:n_chunks]
+
+    return [f"{i}. " + SAMPLE_TEXT * 6 for i in range(n_chunks)]
+
+
+def synthetic_embed(texts, rng):
+    embeddings = rng.standard_normal((len(texts), 384)).astype(np.float32)
+    return list(embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True))
+
+
+def run_legacy(session, vector_db, document_id, chunks, args, rng):
+    """The previous ingestion loop: a Document lookup, a single-text embed and an ORM add per chunk, a flush every 4."""
+    embed_s = 0.0
+    for i in range(0, len(chunks), 4):
+        for content in chunks[i:i + 4]:
+            document = session.exec(select(Document).where(Document.id == document_id)).one_or_none()
+
+            start = time.perf_counter()
+            embedding = synthetic_embed([content], rng)[0] if args.synthetic else vector_db.embed_document(content)
+            embed_s += time.perf_counter() - start
+
+            session.add(DocumentVector(
+                dense_embedding=embedding,
+                content=content,
+                token_count=count_tokens(content),
+                document_id=document_id,
+            ))
+            session.add(document)
+        session.flush()
+    return embed_s
+
+
+def run_batched(session, vector_db, document_id, chunks, args, rng):
+    start = time.perf_counter()
+    embeddings = synthetic_embed(chunks, rng) if args.synthetic else vector_db.embed_documents(chunks)
+    embed_s = time.perf_counter() - start
+
+    vector_db.insert_vectors(session, document_id, chunks, embeddings)
+    session.flush()
+    return embed_s
+
+
+def run_copy(session, vector_db, document_id, chunks, args, rng, defer_indexes=False):
+    start = time.perf_counter()
+    embeddings = synthetic_embed(chunks, rng) if args.synthetic else vector_db.embed_documents(chunks)
+    embed_s = time.perf_counter() - start
+
+    with BulkVectorLoader(session, defer_indexes=defer_indexes) as loader:
+        loader.copy_vectors(document_id, chunks, embeddings)
+    print(f"{'':14s} {loader.stats()}")
+    return embed_s
+
+
+def run_copy_deferred(session, vector_db, document_id, chunks, args, rng):
+    """COPY with the BM25/ANN indexes dropped and rebuilt, the rebuild counts towards the write time."""
+    return run_copy(session, vector_db, document_id, chunks, args, rng, defer_indexes=True)
+
+
+MODES = {
+    "legacy": run_legacy,
+    "batched": run_batched,
+    "copy": run_copy,
+    "copy_deferred": run_copy_deferred,
+}
+
+
+def bench(mode: str, chunks, args):
+    rng = np.random.default_rng(args.seed)
+    vector_db = VectorDatabase(model_name=settings.EMBEDDING_MODEL, batch_size=args.batch_size)
+    if not args.synthetic:
+        vector_db._init_embed_model()
+        # Model load and ONNX warm-up are not part of the throughput
+        vector_db.embed_documents(chunks[:min(len(chunks), args.batch_size)])
+
+    with SessionLocal() as session:
+        # Everything happens in one transaction that is rolled back, the live corpus is never touched
+        document = Document(filename=f"bench-{uuid.uuid4()}", filepath=f"bench-{uuid.uuid4()}", status="pending")
+        session.add(document)
+        session.flush()
+
+        start = time.perf_counter()
+        embed_s = MODES[mode](session, vector_db, document.id, chunks, args, rng)
+        total_s = time.perf_counter() - start
+
+        session.rollback()
+
+    write_s = total_s - embed_s
+    print(
+        f"{mode:14s} {len(chunks)} chunks in {total_s:.2f}s: {len(chunks) / total_s:.1f} chunks/s "
+        f"(embedding {embed_s:.2f}s, {len(chunks) / max(embed_s, 1e-9):.1f} chunks/s; "
+        f"lookups + insert {write_s:.2f}s, {len(chunks) / max(write_s, 1e-9):.1f} chunks/s)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingestion throughput (chunks/s) of the old per-chunk loop, batched INSERT, and binary COPY with or without deferred indexes.")
+    parser.add_argument("--chunks", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=settings.EMBED_BATCH_SIZE)
+    parser.add_argument("--source", default=None, help="directory of converted .md files to chunk, e.g. converted_docs")
+    parser.add_argument("--synthetic", action="store_true", help="random embeddings instead of the model, to measure the database side alone")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    chunks = load_chunks(args.chunks, args.source)
+    for mode in args.modes.split(","):
+        bench(mode.strip(), chunks, args)
@@ -0,0 +1,93 @@
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+from fastembed import TextEmbedding
+
+from app.agents.models import get_llm
+from app.agents.retriever.query import normalize_query
+from app.agents.router import IntentRouter, INTENT_LABELS, llm_classify, parse_exemplars
+from app.config import get_settings
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def report(name: str, predictions, expected, timings, fallbacks=None):
+    accuracy = np.mean([prediction == label for prediction, label in zip(predictions, expected)])
+    recalls = []
+    for label in INTENT_LABELS:
+        rows = [prediction for prediction, expected_label in zip(predictions, expected) if expected_label == label]
+        recalls.append(f"{np.mean([prediction == label for prediction in rows]):.2f}" if rows else "-")
+
+    fallback_rate = f"{np.mean(fallbacks):.2f}" if fallbacks is not None else "-"
+    print(
+        f"{name:>8} {accuracy:>9.3f} " + " ".join(f"{recall:>7}" for recall in recalls)
+        + f" {fallback_rate:>9} {np.percentile(timings, 50):>8.2f} {np.percentile(timings, 95):>8.2f}"
+    )
+
+
+def run(args):
+    settings = get_settings()
+
+    eval_path = Path(args.eval)
+    dataset = parse_exemplars(eval_path.read_text(encoding="utf-8"), eval_path.name)
+    questions = [text for text, _ in dataset]
+    expected = [label for _, label in dataset]
+
+    embed_model = TextEmbedding(model_name=settings.EMBEDDING_MODEL, cache_dir="/models/huggingface")
+    router = IntentRouter(
+        embed_model,
+        mode="local",
+        exemplars_path=args.exemplars or settings.INTENT_EXEMPLARS_PATH,
+        min_similarity=args.min_similarity,
+        min_margin=args.min_margin,
+    )
+    llm = get_llm("openrouter", settings.OPEN_ROUTER_MODEL) if args.llm else None
+
+    local_predictions, local_timings, confident = [], [], []
+    llm_predictions, llm_timings = [], []
+    hybrid_predictions, hybrid_timings = [], []
+
+    for question in questions:
+        # Embedding is included here, in the app it is shared with the answer cache and the retriever
+        prediction, elapsed = timed(lambda: router.classify(list(embed_model.query_embed(normalize_query(question)))[0]))
+        local_predictions.append(prediction.label)
+        local_timings.append(elapsed)
+        confident.append(router.is_confident(prediction))
+
+        if llm is not None:
+            label, llm_elapsed = timed(lambda: llm_classify(llm, question))
+            llm_predictions.append(label)
+            llm_timings.append(llm_elapsed)
+
+            hybrid_predictions.append(prediction.label if confident[-1] else label)
+            hybrid_timings.append(elapsed if confident[-1] else elapsed + llm_elapsed)
+
+    print(f"{len(questions)} questions, min_similarity={args.min_similarity}, min_margin={args.min_margin}")
+    print(f"{'router':>8} {'accuracy':>9} " + " ".join(f"{label:>7}" for label in INTENT_LABELS) + f" {'fallback':>9} {'p50 ms':>8} {'p95 ms':>8}")
+
+    report("local", local_predictions, expected, local_timings)
+    if llm is not None:
+        report("llm", llm_predictions, expected, llm_timings)
+        report("hybrid", hybrid_predictions, expected, hybrid_timings, fallbacks=[not c for c in confident])
+    else:
+        print(f"local router would fall back to the LLM for {np.mean([not c for c in confident]):.2%} of questions (run with --llm to measure it)")
+
+
+if __name__ == "__main__":
+    settings = get_settings()
+
+    parser = argparse.ArgumentParser(description="Compare accuracy and latency of the local intent router against the LLM router.")
+    parser.add_argument("--eval", required=True, help="labeled questions, JSON lines {text, label} or CSV text,label")
+    parser.add_argument("--exemplars", help="exemplars file for the local router, defaults to INTENT_EXEMPLARS_PATH")
+    parser.add_argument("--min-similarity", type=float, default=settings.INTENT_ROUTER_MIN_SIMILARITY)
+    parser.add_argument("--min-margin", type=float, default=settings.INTENT_ROUTER_MIN_MARGIN)
+    parser.add_argument("--llm", action="store_true", help="also run the LLM router (calls OPEN_ROUTER_MODEL for every question)")
+    args = parser.parse_args()
+
+    run(args)
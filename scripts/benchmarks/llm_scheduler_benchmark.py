@@ -0,0 +1,68 @@
+import argparse
+import asyncio
+import json
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from app.agents.models import LLMBusyError, get_llm_scheduler
+from app.agents.prompts import GROQ_SYSTEM_TEMPLATE, GROQ_USER_TEMPLATE
+
+
+async def run(args):
+    scheduler = get_llm_scheduler()
+    latencies = defaultdict(list)
+    outcomes = defaultdict(lambda: defaultdict(int))
+
+    async def ask(channel: str, user: str, i: int):
+        llm = scheduler.for_caller(channel, user)
+        # Every question is unique so the LLM cache never answers
+        question = f"Pertanyaan uji {channel} {user} nomor {i} tentang Dapodik"
+        start = time.perf_counter()
+        try:
+            await llm.ainvoke(
+                message=question,
+                system_template=GROQ_SYSTEM_TEMPLATE,
+                user_template=GROQ_USER_TEMPLATE,
+                prompt_format={"history": "-", "context": "-", "question": question},
+            )
+        except LLMBusyError:
+            outcomes[channel]["busy"] += 1
+            return
+        except Exception as e:
+            outcomes[channel][type(e).__name__] += 1
+            return
+        outcomes[channel]["ok"] += 1
+        latencies[channel].append((time.perf_counter() - start) * 1000)
+
+    # One WhatsApp number floods the queue first, web users arrive right behind it
+    burst = [ask("whatsapp", "burst", i) for i in range(args.burst)]
+    web = [ask("web", str(user), i) for user in range(args.web_users) for i in range(args.web_requests)]
+
+    start = time.perf_counter()
+    burst_tasks = [asyncio.create_task(coro) for coro in burst]
+    await asyncio.sleep(0.05)
+    await asyncio.gather(*burst_tasks, *web)
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.burst + args.web_users * args.web_requests} requests in {elapsed:.1f}s")
+    for channel, values in latencies.items():
+        print(f"{channel}: {dict(outcomes[channel])}, p50 {np.percentile(values, 50):.1f} ms, p95 {np.percentile(values, 95):.1f} ms")
+    for channel, counts in outcomes.items():
+        if channel not in latencies:
+            print(f"{channel}: {dict(counts)}")
+    print(json.dumps(scheduler.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Drive the LLM scheduler with a WhatsApp burst plus web users and report per-channel latency. "
+                    "Point OPEN_ROUTER_BASE_URL / GROQ_BASE_URL at scripts/fake_llm_server.py (--max-rps for 429s) to run it offline."
+    )
+    parser.add_argument("--burst", type=int, default=200, help="requests from a single WhatsApp number")
+    parser.add_argument("--web-users", type=int, default=10)
+    parser.add_argument("--web-requests", type=int, default=2, help="requests per web user")
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
@@ -0,0 +1,99 @@
+import argparse
+import asyncio
+import itertools
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+
+DEFAULT_QUESTIONS = [
+    "Bagaimana cara login aplikasi Dapodik versi terbaru?",
+    "Apa saja program BPMP Papua tahun ini?",
+    "Bagaimana cara mengajukan layanan di ULT BPMP?",
+    "Apa syarat sertifikasi guru?",
+    "Halo Kasbi, gimana kabarnya!",
+    "Resep rendang yang enak gimana?",
+]
+
+
+async def run_level(client: httpx.AsyncClient, url: str, questions, tokens, concurrency: int, total: int):
+    """total requests spread over concurrency workers, each sending its next question as soon as the previous one returns.
+
+    Worker n sends as tokens[n % len(tokens)]. Two requests of one user opening
+    a new thread at the same time race for the same thread id, so give at
+    least as many tokens as clients.
+    """
+    counter = itertools.count()
+    latencies, errors = [], []
+
+    async def worker(token: str):
+        headers = {"Authorization": f"Bearer {token}"}
+        while (i := next(counter)) < total:
+            start = time.perf_counter()
+            try:
+                response = await client.post(url, json={"query": questions[i % len(questions)]}, headers=headers)
+                # Read the whole body, for /query/stream this waits for the done event
+                await response.aread()
+                if response.status_code >= 400:
+                    errors.append(str(response.status_code))
+                    continue
+            except httpx.HTTPError as e:
+                errors.append(type(e).__name__)
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(tokens[n % len(tokens)]) for n in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return latencies, errors, elapsed
+
+
+async def run(args):
+    questions = DEFAULT_QUESTIONS
+    if args.questions:
+        questions = [line.strip() for line in Path(args.questions).read_text(encoding="utf-8").splitlines() if line.strip()]
+
+    tokens = list(args.token or [])
+    if args.token_file:
+        tokens += [line.strip() for line in Path(args.token_file).read_text(encoding="utf-8").splitlines() if line.strip()]
+    if not tokens:
+        raise SystemExit("give at least one --token or a --token-file")
+
+    url = args.base_url.rstrip("/") + ("/v1/chatbot/query/stream" if args.stream else "/v1/chatbot/query")
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    print(f"{url}, {args.requests} requests per level")
+    print(f"{'clients':>8} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'errors':>7}")
+
+    for concurrency in levels:
+        async with httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+            timeout=args.timeout,
+        ) as client:
+            latencies, errors, elapsed = await run_level(client, url, questions, tokens, concurrency, args.requests)
+
+        p50 = f"{np.percentile(latencies, 50):>9.1f}" if latencies else f"{'-':>9}"
+        p95 = f"{np.percentile(latencies, 95):>9.1f}" if latencies else f"{'-':>9}"
+        print(f"{concurrency:>8} {len(latencies) / elapsed:>8.2f} {p50} {p95} {len(errors):>7}")
+        if errors:
+            print(f"{'':>8} {', '.join(f'{error} x{errors.count(error)}' for error in sorted(set(errors)))}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Load test the chatbot endpoint at increasing concurrency to find where throughput stops growing and latency or errors climb."
+    )
+    parser.add_argument("--base-url", default="http://localhost:8000/api")
+    parser.add_argument("--token", action="append", help="access token of a test user, every request opens a new thread for it, repeatable")
+    parser.add_argument("--token-file", help="file with one access token per line, one test user per concurrent client")
+    parser.add_argument("--concurrency", default="1,10,50,100,200,400", help="comma separated concurrent client counts")
+    parser.add_argument("--requests", type=int, default=400, help="requests per concurrency level")
+    parser.add_argument("--questions", help="file with one question per line, defaults to a small built-in mix")
+    parser.add_argument("--stream", action="store_true", help="hit /query/stream instead of /query")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
@@ -0,0 +1,75 @@
+import argparse
+import time
+
+import numpy as np
+
+from app.agents.retriever.mmr import mmr
+
+
+def legacy_mmr(embed_query, doc_embeddings, k: int, lambda_mult: float = 0.5):
+    """The per-pair loop BaseRetriever._mmr used before the matrix version."""
+    selected = []
+    candidates = list(range(len(doc_embeddings)))
+
+    embed_query = embed_query / np.linalg.norm(embed_query)
+
+    while len(selected) < k and candidates:
+        mmr_scores = []
+
+        for i in candidates:
+            doc_emb = doc_embeddings[i]
+            doc_emb = doc_emb / np.linalg.norm(doc_emb)
+
+            sim_to_query = np.dot(doc_emb, embed_query)
+
+            sim_to_selected = 0
+            if selected:
+                sim_to_selected = max(
+                    np.dot(doc_emb, doc_embeddings[j] / np.linalg.norm(doc_embeddings[j]))
+                    for j in selected
+                )
+
+            score = lambda_mult * sim_to_query - (1 - lambda_mult) * sim_to_selected
+            mmr_scores.append((i, score))
+
+        best = max(mmr_scores, key=lambda x: x[1])[0]
+        selected.append(best)
+        candidates.remove(best)
+
+    return selected
+
+
+def time_ms(fn, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+
+def run(ks, dim: int, repeats: int, seed: int):
+    rng = np.random.default_rng(seed)
+
+    print(f"{'k':>5} {'k_fetch':>8} {'legacy ms':>12} {'matrix ms':>12} {'speedup':>9} {'same':>6}")
+    for k in ks:
+        k_fetch = int(k * 1.5)
+        embed_query = rng.standard_normal(dim).astype(np.float32)
+        doc_embeddings = rng.standard_normal((k_fetch, dim)).astype(np.float32)
+
+        same = legacy_mmr(embed_query, doc_embeddings, k) == mmr(embed_query, doc_embeddings, k)
+        legacy = time_ms(lambda: legacy_mmr(embed_query, doc_embeddings, k), repeats)
+        matrix = time_ms(lambda: mmr(embed_query, doc_embeddings, k), repeats)
+
+        print(f"{k:>5} {k_fetch:>8} {legacy:>12.2f} {matrix:>12.2f} {legacy / matrix:>8.1f}x {str(same):>6}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the legacy and matrix-based MMR implementations.")
+    parser.add_argument("--k", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    run(args.k, args.dim, args.repeats, args.seed)
@@ -0,0 +1,54 @@
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+
+from app.agents.models import get_chat_llm
+from app.agents.prompts import GROQ_SYSTEM_TEMPLATE, GROQ_USER_TEMPLATE
+
+
+async def run(args):
+    llm = get_chat_llm()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies, errors = [], 0
+
+    async def ask(i: int):
+        nonlocal errors
+        # Every question is unique so the LLM cache never answers
+        question = f"Pertanyaan uji nomor {i} tentang Dapodik"
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await llm.ainvoke(
+                    message=question,
+                    system_template=GROQ_SYSTEM_TEMPLATE,
+                    user_template=GROQ_USER_TEMPLATE,
+                    prompt_format={"history": "-", "context": "-", "question": question},
+                )
+            except Exception:
+                errors += 1
+                return
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(ask(i) for i in range(args.requests)))
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.requests} requests in {elapsed:.1f}s, {errors} errors")
+    if latencies:
+        print(f"p50 {np.percentile(latencies, 50):.1f} ms, p95 {np.percentile(latencies, 95):.1f} ms, p99 {np.percentile(latencies, 99):.1f} ms")
+    print(json.dumps(llm.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Drive the provider router and report end-to-end latency and per-provider stats. "
+                    "Point OPEN_ROUTER_BASE_URL / GROQ_BASE_URL at scripts/fake_llm_server.py to run it offline."
+    )
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
@@ -0,0 +1,167 @@
+import argparse
+import time
+
+import numpy as np
+from sqlalchemy import text
+
+from app.database import engine
+from app.agents.retriever.retriever import SEMANTIC_ANN_CANDIDATES, SEMANTIC_BINARY_CANDIDATES
+
+
+# Each mode gets a scratch copy of the embeddings, so the live document_vectors indexes are never touched
+MODES = {
+    "vector": {
+        "column": "vector(384)",
+        "indexes": ["USING hnsw (dense_embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)"],
+        "query": SEMANTIC_ANN_CANDIDATES.replace("halfvec(384)", "vector(384)"),
+    },
+    "halfvec": {
+        "column": "halfvec(384)",
+        "indexes": ["USING hnsw (dense_embedding halfvec_cosine_ops) WITH (m = 16, ef_construction = 64)"],
+        "query": SEMANTIC_ANN_CANDIDATES,
+    },
+    "binary": {
+        "column": "halfvec(384)",
+        "indexes": ["USING hnsw ((binary_quantize(dense_embedding)::bit(384)) bit_hamming_ops) WITH (m = 16, ef_construction = 64)"],
+        "query": SEMANTIC_BINARY_CANDIDATES,
+    },
+}
+
+
+def to_text(embedding) -> str:
+    return "[" + ",".join(str(float(value)) for value in embedding) + "]"
+
+
+def load_corpus(limit: int, synthetic: int, dim: int, rng):
+    if synthetic:
+        ids = np.arange(1, synthetic + 1)
+        embeddings = rng.standard_normal((synthetic, dim)).astype(np.float32)
+    else:
+        with engine.connect() as connection:
+            rows = connection.execute(
+                text("SELECT id, dense_embedding::text FROM document_vectors ORDER BY id LIMIT :limit"),
+                {"limit": limit},
+            ).all()
+        ids = np.array([row[0] for row in rows])
+        embeddings = np.array([np.fromstring(row[1][1:-1], sep=",") for row in rows], dtype=np.float32)
+
+    return ids, embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+def make_queries(embeddings, n_queries: int, noise: float, rng):
+    # Perturbed corpus rows behave like paraphrased questions landing near a known chunk
+    picks = rng.choice(len(embeddings), size=min(n_queries, len(embeddings)), replace=False)
+    queries = embeddings[picks] + noise * rng.standard_normal((len(picks), embeddings.shape[1])).astype(np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def exact_top_k(ids, embeddings, queries, k: int):
+    scores = queries @ embeddings.T
+    top = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+    return [set(ids[row].tolist()) for row in top]
+
+
+def build_table(connection, mode: str, ids, embeddings, batch_size: int):
+    table = f"bench_dense_{mode}"
+    config = MODES[mode]
+
+    connection.execute(text(f"DROP TABLE IF EXISTS {table}"))
+    connection.execute(text(f"CREATE TABLE {table} (id integer PRIMARY KEY, dense_embedding {config['column']} NOT NULL)"))
+
+    insert = text(f"INSERT INTO {table} (id, dense_embedding) VALUES (:id, CAST(:embedding AS {config['column']}))")
+    for start in range(0, len(ids), batch_size):
+        connection.execute(insert, [
+            {"id": int(document_id), "embedding": to_text(embedding)}
+            for document_id, embedding in zip(ids[start:start + batch_size], embeddings[start:start + batch_size])
+        ])
+
+    index_names = []
+    for i, index in enumerate(config["indexes"]):
+        index_name = f"{table}_idx_{i}"
+        connection.execute(text(f"CREATE INDEX {index_name} ON {table} {index}"))
+        index_names.append(index_name)
+
+    connection.execute(text(f"ANALYZE {table}"))
+
+    index_bytes = sum(
+        connection.execute(text("SELECT pg_relation_size(CAST(:name AS regclass))"), {"name": name}).scalar()
+        for name in index_names
+    )
+    table_bytes = connection.execute(text("SELECT pg_table_size(CAST(:name AS regclass))"), {"name": table}).scalar()
+
+    return table_bytes, index_bytes
+
+
+def run_queries(connection, mode: str, queries, k: int, ef_search: int, shortlist_factor: int):
+    config = MODES[mode]
+    statement = text(config["query"].replace("FROM document_vectors", f"FROM bench_dense_{mode}"))
+    k_index = k * shortlist_factor if mode == "binary" else k
+
+    results = []
+    timings = []
+    for query in queries:
+        with connection.begin():
+            connection.execute(
+                text("SELECT set_config('hnsw.ef_search', :ef_search, true)"),
+                {"ef_search": str(max(ef_search, k_index))},
+            )
+
+            start = time.perf_counter()
+            rows = connection.execute(statement, {
+                "embedding": to_text(query),
+                "k_semantic": k,
+                "k_shortlist": k * shortlist_factor,
+            }).all()
+            timings.append((time.perf_counter() - start) * 1000)
+
+        results.append({row[0] for row in rows})
+
+    return results, timings
+
+
+def run(args):
+    rng = np.random.default_rng(args.seed)
+
+    ids, embeddings = load_corpus(args.limit, args.synthetic, 384, rng)
+    queries = make_queries(embeddings, args.queries, args.noise, rng)
+    truth = exact_top_k(ids, embeddings, queries, args.k)
+
+    print(f"{len(ids)} rows, {len(queries)} queries, k={args.k}, ef_search={args.ef_search}, shortlist x{args.shortlist_factor}")
+    print(f"{'mode':>8} {'recall@k':>9} {'table MB':>9} {'index MB':>9} {'p50 ms':>8} {'p95 ms':>8}")
+
+    for mode in args.modes:
+        with engine.connect() as connection:
+            with connection.begin():
+                table_bytes, index_bytes = build_table(connection, mode, ids, embeddings, args.batch_size)
+
+            # One untimed pass so every mode is measured with a warm cache
+            run_queries(connection, mode, queries[:10], args.k, args.ef_search, args.shortlist_factor)
+            results, timings = run_queries(connection, mode, queries, args.k, args.ef_search, args.shortlist_factor)
+
+            if not args.keep:
+                with connection.begin():
+                    connection.execute(text(f"DROP TABLE IF EXISTS bench_dense_{mode}"))
+
+        recall = np.mean([len(result & expected) / len(expected) for result, expected in zip(results, truth)])
+        print(
+            f"{mode:>8} {recall:>9.3f} {table_bytes / 2**20:>9.1f} {index_bytes / 2**20:>9.1f} "
+            f"{np.percentile(timings, 50):>8.2f} {np.percentile(timings, 95):>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare recall, index size and latency of the dense embedding storage modes.")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--limit", type=int, default=100_000, help="rows copied from document_vectors")
+    parser.add_argument("--synthetic", type=int, default=0, help="use this many random vectors instead of document_vectors")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.05)
+    parser.add_argument("--k", type=int, default=75)
+    parser.add_argument("--ef-search", type=int, default=100)
+    parser.add_argument("--shortlist-factor", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep", action="store_true", help="keep the bench_dense_* tables")
+    args = parser.parse_args()
+
+    run(args)
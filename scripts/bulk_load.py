@@ -0,0 +1,96 @@
+import argparse
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+from sqlmodel import Session, select
+
+from app.agents.database import VectorDatabase
+from app.config import get_settings
+from app.database import engine
+from app.models import Document
+
+settings = get_settings()
+
+DOCS_DIR = Path("src/docs")
+SUFFIXES = {".pdf", ".docx", ".pptx", ".xlsx", ".html", ".md", ".txt"}
+
+
+def collect_files(paths):
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(p for p in path.rglob("*") if p.is_file() and p.suffix.lower() in SUFFIXES))
+        elif path.is_file():
+            files.append(path)
+    return files
+
+
+def register_documents(session: Session, files):
+    """Copy the files next to uploaded ones and create their pending Document rows, skipping known filenames."""
+    known = set(session.exec(select(Document.filename).where(Document.filename.in_([f.name for f in files]))).all())
+    DOCS_DIR.mkdir(parents=True, exist_ok=True)
+
+    documents = []
+    for file in files:
+        if file.name in known:
+            print(f"skipping {file.name}: a document with the same file name already exists")
+            continue
+        known.add(file.name)
+
+        file_path = DOCS_DIR / f"{uuid.uuid4()}_{file.name}"
+        shutil.copyfile(file, file_path)
+        document = Document(filename=file.name, filepath=str(file_path), status="pending")
+        session.add(document)
+        documents.append(document)
+
+    session.commit()
+    return documents
+
+
+def run(args):
+    files = collect_files(args.paths)
+    print(f"{len(files)} files found")
+
+    with Session(engine) as session:
+        documents = register_documents(session, files)
+        batches = [documents[i:i + args.batch_docs] for i in range(0, len(documents), args.batch_docs)]
+
+        if args.enqueue:
+            from app.tasks import bulk_embed_documents
+
+            for batch in batches:
+                bulk_embed_documents.delay([d.id for d in batch], [d.filepath for d in batch], defer_indexes=args.defer_indexes)
+            print(f"enqueued {len(documents)} documents in {len(batches)} tasks")
+            return
+
+        vector_db = VectorDatabase(model_name=settings.EMBEDDING_MODEL)
+        for batch in batches:
+            start = time.perf_counter()
+            chunks = vector_db.insert_documents(
+                session,
+                [Path(d.filepath) for d in batch],
+                document_ids=[d.id for d in batch],
+                defer_indexes=args.defer_indexes,
+            )
+            elapsed = time.perf_counter() - start
+            print(f"{len(batch)} documents, {len(chunks)} chunks in {elapsed:.1f}s ({len(chunks) / max(elapsed, 1e-9):.1f} chunks/s)")
+
+        vector_db.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Offline bootstrap: register and load many documents into document_vectors with binary COPY, "
+                    "rebuilding the BM25 and vector indexes once per batch. Searches block on document_vectors "
+                    "while a batch loads, run it in a maintenance window or pass --keep-indexes."
+    )
+    parser.add_argument("paths", nargs="+", help="files or directories to load")
+    parser.add_argument("--batch-docs", type=int, default=50, help="documents per transaction (and per index rebuild)")
+    parser.add_argument("--keep-indexes", dest="defer_indexes", action="store_false",
+                        help="keep the indexes in place and maintain them row by row, for loading into a live corpus")
+    parser.add_argument("--enqueue", action="store_true", help="hand the batches to the Celery worker instead of loading here")
+    args = parser.parse_args()
+
+    run(args)
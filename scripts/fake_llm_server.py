@@ -0,0 +1,125 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections import deque
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+def build_app(args) -> FastAPI:
+    """OpenAI-compatible /chat/completions with configurable latency and failures.
+
+    Serves both /v1/chat/completions (OPEN_ROUTER_BASE_URL=http://host:port/v1)
+    and /openai/v1/chat/completions (GROQ_BASE_URL=http://host:port).
+    """
+    app = FastAPI(title=f"fake llm {args.name}")
+    counts = {"requests": 0, "errors": 0, "slow": 0, "rate_limited": 0}
+    recent = deque()
+
+    async def delay() -> None:
+        latency = args.latency_ms + random.uniform(0, args.jitter_ms)
+        if random.random() < args.slow_rate:
+            counts["slow"] += 1
+            latency += args.slow_ms
+        await asyncio.sleep(latency / 1000)
+
+    def answer_text(body: dict) -> str:
+        question = next((message["content"] for message in reversed(body.get("messages", [])) if message.get("role") == "user"), "")
+        return f"[{args.name}] {' '.join(question.split()[:args.words])}"
+
+    def over_rate_limit() -> bool:
+        if not args.max_rps:
+            return False
+        now = time.monotonic()
+        while recent and recent[0] <= now - 1:
+            recent.popleft()
+        if len(recent) >= args.max_rps:
+            return True
+        recent.append(now)
+        return False
+
+    async def completions(request: Request):
+        body = await request.json()
+        counts["requests"] += 1
+
+        if over_rate_limit():
+            counts["rate_limited"] += 1
+            return JSONResponse(
+                status_code=429,
+                content={"error": {"message": f"{args.name} rate limit exceeded", "type": "rate_limit_error"}},
+                headers={"Retry-After": str(args.retry_after)},
+            )
+
+        await delay()
+
+        if random.random() < args.error_rate:
+            counts["errors"] += 1
+            return JSONResponse(status_code=503, content={"error": {"message": f"{args.name} is overloaded", "type": "server_error"}})
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        model = body.get("model", args.name)
+        text = answer_text(body)
+        # Words stand in for tokens, close enough to exercise usage accounting
+        prompt_tokens = sum(len(str(message.get("content", "")).split()) for message in body.get("messages", []))
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(text.split()), "total_tokens": prompt_tokens + len(text.split())}
+
+        if not body.get("stream"):
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage,
+            }
+
+        async def events():
+            for i, word in enumerate(text.split(" ")):
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"role": "assistant", "content": word if i == 0 else " " + word}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(args.token_ms / 1000)
+
+            # Groq reports stream usage on the last chunk under x_groq
+            done = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "x_groq": {"usage": usage}}
+            yield f"data: {json.dumps(done)}\n\n"
+            if (body.get("stream_options") or {}).get("include_usage"):
+                yield f"data: {json.dumps({'id': completion_id, 'object': 'chat.completion.chunk', 'created': created, 'model': model, 'choices': [], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    app.add_api_route("/v1/chat/completions", completions, methods=["POST"])
+    app.add_api_route("/openai/v1/chat/completions", completions, methods=["POST"])
+    app.add_api_route("/stats", lambda: counts, methods=["GET"])
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible LLM provider for exercising hedging and failover locally.")
+    parser.add_argument("--name", default="fake")
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="base latency of every completion")
+    parser.add_argument("--jitter-ms", type=float, default=100.0, help="uniform random latency added on top")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="share of requests that get --slow-ms extra (tail latency)")
+    parser.add_argument("--slow-ms", type=float, default=3000.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 503")
+    parser.add_argument("--max-rps", type=int, default=0, help="answer 429 with Retry-After above this many requests per second, 0 for no limit")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with a 429")
+    parser.add_argument("--token-ms", type=float, default=20.0, help="delay between streamed tokens")
+    parser.add_argument("--words", type=int, default=12, help="answer echoes this many words of the question")
+    args = parser.parse_args()
+
+    uvicorn.run(build_app(args), host="0.0.0.0", port=args.port, log_level="warning")
@@ -2,6 +2,7 @@ from app.config import get_settings
 from fastembed import TextEmbedding
 from fastembed.rerank.cross_encoder import TextCrossEncoder
 from docling.document_converter import DocumentConverter
+from app.agents.context import get_encoding
 
 import os
 from pathlib import Path
@@ -12,4 +13,5 @@ if __name__ == "__main__":
 
     TextEmbedding(model_name=settings.EMBEDDING_MODEL, cache_dir="/models/huggingface")
     TextCrossEncoder(model_name=settings.RERANK_MODEL, cache_dir="/models/huggingface")
-    DocumentConverter()
\ No newline at end of file
+    DocumentConverter()
+    get_encoding(settings.CONTEXT_TOKEN_ENCODING)
\ No newline at end of file
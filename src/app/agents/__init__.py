@@ -1,6 +1,7 @@
 from app.agents.graph import GraphBuilder, build_chatbot_graph
 from app.agents.retriever import BaseRetriever
 from app.agents.database import VectorDatabase
+from app.agents.router import IntentRouter
 
 from app.config import get_settings
 
@@ -17,6 +18,7 @@ class ChatbotResources(TypedDict):
     chatbot_graph: Any
     retriever: BaseRetriever
     vector_db: VectorDatabase
+    intent_router: IntentRouter
 
 
 def resources_exist(chatbot_resources: ChatbotResources, attrs: List[str]):
@@ -28,16 +30,17 @@ def resources_exist(chatbot_resources: ChatbotResources, attrs: List[str]):
     return all(exist)
 
 def instansiate_chatbot_resources(app: FastAPI) -> ChatbotResources:
-    if not resources_exist(app.state.chatbot_resources, ["chatbot_graph", "retriever", "vector_db"]):
+    if not resources_exist(app.state.chatbot_resources, ["chatbot_graph", "retriever", "vector_db", "intent_router"]):
         with _chatbot_lock:
-            if not resources_exist(app.state.chatbot_resources, ["chatbot_graph", "retriever", "vector_db"]):
+            if not resources_exist(app.state.chatbot_resources, ["chatbot_graph", "retriever", "vector_db", "intent_router"]):
 
                 print("initiating resources")
-                chatbot_graph, retriever, vector_db = build_chatbot_graph()
+                chatbot_graph, retriever, vector_db, intent_router = build_chatbot_graph()
 
                 app.state.chatbot_resources["chatbot_graph"] = chatbot_graph
                 app.state.chatbot_resources["retriever"] = retriever
                 app.state.chatbot_resources["vector_db"] = vector_db
+                app.state.chatbot_resources["intent_router"] = intent_router
 
     return app.state.chatbot_resources
 
@@ -0,0 +1,2 @@
+from app.agents.cache.cache import LRUCache, RedisCache, TieredCache, get_redis, get_async_redis
+from app.agents.cache.answer_cache import SemanticAnswerCache
@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlmodel import Session, select, update, delete, func
+
+from app.models.answer_cache import AnswerCache
+from app.agents.metrics import register_metrics
+from app.config import get_settings
+
+import time
+
+settings = get_settings()
+
+
+class SemanticAnswerCache():
+    """Answers keyed by question embedding, reused for near-duplicate questions of the same corpus version.
+
+    Older corpus versions are dropped by bump_corpus_version. Within a
+    version, entries expire after ttl seconds and at most max_entries are
+    kept, both enforced by a prune that runs at most every prune_interval.
+    """
+
+    def __init__(
+            self,
+            threshold: float = settings.ANSWER_CACHE_THRESHOLD,
+            ttl: int = settings.ANSWER_CACHE_TTL,
+            max_entries: int = settings.ANSWER_CACHE_MAX_ENTRIES,
+            prune_interval: float = 300.0,
+    ):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.prune_interval = prune_interval
+        self.hits = 0
+        self.misses = 0
+        self.pruned = 0
+        self._last_prune = 0.0
+
+        register_metrics("answer_cache", self.stats)
+
+    def lookup(self, session: Session, question_embedding, corpus_version: int) -> Optional[AnswerCache]:
+        distance = AnswerCache.question_embedding.cosine_distance(question_embedding)
+
+        statement = select(AnswerCache, distance.label("distance")).where(AnswerCache.corpus_version == corpus_version)
+        if self.ttl > 0:
+            statement = statement.where(AnswerCache.created_at >= datetime.now(timezone.utc) - timedelta(seconds=self.ttl))
+
+        row = session.exec(
+            statement
+            .order_by(distance)
+            .limit(1)
+        ).first()
+
+        if row is None or 1 - row.distance < self.threshold:
+            self.misses += 1
+            return None
+
+        entry = row.AnswerCache
+        session.exec(
+            update(AnswerCache)
+            .where(AnswerCache.id == entry.id)
+            .values(hit_count=AnswerCache.hit_count + 1, last_hit_at=datetime.now(timezone.utc))
+        )
+        session.commit()
+
+        self.hits += 1
+        return entry
+
+    def store(
+            self,
+            session: Session,
+            question: str,
+            question_embedding,
+            answer: str,
+            context: List[str],
+            corpus_version: int,
+    ) -> None:
+        session.add(AnswerCache(
+            question=question,
+            question_embedding=question_embedding,
+            answer=answer,
+            context=context,
+            corpus_version=corpus_version,
+        ))
+        session.commit()
+
+        if time.monotonic() - self._last_prune >= self.prune_interval:
+            self._last_prune = time.monotonic()
+            self.prune(session)
+
+    def prune(self, session: Session) -> int:
+        """Delete expired entries and, past max_entries, the least recently used ones."""
+        deleted = 0
+        if self.ttl > 0:
+            cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.ttl)
+            deleted += session.exec(delete(AnswerCache).where(AnswerCache.created_at < cutoff)).rowcount
+
+        if self.max_entries > 0:
+            overflow = (
+                select(AnswerCache.id)
+                .order_by(func.coalesce(AnswerCache.last_hit_at, AnswerCache.created_at).desc())
+                .offset(self.max_entries)
+            )
+            deleted += session.exec(delete(AnswerCache).where(AnswerCache.id.in_(overflow))).rowcount
+
+        session.commit()
+        self.pruned += deleted
+        return deleted
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "pruned": self.pruned,
+        }
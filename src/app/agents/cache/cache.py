@@ -0,0 +1,266 @@
+from collections import OrderedDict
+from functools import lru_cache
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import asyncio
+import logging
+import sys
+import time
+
+import redis
+import redis.asyncio
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache
+def get_redis() -> Optional[redis.Redis]:
+    """Shared Redis client, None when REDIS_URL is not configured."""
+    url = get_settings().REDIS_URL
+    if not url:
+        return None
+    return redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+
+@lru_cache
+def get_async_redis() -> Optional[redis.asyncio.Redis]:
+    """Shared asyncio Redis client for code on the event loop, None when REDIS_URL is not configured.
+
+    Its connections belong to the loop that first uses them, which is the
+    app's single loop per worker process.
+    """
+    url = get_settings().REDIS_URL
+    if not url:
+        return None
+    return redis.asyncio.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+
+class LRUCache():
+    """Thread-safe in-process LRU cache with an optional per-entry TTL."""
+
+    def __init__(
+            self,
+            max_entries: int,
+            ttl: Optional[float] = None,
+            sizeof: Callable[[Any], int] = sys.getsizeof,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.sizeof = sizeof
+
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value, size = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        size = self.sizeof(value)
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (expires_at, value, size)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key: Hashable) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class RedisCache():
+    """Shared cache tier in Redis. Errors are logged and treated as misses so Redis stays optional.
+
+    aget/aset go through async_client when one is given, otherwise the
+    blocking client runs in a thread, so the event loop never waits on Redis.
+    """
+
+    def __init__(
+            self,
+            client: redis.Redis,
+            prefix: str,
+            ttl: Optional[int] = None,
+            dumps: Callable[[Any], bytes] = lambda value: value,
+            loads: Callable[[bytes], Any] = lambda value: value,
+            async_client: Optional[redis.asyncio.Redis] = None,
+    ):
+        self.client = client
+        self.async_client = async_client
+        self.prefix = prefix
+        self.ttl = ttl
+        self.dumps = dumps
+        self.loads = loads
+
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            raw = self.client.get(self.prefix + key)
+        except redis.RedisError as e:
+            self.errors += 1
+            logger.warning("Redis cache get failed: %s", e)
+            return None
+
+        return self._loaded(raw)
+
+    async def aget(self, key: str) -> Optional[Any]:
+        if self.async_client is None:
+            return await asyncio.to_thread(self.get, key)
+
+        try:
+            raw = await self.async_client.get(self.prefix + key)
+        except redis.RedisError as e:
+            self.errors += 1
+            logger.warning("Redis cache get failed: %s", e)
+            return None
+
+        return self._loaded(raw)
+
+    def _loaded(self, raw: Optional[bytes]) -> Optional[Any]:
+        if raw is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return self.loads(raw)
+
+    def set(self, key: str, value: Any) -> None:
+        try:
+            self.client.set(self.prefix + key, self.dumps(value), ex=self.ttl)
+        except redis.RedisError as e:
+            self.errors += 1
+            logger.warning("Redis cache set failed: %s", e)
+
+    async def aset(self, key: str, value: Any) -> None:
+        if self.async_client is None:
+            return await asyncio.to_thread(self.set, key, value)
+
+        try:
+            await self.async_client.set(self.prefix + key, self.dumps(value), ex=self.ttl)
+        except redis.RedisError as e:
+            self.errors += 1
+            logger.warning("Redis cache set failed: %s", e)
+
+    def delete(self, key: str) -> None:
+        try:
+            self.client.delete(self.prefix + key)
+        except redis.RedisError as e:
+            self.errors += 1
+            logger.warning("Redis cache delete failed: %s", e)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class TieredCache():
+    """In-process LRU in front of an optional Redis tier, Redis hits are promoted into the local tier."""
+
+    def __init__(
+            self,
+            local: LRUCache,
+            remote: Optional[RedisCache] = None,
+    ):
+        self.local = local
+        self.remote = remote
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.local.get(key)
+        if value is not None or self.remote is None:
+            return value
+
+        value = self.remote.get(key)
+        if value is not None:
+            self.local.set(key, value)
+        return value
+
+    async def aget(self, key: str) -> Optional[Any]:
+        value = self.local.get(key)
+        if value is not None or self.remote is None:
+            return value
+
+        value = await self.remote.aget(key)
+        if value is not None:
+            self.local.set(key, value)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self.local.set(key, value)
+        if self.remote is not None:
+            self.remote.set(key, value)
+
+    async def aset(self, key: str, value: Any) -> None:
+        self.local.set(key, value)
+        if self.remote is not None:
+            await self.remote.aset(key, value)
+
+    def delete(self, key: str) -> None:
+        self.local.delete(key)
+        if self.remote is not None:
+            self.remote.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "local": self.local.stats(),
+            "remote": self.remote.stats() if self.remote is not None else None,
+        }
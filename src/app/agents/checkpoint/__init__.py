@@ -0,0 +1 @@
+from app.agents.checkpoint.checkpointer import PostgresCheckpointSaver, get_conninfo
@@ -0,0 +1,503 @@
+from collections.abc import AsyncIterator, Iterator, Sequence
+from threading import Event, Lock, Thread
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from psycopg_pool import ConnectionPool
+from sqlalchemy.engine import make_url
+
+from app.agents.metrics import register_metrics
+from app.config import get_settings
+
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+INSERT_CHECKPOINT = """
+    INSERT INTO graph_checkpoints (
+        thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id,
+        checkpoint_type, checkpoint, metadata_type, checkpoint_metadata, created_at, updated_at
+    )
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, now(), now())
+    ON CONFLICT (thread_id, checkpoint_ns, checkpoint_id) DO UPDATE
+    SET checkpoint_type = EXCLUDED.checkpoint_type,
+        checkpoint = EXCLUDED.checkpoint,
+        metadata_type = EXCLUDED.metadata_type,
+        checkpoint_metadata = EXCLUDED.checkpoint_metadata,
+        updated_at = now()
+"""
+
+INSERT_WRITE = """
+    INSERT INTO graph_checkpoint_writes (
+        thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, value_type, value, task_path
+    )
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON CONFLICT (thread_id, checkpoint_ns, checkpoint_id, task_id, idx) DO UPDATE
+    SET channel = EXCLUDED.channel,
+        value_type = EXCLUDED.value_type,
+        value = EXCLUDED.value,
+        task_path = EXCLUDED.task_path
+"""
+
+SELECT_CHECKPOINT = """
+    SELECT checkpoint_id, parent_checkpoint_id, checkpoint_type, checkpoint, metadata_type, checkpoint_metadata
+    FROM graph_checkpoints
+    WHERE thread_id = %s AND checkpoint_ns = %s AND (%s::text IS NULL OR checkpoint_id = %s)
+    ORDER BY checkpoint_id DESC
+    LIMIT 1
+"""
+
+SELECT_CHECKPOINTS = """
+    SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id,
+           checkpoint_type, checkpoint, metadata_type, checkpoint_metadata
+    FROM graph_checkpoints
+    WHERE (%(thread_id)s::text IS NULL OR thread_id = %(thread_id)s)
+      AND (%(checkpoint_ns)s::text IS NULL OR checkpoint_ns = %(checkpoint_ns)s)
+      AND (%(checkpoint_id)s::text IS NULL OR checkpoint_id = %(checkpoint_id)s)
+      AND (%(before)s::text IS NULL OR checkpoint_id < %(before)s)
+    ORDER BY checkpoint_id DESC
+"""
+
+SELECT_WRITES = """
+    SELECT task_id, idx, channel, value_type, value
+    FROM graph_checkpoint_writes
+    WHERE thread_id = %s AND checkpoint_ns = %s AND checkpoint_id = %s
+    ORDER BY task_id, idx
+"""
+
+# Keeps the newest keep_per_thread checkpoints of every flushed thread, checkpoint ids sort by time
+PRUNE_THREADS = """
+    DELETE FROM graph_checkpoints c
+    USING (
+        SELECT thread_id, checkpoint_ns, checkpoint_id,
+               row_number() OVER (PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC) AS position
+        FROM graph_checkpoints
+        WHERE thread_id = ANY(%s)
+    ) ranked
+    WHERE c.thread_id = ranked.thread_id
+      AND c.checkpoint_ns = ranked.checkpoint_ns
+      AND c.checkpoint_id = ranked.checkpoint_id
+      AND ranked.position > %s
+"""
+
+PRUNE_EXPIRED = """
+    DELETE FROM graph_checkpoints
+    WHERE created_at < now() - make_interval(days => %s)
+"""
+
+# Writes whose checkpoint was pruned above, limited to the given threads unless None
+PRUNE_ORPHAN_WRITES = """
+    DELETE FROM graph_checkpoint_writes w
+    WHERE (%(thread_ids)s::text[] IS NULL OR w.thread_id = ANY(%(thread_ids)s))
+      AND NOT EXISTS (
+        SELECT 1 FROM graph_checkpoints c
+        WHERE c.thread_id = w.thread_id
+          AND c.checkpoint_ns = w.checkpoint_ns
+          AND c.checkpoint_id = w.checkpoint_id
+    )
+"""
+
+
+def get_conninfo(database_url: str = settings.DATABASE_URL) -> str:
+    """libpq connection string for DATABASE_URL, which carries the SQLAlchemy driver suffix."""
+    return make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+class PostgresCheckpointSaver(BaseCheckpointSaver):
+    """LangGraph checkpointer on its own small psycopg pool, shared by every uvicorn worker.
+
+    put() and put_writes() only touch an in-process buffer that a
+    background thread flushes every flush_interval seconds in one
+    transaction. A thread that checkpoints several times between flushes
+    (every graph run does at least three) is written once with its
+    newest checkpoint. Reads look at the buffer before the database, so
+    a worker always sees its own unflushed checkpoints. Rows only leave
+    the buffer once the transaction that wrote them has committed.
+
+    Coalesced checkpoints are never written, so a checkpoint's parent is
+    the newest one already persisted for its thread, not the step it
+    directly followed. Pruning then cuts that chain after
+    keep_per_thread checkpoints: history and time travel only reach back
+    that far.
+
+    After each flush only the newest keep_per_thread checkpoints of the
+    flushed threads are kept, and threads idle for retention_days are
+    dropped, so neither the process nor the tables grow with traffic.
+    """
+
+    def __init__(
+            self,
+            conninfo: Optional[str] = None,
+            pool_size: int = settings.CHECKPOINT_POOL_SIZE,
+            flush_interval: float = settings.CHECKPOINT_FLUSH_INTERVAL,
+            keep_per_thread: int = settings.CHECKPOINT_KEEP_PER_THREAD,
+            retention_days: int = settings.CHECKPOINT_RETENTION_DAYS,
+            prune_interval: float = 3600.0,
+            serde=None,
+    ):
+        super().__init__(serde=serde)
+        self.flush_interval = flush_interval
+        self.keep_per_thread = keep_per_thread
+        self.retention_days = retention_days
+        self.prune_interval = prune_interval
+
+        # Dedicated pool so checkpoint flushes never wait behind request queries on the app engine
+        self.pool = ConnectionPool(
+            conninfo or get_conninfo(),
+            min_size=1,
+            max_size=pool_size,
+            kwargs={"autocommit": True},
+            name="checkpointer",
+            open=True,
+        )
+
+        self._lock = Lock()
+        # (thread_id, checkpoint_ns) -> newest unflushed checkpoint row
+        self._checkpoints: Dict[Tuple[str, str], tuple] = {}
+        # (thread_id, checkpoint_ns, checkpoint_id) -> {(task_id, idx): write row}
+        self._writes: Dict[Tuple[str, str, str], Dict[Tuple[str, int], tuple]] = {}
+
+        self.counts = {"puts": 0, "coalesced": 0, "flushes": 0, "flushed_checkpoints": 0, "flushed_writes": 0, "pruned": 0, "flush_errors": 0}
+        self.last_flush_ms = 0.0
+        self._last_expired_prune = 0.0
+
+        self._stop = Event()
+        self._flusher = Thread(target=self._flush_loop, name="checkpoint-flusher", daemon=True)
+        self._flusher.start()
+
+        register_metrics("checkpointer", self.stats)
+
+    # --- buffer ---
+
+    def put(
+            self,
+            config: RunnableConfig,
+            checkpoint: Checkpoint,
+            metadata: CheckpointMetadata,
+            new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+
+        # The whole state goes into one row, there are only a few small channels per thread
+        checkpoint_type, checkpoint_bytes = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_bytes = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+
+        with self._lock:
+            parent_checkpoint_id = config["configurable"].get("checkpoint_id")
+            superseded = self._checkpoints.get((thread_id, checkpoint_ns))
+            if superseded is not None:
+                # Writes of an older step are only needed to resume it, which can no longer happen
+                self._writes.pop((thread_id, checkpoint_ns, superseded[2]), None)
+                # The superseded checkpoint may never be written, its parent is the last persisted one
+                parent_checkpoint_id = superseded[3]
+                self.counts["coalesced"] += 1
+
+            self._checkpoints[(thread_id, checkpoint_ns)] = (
+                thread_id, checkpoint_ns, checkpoint["id"], parent_checkpoint_id,
+                checkpoint_type, checkpoint_bytes, metadata_type, metadata_bytes,
+            )
+            self.counts["puts"] += 1
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+            self,
+            config: RunnableConfig,
+            writes: Sequence[Tuple[str, Any]],
+            task_id: str,
+            task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+
+        rows = {}
+        for idx, (channel, value) in enumerate(writes):
+            idx = WRITES_IDX_MAP.get(channel, idx)
+            value_type, value_bytes = self.serde.dumps_typed(value)
+            rows[(task_id, idx)] = (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, value_type, value_bytes, task_path)
+
+        with self._lock:
+            pending = self._writes.setdefault((thread_id, checkpoint_ns, checkpoint_id), {})
+            for key, row in rows.items():
+                # Regular writes are kept as first written, special ones (errors, interrupts) are replaced
+                if key[1] >= 0 and key in pending:
+                    continue
+                pending[key] = row
+
+    def flush(self) -> None:
+        """Write everything buffered in one transaction, then prune the threads that were written."""
+        # Copied, not taken: reads keep finding these rows in the buffer until the database has them
+        with self._lock:
+            checkpoints = dict(self._checkpoints)
+            writes = {key: dict(rows) for key, rows in self._writes.items()}
+
+        if not checkpoints and not writes:
+            return
+
+        write_rows = [row for rows in writes.values() for row in rows.values()]
+        thread_ids = sorted({key[0] for key in checkpoints})
+
+        start = time.perf_counter()
+        try:
+            with self.pool.connection() as connection, connection.transaction(), connection.cursor() as cursor:
+                if checkpoints:
+                    cursor.executemany(INSERT_CHECKPOINT, list(checkpoints.values()))
+                if write_rows:
+                    cursor.executemany(INSERT_WRITE, write_rows)
+                if thread_ids and self.keep_per_thread > 0:
+                    cursor.execute(PRUNE_THREADS, (thread_ids, self.keep_per_thread))
+                    self.counts["pruned"] += cursor.rowcount
+                    cursor.execute(PRUNE_ORPHAN_WRITES, {"thread_ids": thread_ids})
+        except Exception as e:
+            self.counts["flush_errors"] += 1
+            logger.error("Checkpoint flush failed, retrying next interval: %s", e)
+            return
+
+        self._forget_flushed(checkpoints, writes)
+
+        self.last_flush_ms = (time.perf_counter() - start) * 1000
+        self.counts["flushes"] += 1
+        self.counts["flushed_checkpoints"] += len(checkpoints)
+        self.counts["flushed_writes"] += len(write_rows)
+
+    def _forget_flushed(self, checkpoints, writes) -> None:
+        with self._lock:
+            for key, row in checkpoints.items():
+                # A newer put may have landed while the flush was running, that one stays buffered
+                if self._checkpoints.get(key) is row:
+                    del self._checkpoints[key]
+            for key, rows in writes.items():
+                pending = self._writes.get(key)
+                if pending is None:
+                    continue
+                for write_key, row in rows.items():
+                    if pending.get(write_key) is row:
+                        del pending[write_key]
+                if not pending:
+                    del self._writes[key]
+
+    def prune_expired(self) -> int:
+        with self.pool.connection() as connection, connection.transaction(), connection.cursor() as cursor:
+            cursor.execute(PRUNE_EXPIRED, (self.retention_days,))
+            pruned = cursor.rowcount
+            cursor.execute(PRUNE_ORPHAN_WRITES, {"thread_ids": None})
+
+        self.counts["pruned"] += pruned
+        return pruned
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+            if self.retention_days > 0 and time.monotonic() - self._last_expired_prune >= self.prune_interval:
+                self._last_expired_prune = time.monotonic()
+                try:
+                    self.prune_expired()
+                except Exception as e:
+                    logger.error("Checkpoint retention prune failed: %s", e)
+
+    def close(self) -> None:
+        self._stop.set()
+        self._flusher.join(timeout=self.flush_interval + 5)
+        self.flush()
+        self.pool.close()
+
+    # --- reads ---
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        buffered = self._get_buffered_tuple(config)
+        if buffered is not None:
+            return buffered
+
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+
+        with self.pool.connection() as connection, connection.cursor() as cursor:
+            cursor.execute(SELECT_CHECKPOINT, (thread_id, checkpoint_ns, checkpoint_id, checkpoint_id))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+
+            cursor.execute(SELECT_WRITES, (thread_id, checkpoint_ns, row[0]))
+            write_rows = cursor.fetchall()
+
+        with self._lock:
+            # Writes for a flushed checkpoint can still be waiting in the buffer, or be in both until the flush lets go
+            buffered_writes = list(self._writes.get((thread_id, checkpoint_ns, row[0]), {}).values())
+
+        writes = {(task_id, idx): (task_id, channel, value_type, value) for task_id, idx, channel, value_type, value in write_rows}
+        writes.update({(row_[3], row_[4]): (row_[3], row_[5], row_[6], row_[7]) for row_ in buffered_writes})
+        return self._to_tuple(thread_id, checkpoint_ns, *row, list(writes.values()))
+
+    def _get_buffered_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+
+        with self._lock:
+            row = self._checkpoints.get((thread_id, checkpoint_ns))
+            if row is None or (checkpoint_id is not None and row[2] != checkpoint_id):
+                return None
+            writes = [(row_[3], row_[5], row_[6], row_[7]) for row_ in self._writes.get((thread_id, checkpoint_ns, row[2]), {}).values()]
+
+        return self._to_tuple(*row, writes)
+
+    def _to_tuple(
+            self,
+            thread_id: str,
+            checkpoint_ns: str,
+            checkpoint_id: str,
+            parent_checkpoint_id: Optional[str],
+            checkpoint_type: str,
+            checkpoint: bytes,
+            metadata_type: str,
+            metadata: bytes,
+            writes: List[tuple],
+    ) -> CheckpointTuple:
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=self.serde.loads_typed((checkpoint_type, bytes(checkpoint))),
+            metadata=self.serde.loads_typed((metadata_type, bytes(metadata))),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((value_type, bytes(value))))
+                for task_id, channel, value_type, value in writes
+            ],
+        )
+
+    def list(
+            self,
+            config: Optional[RunnableConfig],
+            *,
+            filter: Optional[Dict[str, Any]] = None,
+            before: Optional[RunnableConfig] = None,
+            limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        # History is rare (debugging, admin), flushing first keeps it to a single source
+        self.flush()
+
+        configurable = (config or {}).get("configurable", {})
+        params = {
+            "thread_id": configurable.get("thread_id"),
+            "checkpoint_ns": configurable.get("checkpoint_ns"),
+            "checkpoint_id": get_checkpoint_id(config) if config else None,
+            "before": get_checkpoint_id(before) if before else None,
+        }
+
+        with self.pool.connection() as connection, connection.cursor() as cursor:
+            cursor.execute(SELECT_CHECKPOINTS, params)
+            rows = cursor.fetchall()
+
+            returned = 0
+            for row in rows:
+                if limit is not None and returned >= limit:
+                    break
+
+                cursor.execute(SELECT_WRITES, (row[0], row[1], row[2]))
+                writes = [(task_id, channel, value_type, value) for task_id, _, channel, value_type, value in cursor.fetchall()]
+                checkpoint_tuple = self._to_tuple(*row, writes)
+
+                # Metadata is stored serialized, so the filter is applied here
+                if filter and not all(checkpoint_tuple.metadata.get(key) == value for key, value in filter.items()):
+                    continue
+
+                returned += 1
+                yield checkpoint_tuple
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._checkpoints = {key: row for key, row in self._checkpoints.items() if key[0] != thread_id}
+            self._writes = {key: rows for key, rows in self._writes.items() if key[0] != thread_id}
+
+        with self.pool.connection() as connection, connection.transaction(), connection.cursor() as cursor:
+            cursor.execute("DELETE FROM graph_checkpoint_writes WHERE thread_id = %s", (thread_id,))
+            cursor.execute("DELETE FROM graph_checkpoints WHERE thread_id = %s", (thread_id,))
+
+    # --- async, writes never wait on the database and reads only on a buffer miss ---
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        buffered = self._get_buffered_tuple(config)
+        if buffered is not None:
+            return buffered
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+            self,
+            config: Optional[RunnableConfig],
+            *,
+            filter: Optional[Dict[str, Any]] = None,
+            before: Optional[RunnableConfig] = None,
+            limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        checkpoint_tuples = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for checkpoint_tuple in checkpoint_tuples:
+            yield checkpoint_tuple
+
+    async def aput(
+            self,
+            config: RunnableConfig,
+            checkpoint: Checkpoint,
+            metadata: CheckpointMetadata,
+            new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+            self,
+            config: RunnableConfig,
+            writes: Sequence[Tuple[str, Any]],
+            task_id: str,
+            task_path: str = "",
+    ) -> None:
+        self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counts,
+            "pending_checkpoints": len(self._checkpoints),
+            "pending_writes": sum(len(rows) for rows in self._writes.values()),
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "pool": self.pool.get_stats(),
+        }
@@ -0,0 +1 @@
+from app.agents.context.context import ContextPacker, PackedContext, count_tokens, truncate_tokens, get_encoding
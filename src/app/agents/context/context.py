@@ -0,0 +1,151 @@
+from functools import lru_cache
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Dict, List, NamedTuple, Optional, Sequence
+
+from app.agents.metrics import register_metrics
+from app.config import get_settings
+
+import tiktoken
+
+if TYPE_CHECKING:
+    from app.agents.retriever import RetrievedChunk
+
+settings = get_settings()
+
+# Adjacent chunks overlap by the splitter's chunk_overlap, never look further back than this
+MAX_OVERLAP_CHARS = 2000
+
+
+@lru_cache
+def get_encoding(encoding_name: str = settings.CONTEXT_TOKEN_ENCODING) -> tiktoken.Encoding:
+    return tiktoken.get_encoding(encoding_name)
+
+
+def count_tokens(text: str) -> int:
+    return len(get_encoding().encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    tokens = get_encoding().encode(text, disallowed_special=())
+    return text if len(tokens) <= max_tokens else get_encoding().decode(tokens[:max_tokens])
+
+
+class PackedContext(NamedTuple):
+    passages: List[str]
+    tokens: int
+    tokens_retrieved: int
+    tokens_saved: int
+    chunks_used: int
+    chunks_dropped: int
+
+
+class ContextPacker():
+    """Fit retrieved chunks into a token budget for the answer prompt.
+
+    Chunks are taken greedily in retrieval order, skipping any that no
+    longer fit, so the most relevant ones always make it in. Selected
+    chunks of the same document with consecutive ids were split next to
+    each other at ingest, they are merged into one passage with the
+    overlapping text removed.
+    """
+
+    def __init__(
+            self,
+            token_budget: int = settings.CONTEXT_TOKEN_BUDGET,
+            merge_adjacent: bool = settings.CONTEXT_MERGE_ADJACENT,
+            separator: str = "\n\n",
+    ):
+        self.token_budget = token_budget
+        self.merge_adjacent = merge_adjacent
+        self.separator = separator
+        self.separator_tokens = count_tokens(separator)
+
+        self._lock = Lock()
+        self.packed = 0
+        self.tokens_retrieved = 0
+        self.tokens_sent = 0
+
+        register_metrics("context_packer", self.stats)
+
+    def pack(self, chunks: Sequence["RetrievedChunk"]) -> PackedContext:
+        token_counts = [
+            chunk.token_count if chunk.token_count is not None else count_tokens(chunk.content)
+            for chunk in chunks
+        ]
+        tokens_retrieved = self._joined_tokens(token_counts)
+
+        selected = []
+        used = 0
+        for rank, (chunk, token_count) in enumerate(zip(chunks, token_counts)):
+            cost = token_count + (self.separator_tokens if selected else 0)
+            if used + cost <= self.token_budget:
+                selected.append((rank, chunk, token_count))
+                used += cost
+
+        if not selected and chunks:
+            # Even the best chunk alone is over budget, send its head rather than no context at all
+            content = truncate_tokens(chunks[0].content, self.token_budget)
+            selected = [(0, chunks[0]._replace(content=content), count_tokens(content))]
+
+        passages = self._merge(selected) if self.merge_adjacent else [(rank, chunk.content, token_count) for rank, chunk, token_count in selected]
+        passages.sort(key=lambda passage: passage[0])
+
+        tokens = self._joined_tokens([passage[2] for passage in passages])
+        packed = PackedContext(
+            passages=[passage[1] for passage in passages],
+            tokens=tokens,
+            tokens_retrieved=tokens_retrieved,
+            tokens_saved=tokens_retrieved - tokens,
+            chunks_used=len(selected),
+            chunks_dropped=len(chunks) - len(selected),
+        )
+
+        with self._lock:
+            self.packed += 1
+            self.tokens_retrieved += packed.tokens_retrieved
+            self.tokens_sent += packed.tokens
+
+        return packed
+
+    def _merge(self, selected):
+        """(best rank, text, tokens) per run of consecutive chunks of the same document."""
+        runs = []
+        for rank, chunk, token_count in sorted(selected, key=lambda item: (item[1].document_id, item[1].id)):
+            previous = runs[-1] if runs else None
+            if previous is not None and previous["document_id"] == chunk.document_id and previous["last_id"] + 1 == chunk.id:
+                previous["text"] = self._join_overlapping(previous["text"], chunk.content)
+                previous["rank"] = min(previous["rank"], rank)
+                previous["last_id"] = chunk.id
+                previous["merged"] = True
+            else:
+                runs.append({
+                    "document_id": chunk.document_id,
+                    "last_id": chunk.id,
+                    "rank": rank,
+                    "text": chunk.content,
+                    "tokens": token_count,
+                    "merged": False,
+                })
+
+        return [
+            (run["rank"], run["text"], count_tokens(run["text"]) if run["merged"] else run["tokens"])
+            for run in runs
+        ]
+
+    def _join_overlapping(self, head: str, tail: str) -> str:
+        for size in range(min(len(head), len(tail), MAX_OVERLAP_CHARS), 0, -1):
+            if head.endswith(tail[:size]):
+                return head + tail[size:]
+        return head + self.separator + tail
+
+    def _joined_tokens(self, token_counts: List[int]) -> int:
+        return sum(token_counts) + self.separator_tokens * max(len(token_counts) - 1, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "token_budget": self.token_budget,
+            "packed": self.packed,
+            "tokens_retrieved": self.tokens_retrieved,
+            "tokens_sent": self.tokens_sent,
+            "tokens_saved": self.tokens_retrieved - self.tokens_sent,
+        }
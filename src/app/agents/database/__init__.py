@@ -1 +1,3 @@
-from app.agents.database.database import VectorDatabase
\ No newline at end of file
+from app.agents.database.database import VectorDatabase
+from app.agents.database.bulk_load import BulkVectorLoader
+from app.agents.database.corpus import get_corpus_version, bump_corpus_version
@@ -0,0 +1,174 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from datetime import datetime, timezone
+
+from sqlmodel import Session, select
+from sqlalchemy import text, func
+
+from psycopg.types import TypeInfo
+from pgvector.psycopg.halfvec import register_halfvec_info
+from pgvector.psycopg.vector import register_vector_info
+
+from app.agents.context import count_tokens
+from app.config import get_settings
+
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+VECTOR_COLUMNS = ("created_at", "updated_at", "dense_embedding", "content", "token_count", "document_id")
+
+# Index methods whose per-row maintenance dominates a large load, btree (primary key, document_id) stays
+DEFERRABLE_INDEX_METHODS = ("bm25", "hnsw", "ivfflat")
+
+# pgvector types that need their own dumper for binary COPY
+VECTOR_TYPE_REGISTRARS = {"vector": register_vector_info, "halfvec": register_halfvec_info}
+
+COPY_VECTORS_STATEMENT = f"COPY document_vectors ({', '.join(VECTOR_COLUMNS)}) FROM STDIN (FORMAT BINARY)"
+
+# Binary COPY applies no casts, every value has to be dumped as the exact column type
+VECTOR_COLUMN_TYPES = text("""
+    SELECT a.attname, a.atttypid, t.typname
+    FROM pg_attribute a
+    JOIN pg_type t ON t.oid = a.atttypid
+    WHERE a.attrelid = 'document_vectors'::regclass AND a.attnum > 0 AND NOT a.attisdropped
+""")
+
+DEFERRABLE_INDEXES = text("""
+    SELECT i.indexname, i.indexdef
+    FROM pg_indexes i
+    JOIN pg_class c ON c.relname = i.indexname AND c.relnamespace = to_regnamespace(i.schemaname)
+    JOIN pg_am am ON am.oid = c.relam
+    WHERE i.schemaname = current_schema() AND i.tablename = 'document_vectors' AND am.amname = ANY(:methods)
+    ORDER BY i.indexname
+""")
+
+
+class BulkVectorLoader():
+    """Streams document_vectors rows into Postgres with binary COPY inside the session's transaction.
+
+    With defer_indexes the BM25 and ANN indexes are dropped on enter and
+    rebuilt from their pg_indexes definitions in one pass on a clean exit,
+    instead of being updated row by row. Everything, the drops included,
+    stays in the caller's transaction: readers wait on the table lock
+    rather than ever seeing it without its indexes, and a rollback puts
+    the indexes back untouched. Nothing is committed here.
+
+    DROP INDEX holds an ACCESS EXCLUSIVE lock on document_vectors until
+    that transaction ends, so every search waits for the whole load.
+    Deferring is for a maintenance window only (scripts/bulk_load.py),
+    loads into a live corpus keep the indexes. lock_timeout bounds how
+    long the drop queues behind running searches before giving up.
+    """
+
+    def __init__(
+            self,
+            session: Session,
+            defer_indexes: bool = False,
+            index_methods: Sequence[str] = DEFERRABLE_INDEX_METHODS,
+            maintenance_work_mem: str = settings.BULK_LOAD_MAINTENANCE_WORK_MEM,
+            lock_timeout: str = settings.BULK_LOAD_LOCK_TIMEOUT,
+    ):
+        self.session = session
+        self.defer_indexes = defer_indexes
+        self.index_methods = list(index_methods)
+        self.maintenance_work_mem = maintenance_work_mem
+        self.lock_timeout = lock_timeout
+
+        self.deferred: List[Tuple[str, str]] = []
+        self._types: Optional[List[int]] = None
+        self._vector_types: List[TypeInfo] = []
+        self._naive_timestamps = False
+        self.counts = {"rows": 0, "copy_seconds": 0.0, "indexes_rebuilt": 0, "rebuild_seconds": 0.0}
+
+    def __enter__(self) -> "BulkVectorLoader":
+        if self.defer_indexes:
+            self.drop_indexes()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        # On error the caller's rollback restores the dropped indexes
+        if exc_type is None and self.deferred:
+            self.rebuild_indexes()
+
+    def _driver_connection(self):
+        # The psycopg connection behind the session's current transaction
+        return self.session.connection().connection.driver_connection
+
+    def _prepare_copy(self) -> None:
+        # Only the type OIDs are cached, a commit between documents can hand the next COPY another pooled connection
+        if self._types is not None:
+            return
+
+        column_types = {name: (oid, typname) for name, oid, typname in self.session.execute(VECTOR_COLUMN_TYPES).all()}
+        self._types = [column_types[column][0] for column in VECTOR_COLUMNS]
+        self._naive_timestamps = column_types["created_at"][1] == "timestamp"
+
+        typnames = {typname for _, typname in column_types.values()}
+        self._vector_types = [
+            TypeInfo.fetch(self._driver_connection(), typname)
+            for typname in VECTOR_TYPE_REGISTRARS
+            if typname in typnames
+        ]
+
+    def _register_vector_types(self, cursor) -> None:
+        # Scoped to the COPY's own cursor, so the dumpers always belong to the connection doing the COPY
+        for info in self._vector_types:
+            VECTOR_TYPE_REGISTRARS[info.name](cursor, info)
+
+    def copy_vectors(self, document_id: int, contents: Sequence[str], embeddings: Sequence[Any]) -> int:
+        """COPY a document's chunks in order, so consecutive chunks still get consecutive ids."""
+        self._prepare_copy()
+
+        now = datetime.now(timezone.utc)
+        if self._naive_timestamps:
+            now = now.replace(tzinfo=None)
+
+        start = time.perf_counter()
+        with self._driver_connection().cursor() as cursor:
+            self._register_vector_types(cursor)
+            with cursor.copy(COPY_VECTORS_STATEMENT) as copy:
+                copy.set_types(self._types)
+                for content, embedding in zip(contents, embeddings):
+                    copy.write_row((now, now, embedding, content, count_tokens(content), document_id))
+
+        self.counts["rows"] += len(contents)
+        self.counts["copy_seconds"] += time.perf_counter() - start
+        return len(contents)
+
+    def drop_indexes(self) -> List[Tuple[str, str]]:
+        indexes = self.session.execute(DEFERRABLE_INDEXES.bindparams(methods=self.index_methods)).all()
+        preparer = self.session.connection().dialect.identifier_preparer
+
+        # Fail the load rather than queue the ACCESS EXCLUSIVE lock, and every search behind it, indefinitely
+        if indexes:
+            self.session.exec(select(func.set_config("lock_timeout", self.lock_timeout, True)))
+
+        for name, definition in indexes:
+            self.session.execute(text(f"DROP INDEX {preparer.quote(name)}"))
+            self.deferred.append((name, definition))
+            logger.info("Deferred index %s until the end of the bulk load", name)
+
+        return self.deferred
+
+    def rebuild_indexes(self) -> None:
+        # A larger maintenance_work_mem lets an HNSW build stay in memory, is_local=true scopes it to the transaction
+        self.session.exec(select(func.set_config("maintenance_work_mem", self.maintenance_work_mem, True)))
+
+        for name, definition in self.deferred:
+            start = time.perf_counter()
+            self.session.execute(text(definition))
+            elapsed = time.perf_counter() - start
+
+            self.counts["indexes_rebuilt"] += 1
+            self.counts["rebuild_seconds"] += elapsed
+            logger.info("Rebuilt index %s in %.1fs", name, elapsed)
+
+        self.deferred = []
+        # The planner's row estimates are stale after a large load
+        self.session.execute(text("ANALYZE document_vectors"))
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counts, "deferred": [name for name, _ in self.deferred]}
@@ -0,0 +1,33 @@
+from datetime import datetime, timezone
+
+from sqlmodel import Session, select, update, delete
+
+from app.models.corpus import CorpusVersion
+from app.models.answer_cache import AnswerCache
+
+CORPUS_VERSION_ID = 1
+
+
+def get_corpus_version(session: Session) -> int:
+    version = session.exec(
+        select(CorpusVersion.version).where(CorpusVersion.id == CORPUS_VERSION_ID)
+    ).one_or_none()
+
+    return version or 0
+
+
+def bump_corpus_version(session: Session) -> None:
+    """Increment the corpus version inside the caller's transaction.
+
+    Call it before committing any change to document_vectors so the new
+    version becomes visible exactly when the changed rows do. Cached
+    answers of the older versions can never be hit again and are dropped
+    in the same transaction.
+    """
+    session.exec(
+        update(CorpusVersion)
+        .where(CorpusVersion.id == CORPUS_VERSION_ID)
+        .values(version=CorpusVersion.version + 1, updated_at=datetime.now(timezone.utc))
+    )
+    current = select(CorpusVersion.version).where(CorpusVersion.id == CORPUS_VERSION_ID).scalar_subquery()
+    session.exec(delete(AnswerCache).where(AnswerCache.corpus_version < current))
@@ -1,9 +1,11 @@
-from typing import Sequence, Any, List
+from typing import Dict, Sequence, Any, List
 from uuid import uuid4
 from pathlib import Path
+from datetime import datetime, timezone
 import gc
 
 from fastapi import Depends
+from sqlalchemy import insert
 from sqlmodel import Session, select
 
 from docling.document_converter import DocumentConverter
@@ -18,6 +20,15 @@ from langchain_core.documents import Document as Doc
 
 from app.database import get_db
 from app.models.document import Document, DocumentVector
+from app.agents.database.corpus import bump_corpus_version
+from app.agents.database.bulk_load import BulkVectorLoader
+from app.agents.context import count_tokens
+from app.config import get_settings
+
+settings = get_settings()
+
+# Rows per multi-row INSERT, 6 parameters each keeps a statement well under Postgres' 65535 bind parameter cap
+INSERT_ROWS_PER_STATEMENT = 1000
 
 
 class VectorDatabase():
@@ -27,7 +38,8 @@ class VectorDatabase():
             split_text: bool = True,
             chunk_size: int = 900,
             chunk_overlap: int = 100,
-            batch_size: int = 4,  # Added batch size parameter
+            batch_size: int = settings.EMBED_BATCH_SIZE,  # Chunks per fastembed batch
+            copy_min_chunks: int = settings.BULK_LOAD_MIN_CHUNKS,  # Chunks from which a document is COPY-loaded, 0 disables
             max_workers: int = 1,  # Limit concurrent processing
     ):
         # Initialize embedding model lazily to save memory
@@ -35,6 +47,7 @@ class VectorDatabase():
         self.embed_model = None
         self.split_text = split_text
         self.batch_size = batch_size
+        self.copy_min_chunks = copy_min_chunks
         self.max_workers = max_workers
         self.converter = None  # Initialize lazily
 
@@ -57,8 +70,17 @@ class VectorDatabase():
             self, 
             session: Session, 
             file_paths: Sequence[str], 
-            document_ids: Sequence[int]
+            document_ids: Sequence[int],
+            defer_indexes: bool = False,
         ) -> List[Document]:
+        """Convert, chunk, embed and store documents.
+
+        Documents of at least copy_min_chunks chunks are streamed with
+        binary COPY, smaller ones use multi-row INSERT. With defer_indexes
+        every document goes through COPY, the BM25/ANN indexes are rebuilt
+        once at the end and the whole batch commits together; otherwise
+        each document commits on its own.
+        """
 
         if self.converter is None:
             self._init_converter()
@@ -99,52 +121,111 @@ class VectorDatabase():
         del documents
         gc.collect()
 
+        # Every chunk of a document is embedded in batches and written together, one lookup per document
+        chunks_by_document: Dict[int, List[str]] = {}
+        for split_document in split_documents:
+            chunks_by_document.setdefault(split_document.metadata["document_id"], []).append(split_document.page_content)
+
+        existing = {
+            document.id: document
+            for document in session.exec(select(Document).where(Document.id.in_(list(chunks_by_document)))).all()
+        } if chunks_by_document else {}
+
         # Initialize embedding model only when needed
         print("embedding documents")
         self._init_embed_model()
 
-        # Process embeddings in batches to reduce memory usage
-        for i in range(0, len(split_documents), self.batch_size):
-            batch = split_documents[i:i + self.batch_size]
-            
-            for split_document in batch:
-                document = session.exec(
-                    select(Document).where(Document.id == split_document.metadata["document_id"])
-                ).one_or_none()
-                
-                if not document:
-                    continue
-                
+        # Embed everything before writing, so deferred indexes are only down for the writes
+        embedded: Dict[int, List[Any]] = {}
+        for document_id, contents in chunks_by_document.items():
+            document = existing.get(document_id)
+            if document is None:
+                continue
+
+            try:
+                embedded[document_id] = self.embed_documents(contents)
+            except Exception as e:
+                print(f"Error embedding document {document_id}: {e}")
+                document.status = "failed"
+                session.add(document)
+                session.commit()
+
+        with BulkVectorLoader(session, defer_indexes=defer_indexes) as loader:
+            for document_id, embeddings in embedded.items():
+                document = existing[document_id]
+                contents = chunks_by_document[document_id]
+
                 try:
-                    vector_embed = self.embed_document(split_document.page_content)
-                    document_vector = DocumentVector(
-                        dense_embedding=vector_embed,
-                        content=split_document.page_content,
-                        document_id=split_document.metadata["document_id"]
-                    )
-                    
-                    document.status = "done"
-                    session.add(document_vector)
-                    session.add(document)
-                    
+                    # A failed document only rolls back its own rows
+                    with session.begin_nested():
+                        if defer_indexes or 0 < self.copy_min_chunks <= len(contents):
+                            loader.copy_vectors(document_id, contents, embeddings)
+                        else:
+                            self.insert_vectors(session, document_id, contents, embeddings)
+                        document.status = "done"
+                        session.add(document)
+
+                        # The version bump lands with the new vectors
+                        bump_corpus_version(session)
                 except Exception as e:
-                    print(f"Error embedding document {document.id}: {e}")
+                    print(f"Error inserting document {document_id}: {e}")
                     document.status = "failed"
                     session.add(document)
-            
-            # Commit after each batch to prevent memory buildup
-            session.commit()
-            gc.collect()
+
+                if not defer_indexes:
+                    session.commit()
+
+                embedded[document_id] = None
+                gc.collect()
+
+        if defer_indexes:
+            print(f"bulk load finished: {loader.stats()}")
+        session.commit()
 
         return split_documents
-    
-    def embed_document(self, page_content: str) -> List[float]:
-        """Embed a single document with proper type handling"""
+
+    def embed_documents(self, contents: Sequence[str]) -> List[Any]:
+        """Embed many chunks through fastembed in batches of batch_size, one vector per chunk in input order."""
         if self.embed_model is None:
             self._init_embed_model()
-            
-        vector_embed = list(self.embed_model.embed([page_content]))
+
+        return list(self.embed_model.embed(list(contents), batch_size=self.batch_size))
+
+    def embed_document(self, page_content: str) -> List[float]:
+        """Embed a single document with proper type handling"""
+        vector_embed = self.embed_documents([page_content])
         return vector_embed[0].tolist() if hasattr(vector_embed[0], 'tolist') else list(vector_embed[0])
+
+    def insert_vectors(
+            self,
+            session: Session,
+            document_id: int,
+            contents: Sequence[str],
+            embeddings: Sequence[Any],
+    ) -> int:
+        """Write a document's chunks with multi-row INSERT ... VALUES instead of one ORM object per chunk.
+
+        Rows keep the chunk order, so consecutive chunks get consecutive
+        ids as the context packer's adjacent merge expects. Not committed.
+        """
+        # Core inserts skip the models' Python-side default_factory
+        now = datetime.now(timezone.utc)
+        rows = [
+            {
+                "created_at": now,
+                "updated_at": now,
+                "dense_embedding": embedding,
+                "content": content,
+                "token_count": count_tokens(content),
+                "document_id": document_id,
+            }
+            for content, embedding in zip(contents, embeddings)
+        ]
+
+        for start in range(0, len(rows), INSERT_ROWS_PER_STATEMENT):
+            session.exec(insert(DocumentVector).values(rows[start:start + INSERT_ROWS_PER_STATEMENT]))
+
+        return len(rows)
     
     def _init_converter(self) -> None:
         """Initialize document converter with CPU-optimized settings"""
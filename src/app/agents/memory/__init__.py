@@ -0,0 +1 @@
+from app.agents.memory.memory import ConversationMemory, ConversationHistory, render_turns
@@ -0,0 +1,205 @@
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlmodel import select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.agents.context import count_tokens, truncate_tokens
+from app.agents.metrics import register_metrics
+from app.agents.prompts import MEMORY_SUMMARY_SYSTEM_TEMPLATE, MEMORY_SUMMARY_USER_TEMPLATE
+from app.database import AsyncSessionLocal
+from app.models.history import Thread, Chat
+from app.config import get_settings
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+ROLE_NAMES = {"user": "Pengguna", "chatbot": "Kasbi"}
+
+
+def _role(chat: Chat) -> str:
+    return getattr(chat.role, "value", chat.role)
+
+
+def render_turns(turns: List[Tuple[str, str]]) -> str:
+    return "\n".join(f"{ROLE_NAMES.get(role, role)}: {message}" for role, message in turns)
+
+
+class ConversationHistory(NamedTuple):
+    """What the answer prompt sees of a thread, already cut to the token budget."""
+    summary: Optional[str]
+    turns: List[Tuple[str, str]]
+    tokens: int
+
+    def render(self) -> str:
+        parts = []
+        if self.summary:
+            parts.append(f"Ringkasan: {self.summary}")
+        if self.turns:
+            parts.append(render_turns(self.turns))
+        return "\n".join(parts)
+
+    def retrieval_query(self, question: str) -> str:
+        """Prefix a follow-up question with the previous user question, so "yang kedua bagaimana?" still retrieves the right topic."""
+        previous = next((message for role, message in reversed(self.turns) if role == "user"), None)
+        return f"{previous}\n{question}" if previous else question
+
+
+class ConversationMemory():
+    """Last recent_turns exchanges verbatim plus a rolling summary of everything before them.
+
+    The summary lives on the thread row and is extended incrementally
+    after each answer: only the chats that just fell out of the recent
+    window are folded in, with one LLM call. load() fits summary and
+    turns into token_budget, so the prompt stays the same size however
+    long the thread runs.
+    """
+
+    def __init__(
+            self,
+            recent_turns: int = settings.MEMORY_RECENT_TURNS,
+            token_budget: int = settings.MEMORY_TOKEN_BUDGET,
+            summary_max_tokens: int = settings.MEMORY_SUMMARY_MAX_TOKENS,
+    ):
+        self.recent_turns = recent_turns
+        self.token_budget = token_budget
+        self.summary_max_tokens = summary_max_tokens
+
+        self._lock = Lock()
+        self.counts = {"loads": 0, "with_history": 0, "summaries": 0, "summary_conflicts": 0, "summary_errors": 0, "tokens": 0}
+
+        register_metrics("conversation_memory", self.stats)
+
+    @property
+    def recent_messages(self) -> int:
+        # A turn is the user's question and Kasbi's answer
+        return self.recent_turns * 2
+
+    async def load(self, session: AsyncSession, user_id: int, thread_id: int) -> Optional[ConversationHistory]:
+        """History of a thread before the question being asked, None for a new thread."""
+        thread = (await session.exec(
+            select(Thread).where(Thread.user_id == user_id, Thread.thread_id == thread_id)
+        )).one_or_none()
+        if thread is None:
+            return None
+
+        chats = (await session.exec(
+            select(Chat)
+            .where(Chat.user_id == user_id, Chat.thread_id == thread_id, Chat.id > (thread.summarized_until or 0))
+            .order_by(Chat.id.desc())
+            .limit(self.recent_messages)
+        )).all()
+
+        history = self.build(thread.summary, [(_role(chat), chat.message) for chat in reversed(chats)])
+        self._count(loads=1, with_history=int(history is not None), tokens=history.tokens if history else 0)
+        return history
+
+    def build(self, summary: Optional[str], messages: List[Tuple[str, str]]) -> Optional[ConversationHistory]:
+        """Fit summary and messages (oldest first) into the budget, dropping the oldest messages first."""
+        if not summary and not messages:
+            return None
+
+        summary = truncate_tokens(summary, self.summary_max_tokens) if summary else None
+        used = count_tokens(summary) if summary else 0
+
+        turns = []
+        for role, message in reversed(messages):
+            remaining = self.token_budget - used
+            if remaining <= 0:
+                break
+
+            tokens = count_tokens(message)
+            if tokens > remaining:
+                if turns:
+                    break
+                # The newest message alone is over budget, keep its beginning
+                message, tokens = truncate_tokens(message, remaining), remaining
+
+            turns.append((role, message))
+            used += tokens
+
+        turns.reverse()
+        return ConversationHistory(summary, turns, used)
+
+    async def update(self, user_id: int, thread_id: int, llm) -> None:
+        """Fold chats that left the recent window into the thread summary. Meant to run after the response is sent.
+
+        Updates of one thread can overlap (answers close together, several
+        workers). The summary is only written if summarized_until is still
+        what this update read, otherwise another update already folded the
+        same chats in and this one is dropped.
+        """
+        try:
+            # Read and write in separate sessions, no connection is held while the LLM summarizes
+            async with AsyncSessionLocal() as session:
+                thread = (await session.exec(
+                    select(Thread).where(Thread.user_id == user_id, Thread.thread_id == thread_id)
+                )).one_or_none()
+                if thread is None:
+                    return
+
+                chats = (await session.exec(
+                    select(Chat)
+                    .where(Chat.user_id == user_id, Chat.thread_id == thread_id, Chat.id > (thread.summarized_until or 0))
+                    .order_by(Chat.id)
+                )).all()
+
+            overflow = chats[:-self.recent_messages] if self.recent_messages else chats
+            if not overflow:
+                return
+
+            turns = render_turns([(_role(chat), chat.message) for chat in overflow])
+            summary = await llm.ainvoke(
+                message=turns,
+                system_template=MEMORY_SUMMARY_SYSTEM_TEMPLATE,
+                user_template=MEMORY_SUMMARY_USER_TEMPLATE,
+                prompt_format={
+                    "summary": thread.summary or "-",
+                    # Long backlogs (e.g. after failed updates) are cut rather than sent whole
+                    "turns": truncate_tokens(turns, self.token_budget * 4),
+                    "max_words": int(self.summary_max_tokens * 0.75),
+                },
+            )
+
+            async with AsyncSessionLocal() as session:
+                written = (await session.exec(
+                    update(Thread)
+                    .where(
+                        Thread.user_id == user_id,
+                        Thread.thread_id == thread_id,
+                        Thread.summarized_until.is_not_distinct_from(thread.summarized_until),
+                    )
+                    .values(
+                        summary=truncate_tokens(summary.strip(), self.summary_max_tokens),
+                        summarized_until=overflow[-1].id,
+                        updated_at=datetime.now(timezone.utc),
+                    )
+                )).rowcount
+                await session.commit()
+
+            if not written:
+                self._count(summary_conflicts=1)
+                return
+
+            self._count(summaries=1)
+        except Exception as e:
+            # The thread keeps its previous summary and the next update catches up
+            self._count(summary_errors=1)
+            logger.warning("Conversation summary update failed for thread %s/%s: %s", user_id, thread_id, e)
+
+    def _count(self, **increments: int) -> None:
+        with self._lock:
+            for key, value in increments.items():
+                self.counts[key] += value
+
+    def stats(self) -> Dict[str, Any]:
+        loads = self.counts["loads"]
+        return {
+            **self.counts,
+            "avg_tokens": self.counts["tokens"] / self.counts["with_history"] if self.counts["with_history"] else 0.0,
+            "history_rate": self.counts["with_history"] / loads if loads else 0.0,
+        }
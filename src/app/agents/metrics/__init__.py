@@ -0,0 +1,2 @@
+from app.agents.metrics.metrics import timer, collect_timings, collect_usage, collecting_usage, record_llm_usage, run_in_context, register_metrics, collect_metrics, LatencyWindow
+from app.agents.metrics.request_metrics import RequestMetricsWriter, get_request_metrics_writer, record_request_metrics
@@ -0,0 +1,117 @@
+from collections import deque
+from concurrent.futures import Executor, Future
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from threading import Lock
+from typing import Any, Callable, Deque, Dict, Optional
+
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Stage timings of the request currently being served, None outside of collect_timings()
+_stage_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("stage_timings", default=None)
+
+# LLM token usage of the request currently being served, None outside of collect_usage()
+_llm_usage: ContextVar[Optional[Dict[str, Any]]] = ContextVar("llm_usage", default=None)
+
+# Named callables returning a snapshot of some component's counters, read by the admin metrics endpoint
+_metric_sources: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def register_metrics(name: str, source: Callable[[], Dict[str, Any]]) -> None:
+    _metric_sources[name] = source
+
+
+def collect_metrics() -> Dict[str, Any]:
+    """Snapshot of every registered source. Counters are per process, so each uvicorn worker reports its own."""
+    return {name: source() for name, source in _metric_sources.items()}
+
+
+@contextmanager
+def collect_timings():
+    """Collect every timer() that runs inside the block into one dict of stage -> milliseconds."""
+    timings: Dict[str, float] = {}
+    token = _stage_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _stage_timings.reset(token)
+
+
+@contextmanager
+def collect_usage():
+    """Sum the tokens and cost of every LLM call made inside the block, cached completions count as nothing."""
+    usage: Dict[str, Any] = {"prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0, "models": []}
+    token = _llm_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _llm_usage.reset(token)
+
+
+def collecting_usage() -> bool:
+    return _llm_usage.get() is not None
+
+
+def record_llm_usage(model: str, prompt_tokens: int, completion_tokens: int, cost_usd: float = 0.0) -> None:
+    usage = _llm_usage.get()
+    if usage is None:
+        return
+
+    usage["prompt_tokens"] += prompt_tokens
+    usage["completion_tokens"] += completion_tokens
+    usage["cost_usd"] += cost_usd
+    if model not in usage["models"]:
+        usage["models"].append(model)
+
+
+@contextmanager
+def timer(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        timings = _stage_timings.get()
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + elapsed_ms
+
+        logger.debug("[TIMER] %s: %.2f ms", name, elapsed_ms)
+
+
+def run_in_context(executor: Executor, fn: Callable, *args, **kwargs) -> Future:
+    """Submit fn to executor with a copy of the caller's context so its timers land in the same collection."""
+    context = copy_context()
+    return executor.submit(context.run, fn, *args, **kwargs)
+
+
+class LatencyWindow():
+    """Percentiles over the most recent max_samples latencies, in milliseconds."""
+
+    def __init__(self, max_samples: int = 1000):
+        self.samples: Deque[float] = deque(maxlen=max_samples)
+        self.count = 0
+        self._lock = Lock()
+
+    def record(self, elapsed_ms: float) -> None:
+        with self._lock:
+            self.samples.append(elapsed_ms)
+            self.count += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self.samples)
+        if not samples:
+            return None
+        return samples[min(int(len(samples) * q / 100), len(samples) - 1)]
+
+    def stats(self) -> Dict[str, Any]:
+        p50, p95 = self.percentile(50), self.percentile(95)
+        return {
+            "count": self.count,
+            "p50_ms": round(p50, 2) if p50 is not None else None,
+            "p95_ms": round(p95, 2) if p95 is not None else None,
+        }
@@ -0,0 +1,173 @@
+from collections import deque
+from functools import lru_cache
+from threading import Event, Lock, Thread
+from typing import Any, Deque, Dict, Optional
+
+from sqlalchemy import delete, insert
+
+from app.agents.metrics.metrics import register_metrics
+from app.database import SessionLocal
+from app.models.request_metric import RequestMetric
+from app.config import get_settings
+
+from datetime import datetime, timedelta, timezone
+
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+
+class RequestMetricsWriter():
+    """Buffers one request_metrics row per chatbot request and inserts them in batches from a background thread.
+
+    record() only appends to an in-memory buffer, so the request never
+    waits on the insert. The buffer is bounded: when the database is
+    unreachable for long the oldest rows are dropped rather than growing
+    the process. Rows older than retention_days are pruned hourly.
+    """
+
+    def __init__(
+            self,
+            flush_interval: float = settings.REQUEST_METRICS_FLUSH_INTERVAL,
+            max_pending: int = settings.REQUEST_METRICS_MAX_PENDING,
+            retention_days: int = settings.REQUEST_METRICS_RETENTION_DAYS,
+            prune_interval: float = 3600.0,
+    ):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.retention_days = retention_days
+        self.prune_interval = prune_interval
+
+        self._lock = Lock()
+        self._pending: Deque[Dict[str, Any]] = deque()
+        self.counts = {"recorded": 0, "flushed": 0, "dropped": 0, "flush_errors": 0, "pruned": 0}
+        self._last_prune = 0.0
+
+        self._stop = Event()
+        self._flusher = Thread(target=self._flush_loop, name="request-metrics-flusher", daemon=True)
+        self._flusher.start()
+
+        register_metrics("request_metrics", self.stats)
+
+    def record(
+            self,
+            channel: str,
+            timings: Dict[str, float],
+            usage: Optional[Dict[str, Any]] = None,
+            total_ms: float = 0.0,
+            ttft_ms: Optional[float] = None,
+            intent: Optional[str] = None,
+            chat_id: Optional[int] = None,
+    ) -> None:
+        """Queue the metrics of one request, timings from collect_timings() and usage from collect_usage()."""
+        usage = usage or {}
+        row = {
+            "created_at": datetime.now(timezone.utc),
+            "chat_id": chat_id,
+            "channel": channel,
+            "intent": intent,
+            "total_ms": round(total_ms, 2),
+            "ttft_ms": round(ttft_ms, 2) if ttft_ms is not None else None,
+            "stages": {stage: round(ms, 2) for stage, ms in timings.items()},
+            "prompt_tokens": usage.get("prompt_tokens", 0),
+            "completion_tokens": usage.get("completion_tokens", 0),
+            "cost_usd": usage.get("cost_usd", 0.0),
+            "model": ",".join(usage.get("models", [])) or None,
+        }
+        self._append([row])
+        with self._lock:
+            self.counts["recorded"] += 1
+
+    def _append(self, rows) -> None:
+        with self._lock:
+            self._pending.extend(rows)
+            while len(self._pending) > self.max_pending:
+                self._pending.popleft()
+                self.counts["dropped"] += 1
+
+    def flush(self) -> None:
+        with self._lock:
+            rows, self._pending = list(self._pending), deque()
+
+        if not rows:
+            return
+
+        try:
+            with SessionLocal() as session:
+                session.execute(insert(RequestMetric), rows)
+                session.commit()
+        except Exception as e:
+            self.counts["flush_errors"] += 1
+            logger.error("Request metrics flush failed, retrying next interval: %s", e)
+            # Put back in front of anything recorded meanwhile, the bound still applies
+            with self._lock:
+                rows.extend(self._pending)
+                self._pending = deque()
+            self._append(rows)
+            return
+
+        self.counts["flushed"] += len(rows)
+
+    def prune_expired(self) -> int:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=self.retention_days)
+        with SessionLocal() as session:
+            result = session.execute(delete(RequestMetric).where(RequestMetric.created_at < cutoff))
+            session.commit()
+
+        self.counts["pruned"] += result.rowcount
+        return result.rowcount
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+            if self.retention_days > 0 and time.monotonic() - self._last_prune >= self.prune_interval:
+                self._last_prune = time.monotonic()
+                try:
+                    self.prune_expired()
+                except Exception as e:
+                    logger.error("Request metrics retention prune failed: %s", e)
+
+    def close(self) -> None:
+        self._stop.set()
+        self._flusher.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counts, "pending": len(self._pending)}
+
+
+@lru_cache
+def get_request_metrics_writer() -> Optional[RequestMetricsWriter]:
+    """Process-wide writer shared by the web and WhatsApp endpoints, None when REQUEST_METRICS_ENABLED is off."""
+    if not settings.REQUEST_METRICS_ENABLED:
+        return None
+    return RequestMetricsWriter()
+
+
+def record_request_metrics(
+        channel: str,
+        timings: Dict[str, float],
+        usage: Dict[str, Any],
+        started_at: float,
+        result_state: Dict[str, Any],
+        chat_id: Optional[int] = None,
+        ttft_ms: Optional[float] = None,
+) -> None:
+    """Queue a chatbot request's metrics, started_at is its time.perf_counter() at arrival."""
+    writer = get_request_metrics_writer()
+    if writer is None:
+        return
+
+    writer.record(
+        channel=channel,
+        timings=timings,
+        usage=usage,
+        total_ms=(time.perf_counter() - started_at) * 1000,
+        ttft_ms=ttft_ms,
+        intent=result_state.get("intent"),
+        chat_id=chat_id,
+    )
@@ -1 +1,5 @@
-from app.agents.models.models import GroqModel, GroqModelStructured, OpenRouterModel
\ No newline at end of file
+from app.agents.models.models import ChatModel, GroqModel, GroqModelStructured, OpenRouterModel, get_llm, get_prompt_template
+from app.agents.models.clients import get_http_client, get_async_http_client
+from app.agents.models.cache import get_llm_cache, llm_cache_key
+from app.agents.models.provider_router import ProviderRouter, Provider, CircuitBreaker, ProvidersUnavailableError, get_chat_llm
+from app.agents.models.scheduler import LLMScheduler, LLMBusyError, ScheduledLLM, TokenBucket, get_llm_scheduler
@@ -0,0 +1,44 @@
+from functools import lru_cache
+from typing import Optional
+
+from app.agents.cache import LRUCache, RedisCache, TieredCache, get_redis, get_async_redis
+from app.agents.metrics import register_metrics
+from app.config import get_settings
+
+import hashlib
+import json
+import sys
+
+settings = get_settings()
+
+
+def llm_cache_key(variant: str, model: str, temperature: float, messages) -> str:
+    """Hash of everything that decides the completion, the rendered messages include the context and question."""
+    payload = json.dumps(
+        [variant, model, temperature, [[message.type, message.content] for message in messages]],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@lru_cache
+def get_llm_cache() -> Optional[TieredCache]:
+    """Exact-match completion cache shared by every model instance, None when LLM_CACHE_ENABLED is off."""
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+
+    redis_client = get_redis()
+    cache = TieredCache(
+        LRUCache(settings.LLM_CACHE_SIZE, ttl=settings.LLM_CACHE_TTL, sizeof=sys.getsizeof),
+        RedisCache(
+            redis_client,
+            prefix="kasbi:llm:v1:",
+            ttl=settings.LLM_CACHE_TTL,
+            dumps=lambda value: json.dumps(value).encode("utf-8"),
+            loads=lambda raw: json.loads(raw),
+            # ChatModel.ainvoke/astream look up completions on the event loop
+            async_client=get_async_redis(),
+        ) if redis_client is not None else None,
+    )
+    register_metrics("llm_cache", cache.stats)
+    return cache
@@ -0,0 +1,85 @@
+from functools import lru_cache
+from threading import Lock
+from typing import Any, Dict
+
+from app.agents.metrics import register_metrics
+from app.config import get_settings
+
+import httpx
+
+settings = get_settings()
+
+
+class ConnectionStats():
+    """Requests vs. newly opened connections on the shared LLM HTTP clients.
+
+    httpcore reports every TCP connect through the request's trace
+    extension, so reuse_rate is the share of requests that went out on an
+    already open keep-alive connection.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self.requests = 0
+        self.new_connections = 0
+        self.tls_handshakes = 0
+
+    def _count(self, attribute: str) -> None:
+        with self._lock:
+            setattr(self, attribute, getattr(self, attribute) + 1)
+
+    def trace(self, event_name: str, info: dict) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            self._count("new_connections")
+        elif event_name == "connection.start_tls.complete":
+            self._count("tls_handshakes")
+
+    async def atrace(self, event_name: str, info: dict) -> None:
+        self.trace(event_name, info)
+
+    def on_request(self, request: httpx.Request) -> None:
+        self._count("requests")
+        request.extensions["trace"] = self.trace
+
+    async def aon_request(self, request: httpx.Request) -> None:
+        self._count("requests")
+        request.extensions["trace"] = self.atrace
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "new_connections": self.new_connections,
+            "tls_handshakes": self.tls_handshakes,
+            "reuse_rate": 1 - self.new_connections / self.requests if self.requests else 0.0,
+        }
+
+
+connection_stats = ConnectionStats()
+register_metrics("llm_http", connection_stats.stats)
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY,
+    )
+
+
+@lru_cache
+def get_http_client() -> httpx.Client:
+    """Process-wide pooled client shared by every LLM provider, so TLS sessions survive across requests."""
+    return httpx.Client(
+        limits=_limits(),
+        timeout=httpx.Timeout(settings.LLM_TIMEOUT, connect=10.0),
+        event_hooks={"request": [connection_stats.on_request]},
+    )
+
+
+@lru_cache
+def get_async_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        limits=_limits(),
+        timeout=httpx.Timeout(settings.LLM_TIMEOUT, connect=10.0),
+        event_hooks={"request": [connection_stats.aon_request]},
+    )
@@ -1,23 +1,125 @@
 import os
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
 
 from langchain_groq import ChatGroq
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.messages.ai import add_usage
 
+from app.agents.models.clients import get_http_client, get_async_http_client
+from app.agents.models.cache import get_llm_cache, llm_cache_key
+from app.agents.metrics import collecting_usage, record_llm_usage
+from app.agents.context import count_tokens
 from app.config import get_settings
 
+import logging
+
+logger = logging.getLogger(__name__)
+
 settings = get_settings()
 
-class GroqModel():
+
+@lru_cache(maxsize=64)
+def get_prompt_template(system_template: str, user_template: str) -> ChatPromptTemplate:
+    """Templates are parsed once per (system, user) pair, the prompts are module constants so the cache stays small."""
+    return ChatPromptTemplate(
+        [
+            ("system", system_template),
+            ("user", user_template),
+        ]
+    )
+
+
+@lru_cache
+def llm_prices() -> Dict[str, Tuple[float, float]]:
+    """LLM_PRICES ("model=prompt/completion,...", USD per million tokens) as model -> (prompt, completion)."""
+    prices = {}
+    for item in settings.LLM_PRICES.split(","):
+        if "=" not in item:
+            continue
+        model, price = item.rsplit("=", 1)
+        prompt_price, completion_price = price.split("/")
+        prices[model.strip()] = (float(prompt_price), float(completion_price))
+    return prices
+
+
+class ChatModel():
+    """Shared invoke/stream over a LangChain chat model set up by the subclass as self.llm.
+
+    Completions are looked up in the exact-match LLM cache first, keyed by
+    the model, temperature and rendered messages, so a repeated router
+    prompt or a popular question with the same context skips the provider.
+    A caller that already looked (see cached/acached) passes
+    cache_lookup=False, the completion is still stored.
+    """
+
     def __init__(
-            self, 
-            model, 
+            self,
+            model: str,
             temperature: float = 0.0,
     ):
-
         self.model = model
         self.temperature = temperature
-        self.llm = ChatGroq(api_key=settings.GROQ_API_KEY, model=model, temperature=temperature)
+        self.llm = None
+        self.cache = get_llm_cache()
+
+    def _prompt(
+            self,
+            system_template: str,
+            user_template: str,
+            prompt_format: dict,
+    ):
+        return get_prompt_template(system_template, user_template).invoke(prompt_format)
+
+    def _cache_key(self, prompt) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return llm_cache_key(type(self).__name__, self.model, self.temperature, prompt.to_messages())
+
+    def _cache_get(self, key: Optional[str]):
+        return self.cache.get(key) if key is not None else None
+
+    def _cache_set(self, key: Optional[str], content) -> None:
+        # Empty completions are usually a provider hiccup, not worth serving again
+        if key is not None and content:
+            self.cache.set(key, content)
+
+    # The async paths run on the event loop, their Redis round trips must not block it
+    async def _acache_get(self, key: Optional[str]):
+        return await self.cache.aget(key) if key is not None else None
+
+    async def _acache_set(self, key: Optional[str], content) -> None:
+        if key is not None and content:
+            await self.cache.aset(key, content)
+
+    def cached(self, message: str, system_template: str, user_template: str, prompt_format: dict = {}):
+        """The cached completion for this prompt, None on a miss. Never calls the provider."""
+        return self._cache_get(self._cache_key(self._prompt(system_template, user_template, prompt_format)))
+
+    async def acached(self, message: str, system_template: str, user_template: str, prompt_format: dict = {}):
+        return await self._acache_get(self._cache_key(self._prompt(system_template, user_template, prompt_format)))
+
+    def _record_usage(self, prompt, usage: Optional[dict], completion) -> None:
+        """Add this call's tokens and cost to the request being collected, see collect_usage()."""
+        if not collecting_usage():
+            return
+
+        if usage:
+            prompt_tokens, completion_tokens = usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+        else:
+            # The provider didn't report usage, estimate with the context packer's tokenizer
+            try:
+                prompt_tokens = sum(count_tokens(message.content) for message in prompt.to_messages())
+                completion_tokens = count_tokens(completion) if isinstance(completion, str) else 0
+            except Exception as e:
+                # Accounting never fails the answer itself
+                logger.debug("Token estimate failed for %s: %s", self.model, e)
+                return
+
+        prompt_price, completion_price = llm_prices().get(self.model, (0.0, 0.0))
+        cost = (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+        record_llm_usage(self.model, prompt_tokens, completion_tokens, cost)
 
     def invoke(
             self,
@@ -25,88 +127,180 @@ class GroqModel():
             system_template: str,
             user_template: str,
             prompt_format: dict = {},
+            *,
+            cache_lookup: bool = True,
     ):
-        
-        template = ChatPromptTemplate(
-            [
-                ("system", system_template),
-                ("user", user_template),
-            ]
-        )
+        prompt = self._prompt(system_template, user_template, prompt_format)
+        key = self._cache_key(prompt)
 
-        prompt = template.invoke(prompt_format)
+        cached = self._cache_get(key) if cache_lookup else None
+        if cached is not None:
+            return cached
 
         response = self.llm.invoke(prompt)
+        self._record_usage(prompt, getattr(response, "usage_metadata", None), response.content)
+        self._cache_set(key, response.content)
         return response.content
 
-class OpenRouterModel():
+    def stream(
+            self,
+            message: str,
+            system_template: str,
+            user_template: str,
+            prompt_format: dict = {},
+            *,
+            cache_lookup: bool = True,
+    ):
+        """Yield the answer text chunk by chunk as the provider produces it, a cached answer comes as one chunk."""
+        prompt = self._prompt(system_template, user_template, prompt_format)
+        key = self._cache_key(prompt)
+
+        cached = self._cache_get(key) if cache_lookup else None
+        if cached is not None:
+            yield cached
+            return
+
+        chunks, usage = [], None
+        for chunk in self.llm.stream(prompt):
+            # Providers report usage on the last chunk
+            usage = add_usage(usage, chunk.usage_metadata) if chunk.usage_metadata else usage
+            if chunk.content:
+                chunks.append(chunk.content)
+                yield chunk.content
+
+        # Only a stream that ran to the end is cached
+        self._record_usage(prompt, usage, "".join(chunks))
+        self._cache_set(key, "".join(chunks))
+
+    async def ainvoke(
+            self,
+            message: str,
+            system_template: str,
+            user_template: str,
+            prompt_format: dict = {},
+            *,
+            cache_lookup: bool = True,
+    ):
+        prompt = self._prompt(system_template, user_template, prompt_format)
+        key = self._cache_key(prompt)
+
+        cached = await self._acache_get(key) if cache_lookup else None
+        if cached is not None:
+            return cached
+
+        response = await self.llm.ainvoke(prompt)
+        self._record_usage(prompt, getattr(response, "usage_metadata", None), response.content)
+        await self._acache_set(key, response.content)
+        return response.content
+
+    async def astream(
+            self,
+            message: str,
+            system_template: str,
+            user_template: str,
+            prompt_format: dict = {},
+            *,
+            cache_lookup: bool = True,
+    ):
+        prompt = self._prompt(system_template, user_template, prompt_format)
+        key = self._cache_key(prompt)
+
+        cached = await self._acache_get(key) if cache_lookup else None
+        if cached is not None:
+            yield cached
+            return
+
+        chunks, usage = [], None
+        async for chunk in self.llm.astream(prompt):
+            usage = add_usage(usage, chunk.usage_metadata) if chunk.usage_metadata else usage
+            if chunk.content:
+                chunks.append(chunk.content)
+                yield chunk.content
+
+        self._record_usage(prompt, usage, "".join(chunks))
+        await self._acache_set(key, "".join(chunks))
+
+
+class GroqModel(ChatModel):
     def __init__(
-            self, 
-            model: str, 
+            self,
+            model,
             temperature: float = 0.0,
     ):
-        self.model = model
-        self.temperature = temperature
-        
+        super().__init__(model, temperature)
+        self.llm = ChatGroq(
+            api_key=settings.GROQ_API_KEY,
+            base_url=settings.GROQ_BASE_URL,
+            model=model,
+            temperature=temperature,
+            # The provider router fails over to the next provider instead of retrying this one for long
+            max_retries=settings.LLM_MAX_RETRIES,
+            http_client=get_http_client(),
+            http_async_client=get_async_http_client(),
+        )
+
+
+class OpenRouterModel(ChatModel):
+    def __init__(
+            self,
+            model: str,
+            temperature: float = 0.0,
+    ):
+        super().__init__(model, temperature)
         self.llm = ChatOpenAI(
             api_key=settings.OPEN_ROUTER_API_KEY,
-            base_url="https://openrouter.ai/api/v1",
+            base_url=settings.OPEN_ROUTER_BASE_URL,
             model=model,
             temperature=temperature,
+            # The provider router fails over to the next provider instead of retrying this one for long
+            max_retries=settings.LLM_MAX_RETRIES,
+            # Token usage on the last stream chunk, OpenAI-compatible endpoints only send it when asked
+            stream_usage=True,
+            http_client=get_http_client(),
+            http_async_client=get_async_http_client(),
             # Header opsional
             default_headers={
-                "HTTP-Referer": "http://localhost:8000", 
+                "HTTP-Referer": "http://localhost:8000",
                 "X-Title": "Kasbi Chatbot"
             }
         )
 
-    def invoke(
-            self,
-            message: str,
-            system_template: str,
-            user_template: str,
-            prompt_format: dict = {},
-    ):
-        template = ChatPromptTemplate(
-            [
-                ("system", system_template),
-                ("user", user_template),
-            ]
-        )
-
-        prompt = template.invoke(prompt_format)
-        response = self.llm.invoke(prompt)
-        return response.content
 
-class GroqModelStructured():
+class GroqModelStructured(ChatModel):
     def __init__(
-            self, 
+            self,
             schema,
-            model, 
+            model,
             temperature: float = 0.0,
     ):
-
-        self.model = model
-        self.temperature = temperature
-        self.llm = ChatGroq(api_key=settings.GROQ_API_KEY, model=model, temperature=temperature)
+        super().__init__(model, temperature)
+        self.schema = schema
+        self.llm = ChatGroq(
+            api_key=settings.GROQ_API_KEY,
+            base_url=settings.GROQ_BASE_URL,
+            model=model,
+            temperature=temperature,
+            # The provider router fails over to the next provider instead of retrying this one for long
+            max_retries=settings.LLM_MAX_RETRIES,
+            http_client=get_http_client(),
+            http_async_client=get_async_http_client(),
+        )
         self.llm = self.llm.with_structured_output(schema)
 
-    def invoke(
-            self,
-            message: str,
-            system_template: str,
-            user_template: str,
-            prompt_format: dict = {},
-    ):
-        
-        template = ChatPromptTemplate(
-            [
-                ("system", system_template),
-                ("user", user_template),
-            ]
-        )
+    def _cache_key(self, prompt) -> Optional[str]:
+        if self.cache is None:
+            return None
+        # Same prompt under a different schema is a different completion
+        return llm_cache_key(f"{type(self).__name__}:{self.schema.__name__}", self.model, self.temperature, prompt.to_messages())
 
-        prompt = template.invoke(prompt_format)
 
-        response = self.llm.invoke(prompt)
-        return response.content
\ No newline at end of file
+_PROVIDERS = {
+    "groq": GroqModel,
+    "openrouter": OpenRouterModel,
+}
+
+
+@lru_cache
+def get_llm(provider: str, model: str, temperature: float = 0.0) -> ChatModel:
+    """App-scoped model instance per (provider, model, temperature), built once and reused by every request."""
+    return _PROVIDERS[provider](model=model, temperature=temperature)
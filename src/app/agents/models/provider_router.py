@@ -0,0 +1,496 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
+from threading import Lock
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from app.agents.metrics import LatencyWindow, register_metrics, run_in_context
+from app.agents.models.models import ChatModel, get_llm
+from app.config import get_settings
+
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Below this many samples the percentiles are noise, the configured defaults are used instead
+MIN_SAMPLES = 20
+
+
+class ProvidersUnavailableError(Exception):
+    """Every provider's breaker is open, or half open with its trial call still running."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker():
+    """Opens after failure_threshold consecutive failures and lets traffic through again after cooldown seconds.
+
+    Once the cooldown has passed the provider is half open and admits a
+    single trial call: its success closes the breaker, its failure opens
+    it again. A trial that never reports back (a cancelled hedge) frees
+    the slot for another after one more cooldown.
+    """
+
+    def __init__(
+            self,
+            failure_threshold: int = settings.LLM_BREAKER_FAILURES,
+            cooldown: float = settings.LLM_BREAKER_COOLDOWN,
+    ):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+
+        self._lock = Lock()
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_started_at: Optional[float] = None
+        self.trips = 0
+
+    def _available(self, now: float) -> bool:
+        # Called under the lock
+        if self.state == "open" and now - self.opened_at >= self.cooldown:
+            self.state = "half_open"
+        if self.state == "half_open":
+            return self.trial_started_at is None or now - self.trial_started_at >= self.cooldown
+        return self.state == "closed"
+
+    def available(self) -> bool:
+        """Whether a call could go through now, without taking the half-open trial."""
+        with self._lock:
+            return self._available(time.monotonic())
+
+    def allow(self) -> bool:
+        """Take the call: always when closed, only as the single trial when half open."""
+        with self._lock:
+            now = time.monotonic()
+            if not self._available(now):
+                return False
+            if self.state == "half_open":
+                self.trial_started_at = now
+            return True
+
+    def retry_after(self) -> float:
+        """Seconds until a call could go through again, 0 when it can now."""
+        with self._lock:
+            now = time.monotonic()
+            if self._available(now):
+                return 0.0
+            since = self.opened_at if self.state == "open" else self.trial_started_at
+            return max(self.cooldown - (now - since), 0.0)
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self.trial_started_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self.trial_started_at = None
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.trips += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+class Provider():
+    """One model behind the router with its rolling latency, error rate and breaker.
+
+    latency only holds completed invoke round trips, it orders the
+    providers and sets the hedge delay. Streams record their time to
+    first token in ttft instead, a whole stream says more about the
+    answer's length than about the provider.
+    """
+
+    def __init__(self, name: str, model: ChatModel, breaker: Optional[CircuitBreaker] = None):
+        self.name = name
+        self.model = model
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyWindow(max_samples=200)
+        self.ttft = LatencyWindow(max_samples=200)
+        self.outcomes: Deque[bool] = deque(maxlen=100)
+
+        self._lock = Lock()
+        self.counts = {"requests": 0, "errors": 0, "hedges": 0, "hedges_skipped": 0, "wins": 0}
+
+    def record_success(self, elapsed_ms: Optional[float] = None) -> None:
+        if elapsed_ms is not None:
+            self.latency.record(elapsed_ms)
+        self.breaker.record_success()
+        with self._lock:
+            self.outcomes.append(True)
+
+    def record_failure(self) -> None:
+        self.breaker.record_failure()
+        with self._lock:
+            self.outcomes.append(False)
+            self.counts["errors"] += 1
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self.counts[key] += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        return self.latency.percentile(q) if len(self.latency.samples) >= MIN_SAMPLES else None
+
+    @property
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.model.model,
+            "state": self.breaker.state,
+            "trips": self.breaker.trips,
+            **self.counts,
+            **self.latency.stats(),
+            "ttft_p50_ms": self.ttft.stats()["p50_ms"],
+            "ttft_p95_ms": self.ttft.stats()["p95_ms"],
+            "error_rate": round(self.error_rate, 4),
+        }
+
+
+class ProviderRouter():
+    """Same invoke/stream interface as ChatModel, spread over several providers.
+
+    The primary is the first provider whose breaker is closed, or the
+    fastest by rolling p50 once every healthy provider has enough samples.
+    invoke/ainvoke fire a hedged request at the next provider when the
+    primary has not answered within its own p95, and return whichever
+    answer comes first. A failed provider fails over to the next one.
+    Streams are not hedged, since tokens already sent cannot be taken
+    back, but fail over as long as nothing has been yielded yet.
+
+    A cached completion is returned before any provider is called, and
+    the providers are then called with cache_lookup=False, so every
+    latency sample is a real provider round trip. admit_hedge lets the
+    caller charge a hedge against its rate limit, a hedge it refuses is
+    skipped and the primary is simply awaited.
+    """
+
+    def __init__(
+            self,
+            providers: Sequence[Provider],
+            hedge_enabled: bool = settings.LLM_HEDGE_ENABLED,
+            hedge_min_delay: float = settings.LLM_HEDGE_MIN_DELAY,
+            hedge_default_delay: float = settings.LLM_HEDGE_DEFAULT_DELAY,
+    ):
+        if not providers:
+            raise ValueError("ProviderRouter needs at least one provider")
+
+        self.providers = list(providers)
+        self.hedge_enabled = hedge_enabled and len(self.providers) > 1
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_default_delay = hedge_default_delay
+
+        # Sync hedging needs a thread per in-flight provider call
+        self.executor = ThreadPoolExecutor(max_workers=settings.LLM_MAX_CONNECTIONS, thread_name_prefix="llm-hedge")
+
+        # Lets the router stand in for a ChatModel in logs and benchmarks
+        self.model = "+".join(provider.model.model for provider in self.providers)
+
+        register_metrics("llm_providers", self.stats)
+
+    def candidates(self) -> List[Provider]:
+        """Providers in the order they should be tried, empty when no breaker would take a call."""
+        healthy = [provider for provider in self.providers if provider.breaker.available()]
+        if not healthy:
+            return []
+
+        p50s = [provider.percentile(50) for provider in healthy]
+        if all(p50 is not None for p50 in p50s):
+            healthy = [provider for _, provider in sorted(zip(p50s, healthy), key=lambda pair: pair[0])]
+        return healthy
+
+    def _claim(self, queue: List[Provider]) -> Optional[Provider]:
+        """Pop the next provider whose breaker takes the call, None when none is left.
+
+        A half-open provider only takes its single trial call, a concurrent
+        request that lost it moves on to the next provider.
+        """
+        while queue:
+            provider = queue.pop(0)
+            if provider.breaker.allow():
+                return provider
+        return None
+
+    def _unavailable(self) -> ProvidersUnavailableError:
+        retry_after = min(provider.breaker.retry_after() for provider in self.providers)
+        return ProvidersUnavailableError("No LLM provider is available, every circuit breaker is open", max(retry_after, 1.0))
+
+    def cached(self, message: str, system_template: str, user_template: str, prompt_format: dict = {}):
+        """A cached completion from any provider's model, None on a miss."""
+        for provider in self.providers:
+            cached = provider.model.cached(message, system_template, user_template, prompt_format)
+            if cached is not None:
+                return cached
+        return None
+
+    async def acached(self, message: str, system_template: str, user_template: str, prompt_format: dict = {}):
+        for provider in self.providers:
+            cached = await provider.model.acached(message, system_template, user_template, prompt_format)
+            if cached is not None:
+                return cached
+        return None
+
+    def hedge_delay(self, provider: Provider) -> float:
+        p95 = provider.percentile(95)
+        return max(p95 / 1000 if p95 is not None else self.hedge_default_delay, self.hedge_min_delay)
+
+    def _call(self, provider: Provider, fn: Callable[[ChatModel], Any]) -> Any:
+        provider.count("requests")
+        start = time.perf_counter()
+        try:
+            result = fn(provider.model)
+        except Exception:
+            provider.record_failure()
+            raise
+        provider.record_success((time.perf_counter() - start) * 1000)
+        return result
+
+    async def _acall(self, provider: Provider, fn: Callable[[ChatModel], Any]) -> Any:
+        provider.count("requests")
+        start = time.perf_counter()
+        try:
+            result = await fn(provider.model)
+        except asyncio.CancelledError:
+            # Lost the race, says nothing about the provider's health
+            raise
+        except Exception:
+            provider.record_failure()
+            raise
+        provider.record_success((time.perf_counter() - start) * 1000)
+        return result
+
+    def _log_failure(self, provider: Provider, error: BaseException) -> None:
+        logger.warning("LLM provider %s failed: %s", provider.name, error)
+
+    def invoke(
+            self,
+            message: str,
+            system_template: str,
+            user_template: str,
+            prompt_format: dict = {},
+            *,
+            cache_lookup: bool = True,
+            admit_hedge: Optional[Callable[[], bool]] = None,
+    ):
+        cached = self.cached(message, system_template, user_template, prompt_format) if cache_lookup else None
+        if cached is not None:
+            return cached
+
+        fn = lambda model: model.invoke(message, system_template, user_template, prompt_format, cache_lookup=False)
+        queue = self.candidates()
+        running: Dict[Any, Provider] = {}
+        errors = []
+        hedged = False
+
+        def start(provider: Provider) -> None:
+            running[run_in_context(self.executor, self._call, provider, fn)] = provider
+
+        provider = self._claim(queue)
+        if provider is None:
+            raise self._unavailable()
+
+        start(provider)
+        while running:
+            hedge_next = self.hedge_enabled and not hedged and queue
+            timeout = self.hedge_delay(next(iter(running.values()))) if hedge_next else None
+            done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                # Primary is past its p95, race the next provider against it
+                hedged = True
+                if admit_hedge is not None and not admit_hedge():
+                    next(iter(running.values())).count("hedges_skipped")
+                    continue
+                provider = self._claim(queue)
+                if provider is not None:
+                    provider.count("hedges")
+                    start(provider)
+                continue
+
+            for future in done:
+                provider = running.pop(future)
+                if future.exception() is None:
+                    # A losing thread can't be interrupted, it finishes and only updates the provider stats
+                    for other in running:
+                        other.cancel()
+                    provider.count("wins")
+                    return future.result()
+                errors.append(future.exception())
+                self._log_failure(provider, future.exception())
+
+            if not running and (provider := self._claim(queue)) is not None:
+                start(provider)
+
+        raise errors[-1]
+
+    async def ainvoke(
+            self,
+            message: str,
+            system_template: str,
+            user_template: str,
+            prompt_format: dict = {},
+            *,
+            cache_lookup: bool = True,
+            admit_hedge: Optional[Callable[[], Awaitable[bool]]] = None,
+    ):
+        cached = await self.acached(message, system_template, user_template, prompt_format) if cache_lookup else None
+        if cached is not None:
+            return cached
+
+        fn = lambda model: model.ainvoke(message, system_template, user_template, prompt_format, cache_lookup=False)
+        queue = self.candidates()
+        running: Dict[asyncio.Task, Provider] = {}
+        errors = []
+        hedged = False
+
+        def start(provider: Provider) -> None:
+            running[asyncio.create_task(self._acall(provider, fn))] = provider
+
+        provider = self._claim(queue)
+        if provider is None:
+            raise self._unavailable()
+
+        start(provider)
+        try:
+            while running:
+                hedge_next = self.hedge_enabled and not hedged and queue
+                timeout = self.hedge_delay(next(iter(running.values()))) if hedge_next else None
+                done, _ = await asyncio.wait(list(running), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    hedged = True
+                    if admit_hedge is not None and not await admit_hedge():
+                        next(iter(running.values())).count("hedges_skipped")
+                        continue
+                    provider = self._claim(queue)
+                    if provider is not None:
+                        provider.count("hedges")
+                        start(provider)
+                    continue
+
+                for task in done:
+                    provider = running.pop(task)
+                    if task.exception() is None:
+                        provider.count("wins")
+                        return task.result()
+                    errors.append(task.exception())
+                    self._log_failure(provider, task.exception())
+
+                if not running and (provider := self._claim(queue)) is not None:
+                    start(provider)
+        finally:
+            # The loser (or everything, when the caller is cancelled) stops here
+            for task in running:
+                task.cancel()
+
+        raise errors[-1]
+
+    def stream(
+            self,
+            message: str,
+            system_template: str,
+            user_template: str,
+            prompt_format: dict = {},
+            *,
+            cache_lookup: bool = True,
+    ):
+        cached = self.cached(message, system_template, user_template, prompt_format) if cache_lookup else None
+        if cached is not None:
+            yield cached
+            return
+
+        errors = []
+        queue = self.candidates()
+        while (provider := self._claim(queue)) is not None:
+            provider.count("requests")
+            start = time.perf_counter()
+            started = False
+            try:
+                for chunk in provider.model.stream(message, system_template, user_template, prompt_format, cache_lookup=False):
+                    if not started:
+                        started = True
+                        provider.ttft.record((time.perf_counter() - start) * 1000)
+                    yield chunk
+            except Exception as e:
+                provider.record_failure()
+                if started:
+                    raise
+                errors.append(e)
+                self._log_failure(provider, e)
+                continue
+
+            provider.record_success()
+            provider.count("wins")
+            return
+
+        raise errors[-1] if errors else self._unavailable()
+
+    async def astream(
+            self,
+            message: str,
+            system_template: str,
+            user_template: str,
+            prompt_format: dict = {},
+            *,
+            cache_lookup: bool = True,
+    ):
+        cached = await self.acached(message, system_template, user_template, prompt_format) if cache_lookup else None
+        if cached is not None:
+            yield cached
+            return
+
+        errors = []
+        queue = self.candidates()
+        while (provider := self._claim(queue)) is not None:
+            provider.count("requests")
+            start = time.perf_counter()
+            started = False
+            try:
+                async for chunk in provider.model.astream(message, system_template, user_template, prompt_format, cache_lookup=False):
+                    if not started:
+                        started = True
+                        provider.ttft.record((time.perf_counter() - start) * 1000)
+                    yield chunk
+            except Exception as e:
+                provider.record_failure()
+                if started:
+                    raise
+                errors.append(e)
+                self._log_failure(provider, e)
+                continue
+
+            provider.record_success()
+            provider.count("wins")
+            return
+
+        raise errors[-1] if errors else self._unavailable()
+
+    def stats(self) -> Dict[str, Any]:
+        return {provider.name: provider.stats() for provider in self.providers}
+
+
+def _provider_models() -> List[Tuple[str, Optional[str]]]:
+    models = {"openrouter": settings.OPEN_ROUTER_MODEL, "groq": settings.GROQ_MODEL}
+    return [(name.strip(), models.get(name.strip())) for name in settings.LLM_PROVIDERS.split(",") if name.strip()]
+
+
+@lru_cache
+def get_chat_llm(temperature: float = 0.0) -> ProviderRouter:
+    """The app's chat model: every provider in LLM_PROVIDERS that has a model configured, in that order."""
+    providers = [
+        Provider(name, get_llm(name, model, temperature))
+        for name, model in _provider_models()
+        if model
+    ]
+    return ProviderRouter(providers)
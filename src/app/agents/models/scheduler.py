@@ -0,0 +1,592 @@
+from collections import OrderedDict, deque
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from threading import Event, Lock
+from typing import Any, Deque, Dict, Optional, Tuple
+
+import redis
+import redis.asyncio
+
+from app.agents.cache import get_async_redis, get_redis
+from app.agents.metrics import LatencyWindow, register_metrics
+from app.agents.models.provider_router import ProvidersUnavailableError, get_chat_llm
+from app.config import get_settings
+
+import asyncio
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# KEYS[1] bucket hash, KEYS[2] pause key set after a provider 429.
+# ARGV[1] tokens per second, ARGV[2] capacity. Returns 0 when a token was
+# taken, otherwise the milliseconds to wait before asking again.
+TOKEN_BUCKET_SCRIPT = """
+local paused = redis.call('PTTL', KEYS[2])
+if paused > 0 then
+    return paused
+end
+
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+if rate <= 0 then
+    return 0
+end
+
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+
+tokens = math.min(capacity, tokens + (now - ts) * rate / 1000)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 - tokens) * 1000 / rate)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity * 1000 / rate) + 1000)
+return wait
+"""
+
+
+class LLMBusyError(Exception):
+    """The LLM can't take the request now: the queue is full or timed out, the providers keep answering 429 or every breaker is open."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Retry-After (or retry-after-ms) of the provider response behind an SDK error, None when absent."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            # HTTP-date form
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    return _status_code(error) == 429
+
+
+class TokenBucket():
+    """Requests-per-minute bucket shared by every worker through Redis, kept per process when Redis is unavailable.
+
+    pause() holds every worker off for a while, used when a provider
+    answers 429 with Retry-After. A zero rpm disables the bucket but
+    still honours pauses. atake() and apause() are the event loop
+    versions, on async_client or in a thread when there is none.
+    """
+
+    def __init__(
+            self,
+            rpm: float = settings.LLM_RATE_LIMIT_RPM,
+            burst: int = settings.LLM_RATE_LIMIT_BURST,
+            redis_client: Optional[redis.Redis] = None,
+            key: str = "kasbi:llm:bucket",
+            async_client: Optional[redis.asyncio.Redis] = None,
+    ):
+        self.rate = rpm / 60
+        self.capacity = max(burst, 1)
+        self.redis = redis_client
+        self.async_client = async_client
+        self.key = key
+        self.pause_key = f"{key}:pause"
+        self._script = redis_client.register_script(TOKEN_BUCKET_SCRIPT) if redis_client is not None else None
+        self._ascript = async_client.register_script(TOKEN_BUCKET_SCRIPT) if async_client is not None else None
+
+        self._lock = Lock()
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self.redis_errors = 0
+
+    def take(self) -> float:
+        """Take one token, returns 0 or the seconds to wait before trying again."""
+        if self._script is not None:
+            try:
+                return self._script(keys=[self.key, self.pause_key], args=[self.rate, self.capacity]) / 1000
+            except redis.RedisError as e:
+                self.redis_errors += 1
+                logger.debug("Redis token bucket unavailable, limiting per process: %s", e)
+        return self._take_local()
+
+    async def atake(self) -> float:
+        if self._ascript is None:
+            return await asyncio.to_thread(self.take) if self._script is not None else self._take_local()
+
+        try:
+            return await self._ascript(keys=[self.key, self.pause_key], args=[self.rate, self.capacity]) / 1000
+        except redis.RedisError as e:
+            self.redis_errors += 1
+            logger.debug("Redis token bucket unavailable, limiting per process: %s", e)
+        return self._take_local()
+
+    def _take_local(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            if self._paused_until > now:
+                return self._paused_until - now
+            if self.rate <= 0:
+                return 0.0
+
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def _pause_local(self, seconds: float) -> None:
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def pause(self, seconds: float) -> None:
+        self._pause_local(seconds)
+        if self.redis is not None:
+            try:
+                self.redis.set(self.pause_key, 1, px=max(int(seconds * 1000), 1))
+            except redis.RedisError as e:
+                self.redis_errors += 1
+                logger.debug("Failed to share LLM pause through Redis: %s", e)
+
+    async def apause(self, seconds: float) -> None:
+        if self.async_client is None:
+            if self.redis is not None:
+                return await asyncio.to_thread(self.pause, seconds)
+            return self._pause_local(seconds)
+
+        self._pause_local(seconds)
+        try:
+            await self.async_client.set(self.pause_key, 1, px=max(int(seconds * 1000), 1))
+        except redis.RedisError as e:
+            self.redis_errors += 1
+            logger.debug("Failed to share LLM pause through Redis: %s", e)
+
+
+class _Waiter():
+    """A request queued for a concurrency slot, woken from whichever thread releases one."""
+
+    def __init__(self, caller: Tuple[str, str], loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.caller = caller
+        self.granted = False
+        self.loop = loop
+        self.event = Event() if loop is None else None
+        self.future = loop.create_future() if loop is not None else None
+
+    def grant(self) -> None:
+        # Called under the scheduler lock
+        self.granted = True
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self) -> None:
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class LLMScheduler():
+    """App-wide admission control in front of the chat LLM.
+
+    At most max_concurrency calls run at once per process. Requests over
+    that wait in a fair queue: channels (web, whatsapp, ...) take turns,
+    and within a channel users take turns, so one busy user or a burst of
+    WhatsApp traffic can't starve everyone else. An admitted call also
+    takes a token from the Redis bucket shared by all workers, and so does
+    each hedge the router sends. Cached completions are answered before
+    admission and take neither a slot nor a token. A provider 429 pauses
+    the bucket for its Retry-After and the call is retried with backoff.
+    Requests that can't be served in time raise LLMBusyError instead of
+    piling up.
+    """
+
+    def __init__(
+            self,
+            llm,
+            max_concurrency: int = settings.LLM_MAX_CONCURRENCY,
+            max_queue: int = settings.LLM_QUEUE_MAX,
+            queue_timeout: float = settings.LLM_QUEUE_TIMEOUT,
+            max_retries: int = settings.LLM_RATE_LIMIT_RETRIES,
+            backoff_base: float = settings.LLM_BACKOFF_BASE,
+            backoff_max: float = settings.LLM_BACKOFF_MAX,
+            bucket: Optional[TokenBucket] = None,
+    ):
+        self.llm = llm
+        self.model = llm.model
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.bucket = bucket or TokenBucket()
+
+        self._lock = Lock()
+        self._queues: "OrderedDict[str, OrderedDict[str, Deque[_Waiter]]]" = OrderedDict()
+        self.active = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.wait = LatencyWindow()
+        self.counts = {"admitted": 0, "queued_total": 0, "rejected": 0, "timeouts": 0, "throttled": 0, "rate_limited": 0, "retries": 0, "cache_hits": 0}
+
+        register_metrics("llm_scheduler", self.stats)
+
+    def for_caller(self, channel: str, user: Any = "-") -> "ScheduledLLM":
+        return ScheduledLLM(self, (channel, str(user)))
+
+    # --- concurrency slots ---
+
+    def _enqueue(self, waiter: _Waiter) -> bool:
+        """Take a slot right away (True) or queue the waiter (False)."""
+        with self._lock:
+            if self.active < self.max_concurrency and not self.queued:
+                self.active += 1
+                return True
+
+            if self.queued >= self.max_queue:
+                self.counts["rejected"] += 1
+                raise LLMBusyError("LLM queue is full", self._retry_hint())
+
+            channel, user = waiter.caller
+            self._queues.setdefault(channel, OrderedDict()).setdefault(user, deque()).append(waiter)
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+            self.counts["queued_total"] += 1
+            return False
+
+    def _dispatch(self) -> None:
+        # Called under the lock, hands free slots out round robin over channels, then users
+        while self.active < self.max_concurrency and self._queues:
+            channel, users = next(iter(self._queues.items()))
+            user, waiters = next(iter(users.items()))
+            waiter = waiters.popleft()
+
+            if waiters:
+                users.move_to_end(user)
+            else:
+                del users[user]
+            if users:
+                self._queues.move_to_end(channel)
+            else:
+                del self._queues[channel]
+
+            self.queued -= 1
+            self.active += 1
+            waiter.grant()
+
+    def _dequeue(self, waiter: _Waiter) -> None:
+        # Called under the lock for a waiter that gave up before being granted
+        channel, user = waiter.caller
+        users = self._queues[channel]
+        users[user].remove(waiter)
+        if not users[user]:
+            del users[user]
+        if not users:
+            del self._queues[channel]
+        self.queued -= 1
+
+    def _release(self) -> None:
+        with self._lock:
+            self.active -= 1
+            self._dispatch()
+
+    def _acquire(self, caller: Tuple[str, str]) -> None:
+        waiter = _Waiter(caller)
+        if self._enqueue(waiter):
+            return
+
+        if waiter.event.wait(self.queue_timeout):
+            return
+        with self._lock:
+            if waiter.granted:
+                # Granted right as the wait timed out
+                return
+            self._dequeue(waiter)
+            self.counts["timeouts"] += 1
+        raise LLMBusyError("Timed out waiting for the LLM", self._retry_hint())
+
+    async def _aacquire(self, caller: Tuple[str, str]) -> None:
+        waiter = _Waiter(caller, asyncio.get_running_loop())
+        if self._enqueue(waiter):
+            return
+
+        try:
+            await asyncio.wait_for(waiter.future, self.queue_timeout)
+        except BaseException as e:
+            timed_out = isinstance(e, asyncio.TimeoutError)
+            with self._lock:
+                if waiter.granted:
+                    if timed_out:
+                        return
+                    # Cancelled after being granted, the slot goes to the next waiter
+                    self.active -= 1
+                    self._dispatch()
+                else:
+                    self._dequeue(waiter)
+                    if timed_out:
+                        self.counts["timeouts"] += 1
+            if timed_out:
+                raise LLMBusyError("Timed out waiting for the LLM", self._retry_hint()) from None
+            raise
+
+    # --- admission: slot + rate limit token ---
+
+    def _admit(self, caller: Tuple[str, str]) -> None:
+        start = time.monotonic()
+        self._acquire(caller)
+        try:
+            while (delay := self.bucket.take()) > 0:
+                self._throttled(start, delay)
+                time.sleep(delay)
+        except BaseException:
+            self._release()
+            raise
+        self._admitted(start)
+
+    async def _aadmit(self, caller: Tuple[str, str]) -> None:
+        start = time.monotonic()
+        await self._aacquire(caller)
+        try:
+            while (delay := await self.bucket.atake()) > 0:
+                self._throttled(start, delay)
+                await asyncio.sleep(delay)
+        except BaseException:
+            self._release()
+            raise
+        self._admitted(start)
+
+    def _throttled(self, start: float, delay: float) -> None:
+        with self._lock:
+            self.counts["throttled"] += 1
+        if time.monotonic() - start + delay > self.queue_timeout:
+            raise LLMBusyError("LLM rate limit reached", delay)
+
+    def _admitted(self, start: float) -> None:
+        self.wait.record((time.monotonic() - start) * 1000)
+        with self._lock:
+            self.counts["admitted"] += 1
+
+    def _admit_hedge(self) -> bool:
+        """A hedge is a second provider request and takes its own token, it is skipped rather than waiting for one."""
+        return self.bucket.take() <= 0
+
+    async def _aadmit_hedge(self) -> bool:
+        return await self.bucket.atake() <= 0
+
+    # --- retries ---
+
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Seconds to back off before retrying a rate limited call, None when the error isn't a 429."""
+        if not self._rate_limited(error):
+            return None
+
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            # Every worker holds off, not only this request
+            self.bucket.pause(retry_after)
+        return self._backoff(error, attempt, retry_after)
+
+    async def _aretry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        if not self._rate_limited(error):
+            return None
+
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            await self.bucket.apause(retry_after)
+        return self._backoff(error, attempt, retry_after)
+
+    def _rate_limited(self, error: Exception) -> bool:
+        if isinstance(error, ProvidersUnavailableError):
+            # Every breaker is open, answered like a full queue instead of a failure
+            raise LLMBusyError(str(error), error.retry_after) from error
+        return is_rate_limited(error)
+
+    def _backoff(self, error: Exception, attempt: int, retry_after: Optional[float]) -> float:
+        backoff = min(self.backoff_base * 2 ** attempt, self.backoff_max) * random.uniform(0.5, 1.0)
+        delay = max(retry_after or 0.0, backoff)
+
+        with self._lock:
+            self.counts["rate_limited"] += 1
+            if attempt >= self.max_retries or delay > self.backoff_max:
+                raise LLMBusyError("LLM providers are rate limiting", delay) from error
+            self.counts["retries"] += 1
+
+        logger.warning("LLM rate limited, retrying in %.2fs (attempt %d): %s", delay, attempt + 1, error)
+        return delay
+
+    def _retry_hint(self) -> float:
+        p95 = self.wait.percentile(95)
+        return max(p95 / 1000 if p95 is not None else 0.0, 1.0)
+
+    # --- ChatModel interface, per caller ---
+
+    def _cache_hit(self, cached: Any) -> Any:
+        if cached is not None:
+            with self._lock:
+                self.counts["cache_hits"] += 1
+        return cached
+
+    def invoke(self, caller: Tuple[str, str], message: str, system_template: str, user_template: str, prompt_format: dict = {}):
+        cached = self._cache_hit(self.llm.cached(message, system_template, user_template, prompt_format))
+        if cached is not None:
+            return cached
+
+        for attempt in range(self.max_retries + 1):
+            self._admit(caller)
+            try:
+                return self.llm.invoke(
+                    message, system_template, user_template, prompt_format,
+                    cache_lookup=False, admit_hedge=self._admit_hedge,
+                )
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                self._release()
+            time.sleep(delay)
+
+    async def ainvoke(self, caller: Tuple[str, str], message: str, system_template: str, user_template: str, prompt_format: dict = {}):
+        cached = self._cache_hit(await self.llm.acached(message, system_template, user_template, prompt_format))
+        if cached is not None:
+            return cached
+
+        for attempt in range(self.max_retries + 1):
+            await self._aadmit(caller)
+            try:
+                return await self.llm.ainvoke(
+                    message, system_template, user_template, prompt_format,
+                    cache_lookup=False, admit_hedge=self._aadmit_hedge,
+                )
+            except Exception as e:
+                delay = await self._aretry_delay(e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                self._release()
+            await asyncio.sleep(delay)
+
+    def stream(self, caller: Tuple[str, str], message: str, system_template: str, user_template: str, prompt_format: dict = {}):
+        """The slot is held until the stream ends, a stream is only retried if nothing was yielded yet."""
+        cached = self._cache_hit(self.llm.cached(message, system_template, user_template, prompt_format))
+        if cached is not None:
+            yield cached
+            return
+
+        for attempt in range(self.max_retries + 1):
+            self._admit(caller)
+            started = False
+            try:
+                for chunk in self.llm.stream(message, system_template, user_template, prompt_format, cache_lookup=False):
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                if started:
+                    raise
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                self._release()
+            time.sleep(delay)
+
+    async def astream(self, caller: Tuple[str, str], message: str, system_template: str, user_template: str, prompt_format: dict = {}):
+        cached = self._cache_hit(await self.llm.acached(message, system_template, user_template, prompt_format))
+        if cached is not None:
+            yield cached
+            return
+
+        for attempt in range(self.max_retries + 1):
+            await self._aadmit(caller)
+            started = False
+            try:
+                async for chunk in self.llm.astream(message, system_template, user_template, prompt_format, cache_lookup=False):
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                if started:
+                    raise
+                delay = await self._aretry_delay(e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                self._release()
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            by_channel = {channel: sum(len(waiters) for waiters in users.values()) for channel, users in self._queues.items()}
+            snapshot = {
+                "active": self.active,
+                "queued": self.queued,
+                "max_queued": self.max_queued,
+                "max_concurrency": self.max_concurrency,
+                "queued_by_channel": by_channel,
+                **self.counts,
+            }
+        wait = self.wait.stats()
+        return {
+            **snapshot,
+            "wait_p50_ms": wait["p50_ms"],
+            "wait_p95_ms": wait["p95_ms"],
+            "redis_errors": self.bucket.redis_errors,
+        }
+
+
+class ScheduledLLM():
+    """ChatModel interface over the scheduler for one caller, this is what the endpoints put in the graph config."""
+
+    def __init__(self, scheduler: LLMScheduler, caller: Tuple[str, str]):
+        self.scheduler = scheduler
+        self.caller = caller
+        self.model = scheduler.model
+
+    def invoke(self, message: str, system_template: str, user_template: str, prompt_format: dict = {}):
+        return self.scheduler.invoke(self.caller, message, system_template, user_template, prompt_format)
+
+    async def ainvoke(self, message: str, system_template: str, user_template: str, prompt_format: dict = {}):
+        return await self.scheduler.ainvoke(self.caller, message, system_template, user_template, prompt_format)
+
+    def stream(self, message: str, system_template: str, user_template: str, prompt_format: dict = {}):
+        yield from self.scheduler.stream(self.caller, message, system_template, user_template, prompt_format)
+
+    async def astream(self, message: str, system_template: str, user_template: str, prompt_format: dict = {}):
+        async for chunk in self.scheduler.astream(self.caller, message, system_template, user_template, prompt_format):
+            yield chunk
+
+
+@lru_cache
+def get_llm_scheduler() -> LLMScheduler:
+    """The process-wide scheduler in front of get_chat_llm(), its token bucket is shared through Redis when configured."""
+    return LLMScheduler(get_chat_llm(), bucket=TokenBucket(redis_client=get_redis(), async_client=get_async_redis()))
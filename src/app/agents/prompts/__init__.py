@@ -1 +1 @@
-from app.agents.prompts.prompts import GROQ_SYSTEM_TEMPLATE, GROQ_STRUCTURED_SYSTEM_TEMPLATE, GROQ_USER_TEMPLATE
\ No newline at end of file
+from app.agents.prompts.prompts import GROQ_SYSTEM_TEMPLATE, GROQ_STRUCTURED_SYSTEM_TEMPLATE, GROQ_USER_TEMPLATE, ROUTER_SYSTEM_TEMPLATE, ROUTER_USER_TEMPLATE, MEMORY_SUMMARY_SYSTEM_TEMPLATE, MEMORY_SUMMARY_USER_TEMPLATE
\ No newline at end of file
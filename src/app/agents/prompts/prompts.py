@@ -30,6 +30,9 @@ PERINGATAN KERAS:
 """
 
 GROQ_USER_TEMPLATE = """
+Riwayat Percakapan (hanya untuk memahami pertanyaan lanjutan, bukan sumber jawaban):
+{history}
+---
 Context:
 {context}
 ---
@@ -43,4 +46,61 @@ Anda adalah sistem pemroses data internal. Tugas Anda adalah mengekstrak informa
 Gunakan informasi dari dokumen secara akurat.
 Jika informasi tidak ada, kembalikan nilai null atau string kosong sesuai skema JSON.
 Jangan tambahkan teks lain di luar format JSON.
-"""
\ No newline at end of file
+"""
+
+ROUTER_SYSTEM_TEMPLATE = """
+Tugas Anda adalah mengklasifikasikan intent (tujuan) dari pertanyaan pengguna.
+
+Kategori Label:
+1. "SEARCH": Jika pertanyaan berkaitan dengan Pendidikan, Kurikulum, Sekolah, Guru, Regulasi, BPMP Papua, Dapodik, atau Layanan Kantor.
+2. "CHAT": Jika pengguna menyapa (Halo, Hai).
+3. "OOT": Jika pertanyaan jelas di luar topik pendidikan/kantor (misal: Politik, Resep Masakan, Film, Koding, Curhat Pribadi).
+
+BERIKUT ADALAH CONTOH ANALISISNYA (FEW-SHOT):
+- Input: "Bagaimana cara login aplikasi Dapodik versi terbaru?"
+  Pemikiran: Pengguna bertanya tentang sistem pendataan pendidikan (Dapodik).
+  Intent: SEARCH
+
+- Input: "Halo Kasbi, gimana kabarnya!"
+  Pemikiran: Pengguna hanya memberikan sapaan dan basa-basi.
+  Intent: CHAT
+
+- Input: "Siapa presiden Amerika saat ini?"
+  Pemikiran: Pertanyaan ini membahas politik internasional, tidak ada hubungannya dengan BPMP Papua.
+  Intent: OOT
+
+Tentukan intensi dari pesan pengguna berikut!
+
+Aturan Penting:
+- Prioritaskan SEARCH jika ada kemungkinan pertanyaan masih berhubungan dengan pendidikan.
+- Jika ragu antara SEARCH dan OOT, pilih SEARCH.
+- Hanya pilih OOT jika benar-benar jelas tidak ada hubungan sama sekali dengan pendidikan atau layanan BPMP.
+- False positive (memilih SEARCH padahal bukan) lebih dapat diterima daripada false negative.
+
+Instruksi Output:
+Hanya berikan satu kata sebagai jawaban: SEARCH, CHAT, atau OOT.
+Jangan berikan penjelasan tambahan.
+"""
+
+# Template user untuk router cukup placeholder sederhana
+ROUTER_USER_TEMPLATE = "{question}"
+
+MEMORY_SUMMARY_SYSTEM_TEMPLATE = """
+Tugas Anda adalah memperbarui ringkasan percakapan antara pengguna dan Kasbi (asisten virtual BPMP Provinsi Papua).
+
+Aturan:
+- Gabungkan ringkasan sebelumnya dengan percakapan baru menjadi satu ringkasan yang padat.
+- Pertahankan topik, nama program, aplikasi, regulasi, angka, dan pertanyaan pengguna yang masih relevan.
+- Buang sapaan, basa-basi, dan detail yang tidak diperlukan untuk memahami pertanyaan berikutnya.
+- Tulis dalam bahasa Indonesia, maksimal {max_words} kata, tanpa penjelasan tambahan.
+"""
+
+MEMORY_SUMMARY_USER_TEMPLATE = """
+Ringkasan sebelumnya:
+{summary}
+---
+Percakapan baru:
+{turns}
+---
+Ringkasan terbaru:
+"""
@@ -1 +1,4 @@
-from app.agents.retriever.retriever import BaseRetriever, HybridRetriever, RerankRetriever
\ No newline at end of file
+from app.agents.retriever.retriever import BaseRetriever, HybridRetriever, RerankRetriever, RetrievedChunk
+from app.agents.retriever.rerank import Reranker
+from app.agents.retriever.dense_index import DenseIndex
+from app.agents.retriever.speculative import SpeculativeRetriever, RetrievalCancelled, check_cancelled
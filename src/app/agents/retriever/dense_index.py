@@ -0,0 +1,364 @@
+from pathlib import Path
+from threading import Lock
+from typing import Literal, NamedTuple, Optional, Tuple
+
+from sqlmodel import Session, select, func
+
+from app.models.document import DocumentVector
+from app.agents.database import get_corpus_version
+from app.agents.metrics import register_metrics
+from app.config import get_settings
+
+import json
+import logging
+import os
+import time
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows dev machines, single process only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Rows are scored in slices so a float16 matrix never gets upcast in one piece
+SEARCH_CHUNK_ROWS = 65536
+SYNC_BATCH_ROWS = 5000
+# Id range per reconcile checksum, only ranges whose checksum differs get their ids fetched
+SYNC_BUCKET_IDS = 65536
+COMPACT_TOMBSTONE_RATIO = 0.25
+
+
+class _Snapshot(NamedTuple):
+    matrix: np.ndarray
+    ids: np.ndarray
+    alive: np.ndarray
+    generation: int
+    count: int
+
+
+class DenseIndex():
+    """Exact in-process search over a memory-mapped copy of document_vectors.dense_embedding.
+
+    Files live in one directory shared by every uvicorn worker. Each
+    generation has an append-only embedding matrix and an id array, plus a
+    tombstone list of deleted ids. meta.json is replaced atomically and
+    says how many rows of the current generation are valid. One worker
+    syncs under a file lock. The others just re-map the files, so the pages
+    are shared read-only through the OS page cache.
+    """
+
+    def __init__(
+            self,
+            directory: Path = settings.VECTOR_DB_DIRECTORY / "dense_index",
+            dim: int = 384,
+            dtype: Literal["float32", "float16"] = settings.DENSE_INDEX_DTYPE,
+            sync_interval: float = settings.DENSE_INDEX_SYNC_INTERVAL,
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.sync_interval = sync_interval
+
+        self._snapshot: Optional[_Snapshot] = None
+        self._synced_version: Optional[int] = None
+        self._checked_at = 0.0
+        self._lock = Lock()
+
+        register_metrics("dense_index", self.stats)
+
+    # ---- reading -------------------------------------------------------
+
+    def search(self, query_embedding, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k (ids, normalized embeddings) by cosine similarity, best first."""
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.count == 0:
+            return np.empty(0, dtype=np.int64), np.empty((0, self.dim), dtype=np.float32)
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / np.linalg.norm(query)
+
+        scores = np.empty(snapshot.count, dtype=np.float32)
+        for start in range(0, snapshot.count, SEARCH_CHUNK_ROWS):
+            end = min(start + SEARCH_CHUNK_ROWS, snapshot.count)
+            scores[start:end] = snapshot.matrix[start:end].astype(np.float32, copy=False) @ query
+        scores[~snapshot.alive] = -np.inf
+
+        k = min(k, int(snapshot.alive.sum()))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty((0, self.dim), dtype=np.float32)
+
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        return np.asarray(snapshot.ids[top]), snapshot.matrix[top].astype(np.float32)
+
+    def ensure_synced(self, session: Session) -> None:
+        """Catch up with the database at most once per sync_interval.
+
+        Between checks the mirror can miss rows inserted in the meantime.
+        It never serves deleted chunks, because content is always fetched
+        from document_vectors by id.
+        """
+        now = time.monotonic()
+        if self._snapshot is not None and now - self._checked_at < self.sync_interval:
+            return
+
+        with self._lock:
+            if self._snapshot is not None and time.monotonic() - self._checked_at < self.sync_interval:
+                return
+
+            corpus_version = get_corpus_version(session)
+            if corpus_version != self._synced_version:
+                self.sync(session, corpus_version)
+            self._checked_at = time.monotonic()
+
+    def stats(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {"loaded": False}
+
+        return {
+            "loaded": True,
+            "generation": snapshot.generation,
+            "rows": snapshot.count,
+            "live_rows": int(snapshot.alive.sum()),
+            "dtype": str(self.dtype),
+            "matrix_bytes": snapshot.count * self.dim * self.dtype.itemsize,
+            "corpus_version": self._synced_version,
+        }
+
+    # ---- writing -------------------------------------------------------
+
+    def sync(self, session: Session, corpus_version: Optional[int] = None) -> None:
+        if corpus_version is None:
+            corpus_version = get_corpus_version(session)
+
+        with self._file_lock():
+            meta = self._read_meta()
+
+            if meta["corpus_version"] != corpus_version:
+                meta = self._append_new_rows(session, meta)
+                meta = self._reconcile(session, meta)
+
+                if meta["tombstones"] > COMPACT_TOMBSTONE_RATIO * max(meta["count"], 1):
+                    meta = self._compact(meta)
+
+                meta["corpus_version"] = corpus_version
+                self._write_meta(meta)
+
+        self._load(meta)
+        self._synced_version = corpus_version
+
+    def _append_new_rows(self, session: Session, meta: dict) -> dict:
+        # Drop anything a crashed sync appended past the last committed meta.json
+        with open(self._path("embeddings", meta["generation"]), "ab") as embeddings_file, \
+                open(self._path("ids", meta["generation"]), "ab") as ids_file:
+            embeddings_file.truncate(meta["count"] * self.dim * self.dtype.itemsize)
+            ids_file.truncate(meta["count"] * np.dtype(np.int64).itemsize)
+
+        watermark = meta["watermark"]
+        while True:
+            rows = session.exec(
+                select(DocumentVector.id, DocumentVector.dense_embedding)
+                .where(DocumentVector.id > watermark)
+                .order_by(DocumentVector.id)
+                .limit(SYNC_BATCH_ROWS)
+            ).all()
+            if not rows:
+                break
+
+            meta = self._write_rows(meta, rows)
+            watermark = int(rows[-1][0])
+
+        meta["watermark"] = watermark
+        return meta
+
+    def _write_rows(self, meta: dict, rows) -> dict:
+        ids = np.array([row[0] for row in rows], dtype=np.int64)
+        embeddings = np.array([row[1].to_numpy() for row in rows], dtype=np.float32)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+        with open(self._path("embeddings", meta["generation"]), "ab") as embeddings_file, \
+                open(self._path("ids", meta["generation"]), "ab") as ids_file:
+            embeddings_file.write(embeddings.astype(self.dtype).tobytes())
+            ids_file.write(ids.tobytes())
+
+            embeddings_file.flush()
+            ids_file.flush()
+            os.fsync(embeddings_file.fileno())
+            os.fsync(ids_file.fileno())
+
+        meta["count"] += len(ids)
+        return meta
+
+    def _reconcile(self, session: Session, meta: dict) -> dict:
+        """Bring ids at or below the watermark in line with the table.
+
+        A row from a transaction that commits after a higher id was
+        already mirrored lands below the watermark, and deleted rows
+        vanish from below it. The database returns a (count, sum of ids)
+        checksum per SYNC_BUCKET_IDS range, so only ranges that changed
+        get their ids fetched, instead of the whole id set every sync.
+        """
+        if meta["watermark"] == 0:
+            return meta
+
+        mirrored_ids = np.array(self._map_ids(meta))
+        tombstones = self._load_tombstones(meta["generation"])
+        mirrored_ids = mirrored_ids[~np.isin(mirrored_ids, tombstones)]
+
+        bucket = DocumentVector.id // SYNC_BUCKET_IDS
+        live = {
+            int(row[0]): (int(row[1]), int(row[2]))
+            for row in session.exec(
+                select(bucket, func.count(), func.sum(DocumentVector.id))
+                .where(DocumentVector.id <= meta["watermark"])
+                .group_by(bucket)
+            ).all()
+        }
+
+        mirrored_buckets = mirrored_ids // SYNC_BUCKET_IDS
+        buckets, inverse, counts = np.unique(mirrored_buckets, return_inverse=True, return_counts=True)
+        # Float sums stay exact, a bucket's ids add up to well under 2**53
+        totals = np.bincount(inverse, weights=mirrored_ids, minlength=len(buckets))
+        mirrored = {int(b): (int(count), int(total)) for b, count, total in zip(buckets, counts, totals)}
+
+        vanished, missing = [], []
+        for b in sorted(set(live) | set(mirrored)):
+            if live.get(b) == mirrored.get(b):
+                continue
+
+            low, high = b * SYNC_BUCKET_IDS, min((b + 1) * SYNC_BUCKET_IDS - 1, meta["watermark"])
+            live_ids = np.array(
+                session.exec(select(DocumentVector.id).where(DocumentVector.id.between(low, high))).all(),
+                dtype=np.int64,
+            )
+            in_bucket = mirrored_ids[mirrored_buckets == b]
+            vanished.append(in_bucket[~np.isin(in_bucket, live_ids)])
+            missing.extend(int(i) for i in live_ids[~np.isin(live_ids, in_bucket)])
+
+        for start in range(0, len(missing), SYNC_BATCH_ROWS):
+            rows = session.exec(
+                select(DocumentVector.id, DocumentVector.dense_embedding)
+                .where(DocumentVector.id.in_(missing[start:start + SYNC_BATCH_ROWS]))
+                .order_by(DocumentVector.id)
+            ).all()
+            if rows:
+                meta = self._write_rows(meta, rows)
+
+        if vanished:
+            tombstones = np.union1d(tombstones, np.concatenate(vanished))
+            path = self._path("tombstones", meta["generation"], ".npy")
+            with open(self._tmp(path), "wb") as tombstones_file:
+                np.save(tombstones_file, tombstones)
+            os.replace(self._tmp(path), path)
+
+        meta["tombstones"] = len(tombstones)
+        return meta
+
+    def _compact(self, meta: dict) -> dict:
+        old_generation = meta["generation"]
+        new_generation = old_generation + 1
+
+        matrix = self._map_matrix(meta)
+        ids = self._map_ids(meta)
+        alive = ~np.isin(ids, self._load_tombstones(old_generation))
+
+        with open(self._path("embeddings", new_generation), "wb") as embeddings_file, \
+                open(self._path("ids", new_generation), "wb") as ids_file:
+            for start in range(0, meta["count"], SEARCH_CHUNK_ROWS):
+                end = min(start + SEARCH_CHUNK_ROWS, meta["count"])
+                embeddings_file.write(np.ascontiguousarray(matrix[start:end][alive[start:end]]).tobytes())
+                ids_file.write(np.ascontiguousarray(ids[start:end][alive[start:end]]).tobytes())
+
+            os.fsync(embeddings_file.fileno())
+            os.fsync(ids_file.fileno())
+
+        np.save(self._path("tombstones", new_generation, ".npy"), np.empty(0, dtype=np.int64))
+
+        # Readers still mapping the old generation keep their file handles, unlinking is safe on POSIX
+        for name, suffix in (("embeddings", ".bin"), ("ids", ".bin"), ("tombstones", ".npy")):
+            self._path(name, old_generation, suffix).unlink(missing_ok=True)
+
+        return {**meta, "generation": new_generation, "count": int(alive.sum()), "tombstones": 0}
+
+    # ---- files ---------------------------------------------------------
+
+    def _load(self, meta: dict) -> None:
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.generation == meta["generation"] and snapshot.count == meta["count"] \
+                and self._synced_version == meta["corpus_version"]:
+            return
+
+        matrix = self._map_matrix(meta)
+        ids = self._map_ids(meta)
+        alive = ~np.isin(ids, self._load_tombstones(meta["generation"]))
+
+        self._snapshot = _Snapshot(matrix, ids, alive, meta["generation"], meta["count"])
+
+    def _map_matrix(self, meta: dict) -> np.ndarray:
+        if meta["count"] == 0:
+            return np.empty((0, self.dim), dtype=self.dtype)
+        return np.memmap(self._path("embeddings", meta["generation"]), dtype=self.dtype, mode="r", shape=(meta["count"], self.dim))
+
+    def _map_ids(self, meta: dict) -> np.ndarray:
+        if meta["count"] == 0:
+            return np.empty(0, dtype=np.int64)
+        return np.memmap(self._path("ids", meta["generation"]), dtype=np.int64, mode="r", shape=(meta["count"],))
+
+    def _load_tombstones(self, generation: int) -> np.ndarray:
+        path = self._path("tombstones", generation, ".npy")
+        return np.load(path) if path.exists() else np.empty(0, dtype=np.int64)
+
+    def _read_meta(self) -> dict:
+        path = self.directory / "meta.json"
+        if path.exists():
+            meta = json.loads(path.read_text())
+            if meta["dtype"] == str(self.dtype) and meta["dim"] == self.dim:
+                return meta
+            logger.info("Dense index layout changed, rebuilding %s", self.directory)
+
+        return {"generation": self._next_free_generation(), "dtype": str(self.dtype), "dim": self.dim,
+                "count": 0, "watermark": 0, "tombstones": 0, "corpus_version": None}
+
+    def _write_meta(self, meta: dict) -> None:
+        path = self.directory / "meta.json"
+        self._tmp(path).write_text(json.dumps(meta))
+        os.replace(self._tmp(path), path)
+
+    def _next_free_generation(self) -> int:
+        generations = [int(path.name.split(".")[1]) for path in self.directory.glob("embeddings.*.bin")]
+        return max(generations, default=-1) + 1
+
+    def _path(self, name: str, generation: int, suffix: str = ".bin") -> Path:
+        return self.directory / f"{name}.{generation}{suffix}"
+
+    def _tmp(self, path: Path) -> Path:
+        return path.with_name(path.name + f".{os.getpid()}.tmp")
+
+    def _file_lock(self):
+        return _FileLock(self.directory / "sync.lock")
+
+
+class _FileLock():
+    """Exclusive flock so only one process syncs the shared files at a time."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.file = None
+
+    def __enter__(self):
+        self.file = open(self.path, "a")
+        if fcntl is not None:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+        self.file.close()
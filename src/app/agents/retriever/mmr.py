@@ -0,0 +1,47 @@
+from typing import List
+
+import numpy as np
+
+
+def mmr(embed_query, doc_embeddings, k: int, lambda_mult: float = 0.5) -> List[int]:
+    """Maximal marginal relevance over a candidate set.
+
+    Every vector is normalized once and the candidate-by-candidate similarity
+    matrix is computed in a single matmul. A running max-similarity vector
+    against the already selected documents keeps each selection step O(n).
+    """
+    doc_embeddings = np.asarray(doc_embeddings, dtype=np.float64)
+    n = len(doc_embeddings)
+    if n == 0 or k <= 0:
+        return []
+
+    embed_query = np.asarray(embed_query, dtype=np.float64)
+    embed_query = embed_query / np.linalg.norm(embed_query)
+    doc_embeddings = doc_embeddings / np.linalg.norm(doc_embeddings, axis=1, keepdims=True)
+
+    sim_to_query = doc_embeddings @ embed_query
+    sim_matrix = doc_embeddings @ doc_embeddings.T
+
+    relevance = lambda_mult * sim_to_query
+    redundancy_weight = 1 - lambda_mult
+
+    # Nothing is selected yet, so the first pick is purely by relevance
+    max_sim_to_selected = np.zeros(n)
+    is_selected = np.zeros(n, dtype=bool)
+    selected = []
+
+    for _ in range(min(k, n)):
+        scores = relevance - redundancy_weight * max_sim_to_selected
+        scores[is_selected] = -np.inf
+
+        # argmax returns the lowest index on ties, same as scanning candidates in order
+        best = int(np.argmax(scores))
+        selected.append(best)
+        is_selected[best] = True
+
+        if len(selected) == 1:
+            max_sim_to_selected = sim_matrix[best].copy()
+        else:
+            np.maximum(max_sim_to_selected, sim_matrix[best], out=max_sim_to_selected)
+
+    return selected
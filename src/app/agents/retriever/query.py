@@ -0,0 +1,67 @@
+import re
+
+from app.config import get_settings
+
+settings = get_settings()
+
+_TOKEN_PATTERN = re.compile(r"[^\W_]+")
+
+# Common WhatsApp spellings mapped to the form that appears in the documents
+INDONESIAN_NORMALIZATION = {
+    "yg": "yang", "dgn": "dengan", "dg": "dengan", "utk": "untuk", "tdk": "tidak", "gak": "tidak",
+    "ga": "tidak", "nggak": "tidak", "enggak": "tidak", "gk": "tidak", "tak": "tidak",
+    "gmn": "bagaimana", "gimana": "bagaimana", "bgmn": "bagaimana", "gmna": "bagaimana",
+    "knp": "kenapa", "krn": "karena", "karna": "karena", "sdh": "sudah", "udah": "sudah", "udh": "sudah",
+    "blm": "belum", "bs": "bisa", "sy": "saya", "aq": "aku", "klo": "kalau", "kalo": "kalau",
+    "dr": "dari", "pd": "pada", "tsb": "tersebut", "jg": "juga", "aja": "saja", "tp": "tapi",
+    "sm": "sama", "thn": "tahun", "skrg": "sekarang", "bln": "bulan", "hr": "hari", "trs": "terus",
+    "mksd": "maksud", "mksdnya": "maksudnya", "gimn": "bagaimana", "pake": "pakai", "pakek": "pakai",
+    "sekolh": "sekolah", "dapodk": "dapodik", "kepsek": "kepala sekolah", "guru2": "guru",
+}
+
+# Function words and chat filler that only add noise to a BM25 query
+INDONESIAN_STOP_WORDS = frozenset({
+    "yang", "dan", "di", "ke", "dari", "untuk", "dengan", "ini", "itu", "atau", "pada", "adalah",
+    "saya", "aku", "kami", "kita", "anda", "kamu", "apa", "apakah", "bagaimana", "kenapa", "mengapa",
+    "kapan", "dimana", "mana", "siapa", "berapa", "mohon", "tolong", "bisa", "bisakah", "dapat",
+    "ya", "yah", "dong", "deh", "sih", "kok", "kak", "min", "admin", "pak", "bu", "bapak", "ibu",
+    "halo", "hai", "hallo", "selamat", "pagi", "siang", "sore", "malam", "terima", "kasih", "makasih",
+    "mau", "ingin", "tanya", "bertanya", "nanya", "juga", "saja", "sudah", "belum", "akan", "sedang",
+    "tidak", "bukan", "jika", "kalau", "karena", "agar", "supaya", "tapi", "tetapi", "namun", "lalu",
+    "terus", "sama", "oleh", "sebagai", "dalam", "tersebut", "ada", "nya", "lah", "pun", "para",
+    "the", "a", "an", "of", "to", "in", "and", "is",
+})
+
+
+def normalize_query(query: str) -> str:
+    """Case and whitespace-insensitive form of a query, used as the cache key and as the text that gets embedded."""
+    return " ".join(query.casefold().split())
+
+
+def preprocess_lexical_query(
+        query: str,
+        max_terms: int = settings.LEXICAL_MAX_TERMS,
+        max_chars: int = settings.LEXICAL_MAX_QUERY_CHARS,
+) -> str:
+    """Turn free text into a short BM25 query.
+
+    Normalizes common Indonesian chat spellings, drops stop words and
+    repeated terms and keeps at most max_terms terms, so a long WhatsApp
+    message can't turn into a pathological BM25 query. Returns an empty
+    string when nothing searchable is left.
+    """
+    terms = []
+    seen = set()
+
+    for token in _TOKEN_PATTERN.findall(query[:max_chars].casefold()):
+        for term in INDONESIAN_NORMALIZATION.get(token, token).split():
+            if term in INDONESIAN_STOP_WORDS or term in seen:
+                continue
+
+            seen.add(term)
+            terms.append(term)
+
+            if len(terms) >= max_terms:
+                return " ".join(terms)
+
+    return " ".join(terms)
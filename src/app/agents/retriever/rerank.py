@@ -0,0 +1,51 @@
+from fastembed.rerank.cross_encoder import TextCrossEncoder
+
+from typing import List, Sequence, Tuple
+
+from app.agents.cache import LRUCache
+from app.agents.metrics import register_metrics
+from app.agents.retriever.query import normalize_query
+from app.config import get_settings
+
+import hashlib
+
+settings = get_settings()
+
+
+class Reranker():
+    """Cross-encoder scoring with explicit batching and a (query hash, chunk id) -> score cache."""
+
+    def __init__(
+            self,
+            model_name: str = settings.RERANK_MODEL,
+            batch_size: int = settings.RERANK_BATCH_SIZE,
+            threads: int = settings.RERANK_THREADS,
+            cache_size: int = settings.RERANK_CACHE_SIZE,
+    ):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.model = TextCrossEncoder(model_name=model_name, cache_dir="/models/huggingface", threads=threads)
+
+        # Chunk ids are never reused, so a cached score stays valid for as long as the chunk exists
+        self.score_cache = LRUCache(cache_size)
+        register_metrics("rerank_score_cache", self.score_cache.stats)
+
+    def score(self, query: str, documents: Sequence[Tuple[int, str]]) -> List[float]:
+        # Score the same normalized text the cache is keyed on, as the query embedding does
+        query = normalize_query(query)
+        query_hash = hashlib.sha1(query.encode("utf-8")).hexdigest()
+
+        scores = [self.score_cache.get((query_hash, document_id)) for document_id, _ in documents]
+        missing = [i for i, score in enumerate(scores) if score is None]
+
+        if missing:
+            new_scores = self.model.rerank(
+                query,
+                [documents[i][1] for i in missing],
+                batch_size=self.batch_size,
+            )
+            for i, score in zip(missing, new_scores):
+                scores[i] = float(score)
+                self.score_cache.set((query_hash, documents[i][0]), scores[i])
+
+        return scores
@@ -1,29 +1,108 @@
 from langchain_classic.retrievers.contextual_compression import ContextualCompressionRetriever
 from fastembed import TextEmbedding
-from fastembed.rerank.cross_encoder import TextCrossEncoder
 
-from typing import Union, List, Literal
+from typing import Union, List, Literal, NamedTuple, Optional
 from pathlib import Path
 from sqlmodel import Session, select
-from sqlalchemy import text, bindparam, func
+from sqlalchemy import text, bindparam, func, cast
+from pgvector.sqlalchemy import HALFVEC, BIT
 
 from app.models.document import Document, DocumentVector
-from app.agents.database import VectorDatabase
+from app.agents.database import VectorDatabase, get_corpus_version
+from app.agents.cache import LRUCache, RedisCache, TieredCache, get_redis
+from app.agents.metrics import timer, run_in_context, register_metrics
+from app.agents.retriever.mmr import mmr
+from app.agents.retriever.query import normalize_query, preprocess_lexical_query
+from app.agents.retriever.rerank import Reranker
+from app.agents.retriever.dense_index import DenseIndex
+from app.agents.retriever.speculative import check_cancelled
+from app.database import SessionLocal
 from app.config import get_settings
 
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import sys
 import numpy as np
-import time
-from contextlib import contextmanager
 
-@contextmanager
-def timer(name: str):
-    start = time.perf_counter()
-    yield
-    end = time.perf_counter()
-    print(f"[TIMER] {name}: {(end - start)*1000:.2f} ms")
+settings = get_settings()
 
+RRF_K = 60
+
+# Bound parameters keep the SQL text identical across questions, so psycopg prepares it
+# server-side once per connection and reuses the plan
+LEXICAL_RETRIEVE_STATEMENT = text("""
+    SELECT id, content, content <@> to_bm25query(:query, 'docs_idx') AS score
+    FROM document_vectors
+    ORDER BY score
+    LIMIT :k
+""")
+
+# Semantic candidates straight from the halfvec ANN index
+SEMANTIC_ANN_CANDIDATES = """
+    SELECT id, dense_embedding <=> CAST(:embedding AS halfvec(384)) AS distance
+    FROM document_vectors
+    ORDER BY distance
+    LIMIT :k_semantic
+"""
+
+# Hamming-distance shortlist on the binary-quantized index, rescored with the exact cosine distance
+SEMANTIC_BINARY_CANDIDATES = """
+    SELECT id, dense_embedding <=> CAST(:embedding AS halfvec(384)) AS distance
+    FROM (
+        SELECT id, dense_embedding
+        FROM document_vectors
+        ORDER BY binary_quantize(dense_embedding)::bit(384) <~> binary_quantize(CAST(:embedding AS halfvec(384)))
+        LIMIT :k_shortlist
+    ) AS shortlist
+    ORDER BY distance
+    LIMIT :k_semantic
+"""
+
+# Both rankings and the reciprocal-rank fusion run in one statement, only the fused top k_rrf rows come back
+FUSED_RETRIEVE_TEMPLATE = """
+    WITH semantic AS (
+        SELECT id, row_number() OVER (ORDER BY distance) AS rank
+        FROM ({semantic_candidates}) AS semantic_candidates
+    ),
+    lexical AS (
+        SELECT id, row_number() OVER (ORDER BY score) AS rank
+        FROM (
+            SELECT id, content <@> to_bm25query(:query, 'docs_idx') AS score
+            FROM document_vectors
+            ORDER BY score
+            LIMIT :k_lexical
+        ) AS lexical_candidates
+    ),
+    fused AS (
+        SELECT id, sum(1.0 / (:rrf_k + rank)) AS score
+        FROM (
+            SELECT id, rank FROM semantic
+            UNION ALL
+            SELECT id, rank FROM lexical
+        ) AS rankings
+        GROUP BY id
+    )
+    SELECT document_vectors.id, document_vectors.content, fused.score
+    FROM fused
+    JOIN document_vectors ON document_vectors.id = fused.id
+    ORDER BY fused.score DESC, fused.id
+    LIMIT :k_rrf
+"""
+
+FUSED_RETRIEVE_STATEMENTS = {
+    "ann": text(FUSED_RETRIEVE_TEMPLATE.format(semantic_candidates=SEMANTIC_ANN_CANDIDATES))
+        .bindparams(bindparam("embedding", type_=HALFVEC(384))),
+    "binary": text(FUSED_RETRIEVE_TEMPLATE.format(semantic_candidates=SEMANTIC_BINARY_CANDIDATES))
+        .bindparams(bindparam("embedding", type_=HALFVEC(384))),
+}
+
+class RetrievedChunk(NamedTuple):
+    id: int
+    document_id: int
+    content: str
+    token_count: Optional[int]
 
-settings = get_settings()
 
 class BaseRetriever():
     def __init__(
@@ -31,31 +110,172 @@ class BaseRetriever():
             k: int = 50,
             rank_type: Literal["semantic", "lexical"] = "semantic",
             embedding_model: str = settings.EMBEDDING_MODEL,
+            ef_search: int = settings.HNSW_EF_SEARCH,
+            probes: int = settings.IVFFLAT_PROBES,
+            dense_backend: Literal["sql", "memory"] = settings.DENSE_BACKEND,
+            search_mode: Literal["ann", "binary"] = settings.SEMANTIC_SEARCH_MODE,
+            binary_shortlist_factor: int = settings.BINARY_SHORTLIST_FACTOR,
     ):
         self.k = k
         self.k_fetch = int(k * 1.5)
         self.rank_type = rank_type
+        self.ef_search = ef_search
+        self.probes = probes
+        self.dense_backend = dense_backend
+        self.search_mode = search_mode
+        self.binary_shortlist_factor = binary_shortlist_factor
+        self.dense_index = DenseIndex() if dense_backend == "memory" else None
+        self.embedding_model = embedding_model
         self.embed_model = TextEmbedding(model_name=embedding_model, cache_dir="/models/huggingface")
 
+        redis_client = get_redis()
+        self.embed_cache = TieredCache(
+            LRUCache(settings.QUERY_EMBED_CACHE_SIZE, ttl=settings.QUERY_EMBED_CACHE_TTL, sizeof=lambda embedding: embedding.nbytes),
+            RedisCache(
+                redis_client,
+                prefix=f"kasbi:query_embed:{embedding_model}:",
+                ttl=settings.QUERY_EMBED_CACHE_TTL,
+                dumps=lambda embedding: np.asarray(embedding, dtype=np.float32).tobytes(),
+                loads=lambda raw: np.frombuffer(raw, dtype=np.float32),
+            ) if redis_client is not None else None,
+        )
+        register_metrics("query_embed_cache", self.embed_cache.stats)
+
+        self.result_cache = TieredCache(
+            LRUCache(
+                settings.RETRIEVAL_CACHE_SIZE,
+                ttl=settings.RETRIEVAL_CACHE_TTL,
+                sizeof=lambda chunks: sum(sys.getsizeof(chunk.content) for chunk in chunks),
+            ),
+            RedisCache(
+                redis_client,
+                prefix="kasbi:retrieval:v2:",
+                ttl=settings.RETRIEVAL_CACHE_TTL,
+                dumps=lambda chunks: json.dumps(chunks).encode("utf-8"),
+                loads=lambda raw: [RetrievedChunk(*chunk) for chunk in json.loads(raw)],
+            ) if redis_client is not None else None,
+        )
+        register_metrics("retrieval_cache", self.result_cache.stats)
+
     def retrieve(self, session: Session, query: str) -> List[str]:
+        return [chunk.content for chunk in self.retrieve_chunks(session, query)]
+
+    def retrieve_chunks(self, session: Session, query: str) -> List[RetrievedChunk]:
+        # The corpus version is part of the key, so any ingest or delete makes older entries unreachable
+        key = self._result_cache_key(session, query)
+
+        chunks = self.result_cache.get(key)
+        if chunks is None:
+            check_cancelled()
+            documents = self._retrieve(session, query)
+
+            check_cancelled()
+            chunks = self._hydrate(session, documents)
+            self.result_cache.set(key, chunks)
+
+        return chunks
+
+    def _hydrate(self, session: Session, documents) -> List[RetrievedChunk]:
+        """Attach document_id and token_count to the final (id, content) rows with one primary key lookup."""
+        if not documents:
+            return []
+
+        rows = session.exec(
+            select(DocumentVector.id, DocumentVector.document_id, DocumentVector.token_count)
+            .where(DocumentVector.id.in_([document[0] for document in documents]))
+        ).all()
+        metadata = {document_id: (parent_id, token_count) for document_id, parent_id, token_count in rows}
+
+        chunks = []
+        for document in documents:
+            # Deleted between the ranking query and this lookup
+            if document[0] not in metadata:
+                continue
+
+            parent_id, token_count = metadata[document[0]]
+            chunks.append(RetrievedChunk(document[0], parent_id, document[1], token_count))
+
+        return chunks
+
+    def _result_cache_key(self, session: Session, query: str) -> str:
+        key = json.dumps(
+            {
+                "corpus_version": get_corpus_version(session),
+                "config": self._config_key(),
+                "query": normalize_query(query),
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def _config_key(self) -> dict:
+        """Everything that changes what retrieve() returns for the same query and corpus."""
+        return {
+            "retriever": type(self).__name__,
+            "k": self.k,
+            "rank_type": self.rank_type,
+            "embedding_model": self.embedding_model,
+            "ef_search": self.ef_search,
+            "probes": self.probes,
+            "dense_backend": self.dense_backend,
+            "search_mode": self.search_mode,
+            "binary_shortlist_factor": self.binary_shortlist_factor,
+        }
+
+    def _retrieve(self, session: Session, query: str):
+        """Final (id, content, ...) rows in ranking order."""
+        return self._retrieve_documents(session, query)
+
+    def _retrieve_documents(self, session: Session, query: str):
         if self.rank_type == "semantic":
-            with timer("semantic_retrieve"):
-                documents = self._semantic_retrieve(session, query, self.k)
+            with timer("semantic"):
+                return self._semantic_retrieve(session, query, self.k)
         else:
-            with timer("lexical_retrieve"):
-                documents = self._lexical_retrieve(session, query, self.k)
-
-        documents_contents = [document[1] for document in documents]
-        return documents_contents
+            with timer("lexical"):
+                return self._lexical_retrieve(session, query, self.k)
+
+    @property
+    def k_shortlist(self) -> int:
+        return self.k_fetch * self.binary_shortlist_factor
+
+    def _set_search_params(self, session: Session):
+        # The ANN index can only return as many rows as ef_search allows, so never go below the rows we ask for.
+        # is_local=true scopes the settings to the current transaction.
+        k_index = self.k_shortlist if self.search_mode == "binary" else self.k_fetch
+        session.exec(
+            select(
+                func.set_config("hnsw.ef_search", str(max(self.ef_search, k_index)), True),
+                func.set_config("ivfflat.probes", str(self.probes), True),
+            )
+        )
+
+    def embed_query(self, query: str):
+        normalized_query = normalize_query(query)
+        key = hashlib.sha1(normalized_query.encode("utf-8")).hexdigest()
+
+        with timer("embedding"):
+            embed_query = self.embed_cache.get(key)
+            if embed_query is None:
+                embed_query = list(self.embed_model.query_embed(normalized_query))[0]
+                self.embed_cache.set(key, embed_query)
+
+        return embed_query
 
     def _semantic_retrieve(self, session: Session, query: str, k: int):
-        embed_query = list(self.embed_model.query_embed(query))[0]
+        embed_query = self.embed_query(query)
 
-        documents = session.exec(
-            select(DocumentVector.id, DocumentVector.content, DocumentVector.dense_embedding).order_by(DocumentVector.dense_embedding.cosine_distance(embed_query)).limit(self.k_fetch)
-        ).all()
+        if self.dense_index is not None:
+            return self._memory_semantic_retrieve(session, embed_query, k)
+
+        self._set_search_params(session)
+        if self.search_mode == "binary":
+            documents = self._binary_semantic_candidates(session, embed_query)
+        else:
+            documents = session.exec(
+                select(DocumentVector.id, DocumentVector.content, DocumentVector.dense_embedding).order_by(DocumentVector.dense_embedding.cosine_distance(embed_query)).limit(self.k_fetch)
+            ).all()
 
-        document_embeddings = np.array([document[2] for document in documents])
+        document_embeddings = np.array([document[2].to_numpy() for document in documents], dtype=np.float32)
         mmr_selected = self._mmr(np.array(embed_query), document_embeddings, k)
 
         documents = [documents[i] for i in mmr_selected]
@@ -63,46 +283,51 @@ class BaseRetriever():
 
         return documents
     
-    def _lexical_retrieve(self, session: Session, query: str, k: int):
-        statement = text(f"SELECT id, content, content <@> to_bm25query('{query}', 'docs_idx') as score FROM document_vectors ORDER BY score LIMIT {k};")
-        # statement = text(f"SELECT id, content FROM document_vectors ORDER BY content <@> '{query}' LIMIT {k};")
-
-        documents = session.exec(statement=statement)
-        documents = [(document[0], document[1]) for document in documents]
-
-        return documents
-    
-
-    def _mmr(self, embed_query, doc_embeddings, k: int, lambda_mult: int = 0.5):
-        selected = []
-        candidates = list(range(len(doc_embeddings)))
+    def _binary_semantic_candidates(self, session: Session, embed_query):
+        """Hamming shortlist of k_shortlist rows from the bit index, then the k_fetch closest by exact cosine distance."""
+        query_bits = func.binary_quantize(cast(bindparam("embedding", embed_query, type_=HALFVEC(384)), HALFVEC(384)))
+
+        shortlist = (
+            select(DocumentVector.id, DocumentVector.content, DocumentVector.dense_embedding)
+            .order_by(cast(func.binary_quantize(DocumentVector.dense_embedding), BIT(384)).op("<~>")(query_bits))
+            .limit(self.k_shortlist)
+            .subquery("shortlist")
+        )
+
+        return session.exec(
+            select(shortlist.c.id, shortlist.c.content, shortlist.c.dense_embedding)
+            .order_by(shortlist.c.dense_embedding.cosine_distance(embed_query))
+            .limit(self.k_fetch)
+        ).all()
 
-        embed_query = embed_query / np.linalg.norm(embed_query)
+    def _memory_semantic_retrieve(self, session: Session, embed_query, k: int):
+        """Exact search on the in-process mirror, only the MMR-selected contents are read from the database."""
+        self.dense_index.ensure_synced(session)
+        document_ids, document_embeddings = self.dense_index.search(embed_query, self.k_fetch)
 
-        while len(selected) < k and candidates:
-            mmr_scores = []
+        mmr_selected = self._mmr(np.array(embed_query), document_embeddings, k)
+        selected_ids = [int(document_ids[i]) for i in mmr_selected]
 
-            for i in candidates:
-                doc_emb = doc_embeddings[i]
-                doc_emb = doc_emb / np.linalg.norm(doc_emb)
+        # Rows deleted since the last sync simply don't come back here
+        contents = dict(session.exec(
+            select(DocumentVector.id, DocumentVector.content).where(DocumentVector.id.in_(selected_ids))
+        ).all())
 
-                sim_to_query = np.dot(doc_emb, embed_query)
+        return [(document_id, contents[document_id]) for document_id in selected_ids if document_id in contents]
 
-                sim_to_selected = 0
-                if selected:
-                    sim_to_selected = max(
-                        np.dot(doc_emb, doc_embeddings[j] / np.linalg.norm(doc_embeddings[j]))
-                        for j in selected
-                    )
+    def _lexical_retrieve(self, session: Session, query: str, k: int):
+        lexical_query = preprocess_lexical_query(query)
+        if not lexical_query:
+            return []
 
-                score = lambda_mult * sim_to_query - (1 - lambda_mult) * sim_to_selected
-                mmr_scores.append((i, score))
+        documents = session.exec(LEXICAL_RETRIEVE_STATEMENT, params={"query": lexical_query, "k": k})
+        documents = [(document[0], document[1]) for document in documents]
 
-            best = max(mmr_scores, key=lambda x: x[1])[0]
-            selected.append(best)
-            candidates.remove(best)
+        return documents
+    
 
-        return selected
+    def _mmr(self, embed_query, doc_embeddings, k: int, lambda_mult: float = 0.5):
+        return mmr(embed_query, doc_embeddings, k, lambda_mult)
 
 
 class HybridRetriever(BaseRetriever):
@@ -111,24 +336,130 @@ class HybridRetriever(BaseRetriever):
             k: int = 50,
             k_rrf: int = 5, 
             rank_type: Literal["semantic", "lexical"] = "semantic",
-            embedding_model: str = settings.EMBEDDING_MODEL
+            embedding_model: str = settings.EMBEDDING_MODEL,
+            ef_search: int = settings.HNSW_EF_SEARCH,
+            probes: int = settings.IVFFLAT_PROBES,
+            dense_backend: Literal["sql", "memory"] = settings.DENSE_BACKEND,
+            search_mode: Literal["ann", "binary"] = settings.SEMANTIC_SEARCH_MODE,
+            fusion: Literal["python", "sql"] = settings.HYBRID_FUSION,
+            concurrent: bool = settings.RETRIEVER_CONCURRENT_LEGS,
+            rerank: bool = settings.RERANK_ENABLED,
+            k_rerank_candidates: int = settings.RERANK_CANDIDATES,
+            rerank_min_score_ratio: float = settings.RERANK_MIN_FUSED_SCORE_RATIO,
     ):
-        super().__init__(k, rank_type, embedding_model)
+        super().__init__(k, rank_type, embedding_model, ef_search, probes, dense_backend, search_mode)
         self.k_rrf = k_rrf
+        self.fusion = fusion
+        self.concurrent = concurrent
+
+        # Optional stage after fusion: the top k_rerank_candidates fused chunks are rescored by the cross-encoder
+        self.reranker = Reranker() if rerank else None
+        self.k_rerank_candidates = max(k_rerank_candidates, k_rrf)
+        self.rerank_min_score_ratio = rerank_min_score_ratio
+
+        # Each leg takes one worker, so this bounds the number of retrievals running at once
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.RETRIEVER_MAX_WORKERS,
+            thread_name_prefix="retriever",
+        ) if concurrent else None
 
     
-    def retrieve(self, session: Session, query: str):
-        with timer("semantic_retrieve"):
-            semantic_documents = self._semantic_retrieve(session, query, self.k)
-        with timer("lexical_retrieve"):
-            lexical_documents = self._lexical_retrieve(session, query, self.k)
-        with timer("rrf"):
-            documents_contents = self._rrf(session, semantic_documents, lexical_documents)
-
-        return documents_contents
+    def _config_key(self) -> dict:
+        config_key = {**super()._config_key(), "k_rrf": self.k_rrf, "fusion": self.fusion}
+        if self.reranker is not None:
+            config_key.update({
+                "rerank_model": self.reranker.model_name,
+                "k_rerank_candidates": self.k_rerank_candidates,
+                "rerank_min_score_ratio": self.rerank_min_score_ratio,
+            })
+        return config_key
+
+    def _retrieve(self, session: Session, query: str):
+        k_fused = self.k_rerank_candidates if self.reranker is not None else self.k_rrf
+
+        if self.fusion == "sql":
+            with timer("fused"):
+                documents = self._fused_retrieve(session, query, k_fused)
+        else:
+            documents = self._hybrid_retrieve(session, query, k_fused)
+
+        if self.reranker is not None:
+            check_cancelled()
+            with timer("rerank"):
+                documents = self._rerank(query, documents)
+
+        return documents[:self.k_rrf]
+
+    def _hybrid_retrieve(self, session: Session, query: str, k_fused: int):
+        if self.concurrent:
+            semantic_future = run_in_context(self.executor, self._run_leg, "semantic", self._semantic_retrieve, query)
+            lexical_future = run_in_context(self.executor, self._run_leg, "lexical", self._lexical_retrieve, query)
+
+            semantic_documents = semantic_future.result()
+            lexical_documents = lexical_future.result()
+        else:
+            with timer("semantic"):
+                semantic_documents = self._semantic_retrieve(session, query, self.k)
+            with timer("lexical"):
+                lexical_documents = self._lexical_retrieve(session, query, self.k)
+
+        with timer("fusion"):
+            documents = self._rrf(semantic_documents, lexical_documents, limit=k_fused)
+
+        return documents
+
+    def _rerank(self, query: str, documents):
+        """Rescore fused (id, content, score) rows with the cross-encoder.
+
+        Rows whose fused score is below rerank_min_score_ratio of the best
+        one skip the cross-encoder and keep their fused order after the
+        reranked rows.
+        """
+        if not documents:
+            return documents
+
+        cutoff = documents[0][2] * self.rerank_min_score_ratio
+        candidates = [document for document in documents if document[2] >= cutoff]
+        remainder = [document for document in documents if document[2] < cutoff]
+
+        scores = self.reranker.score(query, [(document[0], document[1]) for document in candidates])
+        ranking = sorted(zip(candidates, scores), key=lambda x: x[1], reverse=True)
+
+        return [(document[0], document[1], score) for document, score in ranking] + remainder
+
+    def _run_leg(self, name: str, leg, query: str):
+        # Legs run on their own pooled connection, a Session must not be shared across threads
+        check_cancelled()
+        with SessionLocal() as leg_session, timer(name):
+            return leg(leg_session, query, self.k)
+
+    def _fused_retrieve(self, session: Session, query: str, k_fused: int):
+        """Single round trip hybrid search, the semantic leg skips MMR since no embeddings leave the database."""
+        embed_query = self.embed_query(query)
+
+        # Nothing searchable left for BM25, run the lexical CTE with LIMIT 0 so only the semantic ranking counts
+        lexical_query = preprocess_lexical_query(query)
+        k_lexical = self.k if lexical_query else 0
+
+        self._set_search_params(session)
+        documents = session.exec(
+            FUSED_RETRIEVE_STATEMENTS[self.search_mode],
+            params={
+                "embedding": embed_query,
+                "query": lexical_query or normalize_query(query),
+                "k_semantic": self.k,
+                "k_shortlist": self.k * self.binary_shortlist_factor,
+                "k_lexical": k_lexical,
+                "rrf_k": RRF_K,
+                "k_rrf": k_fused,
+            },
+        ).all()
+
+        return [(document[0], document[1], document[2]) for document in documents]
     
-    def _rrf(self, session: Session, *document_rankings, k = 60):
+    def _rrf(self, *document_rankings, limit: int, k = RRF_K):
         document_score = {}
+        document_content = {}
         for document_ranking in document_rankings:
             for i, document in enumerate(document_ranking):
                 rank = i + 1
@@ -137,18 +468,16 @@ class HybridRetriever(BaseRetriever):
                 document_score[document_id] = (
                     document_score.get(document_id, 0.0) + score
                 )
+                document_content[document_id] = document[1]
 
         document_final_score = sorted(
             document_score.items(),
             key=lambda x: x[1],
             reverse=True
-        )[:self.k_rrf]
-
-        document_final_score = [document[0] for document in document_final_score]
-
-        documents = session.exec(select(DocumentVector.content).where(DocumentVector.id.in_(document_final_score))).all()
+        )[:limit]
 
-        return documents
+        # Both legs already carry the content, so keep the fused order without re-querying by id
+        return [(document_id, document_content[document_id], score) for document_id, score in document_final_score]
     
 
 class RerankRetriever(BaseRetriever):
@@ -158,23 +487,30 @@ class RerankRetriever(BaseRetriever):
             k_rerank = 5,
             rank_type = "semantic", 
             embedding_model = settings.EMBEDDING_MODEL, 
-            rerank_model = settings.RERANK_MODEL
+            rerank_model = settings.RERANK_MODEL,
+            ef_search = settings.HNSW_EF_SEARCH,
+            probes = settings.IVFFLAT_PROBES,
+            dense_backend = settings.DENSE_BACKEND,
+            search_mode = settings.SEMANTIC_SEARCH_MODE,
     ):
-        super().__init__(k, rank_type, embedding_model)
+        super().__init__(k, rank_type, embedding_model, ef_search, probes, dense_backend, search_mode)
         
         self.k_rerank = k_rerank
-        self.reranker = TextCrossEncoder(model_name=rerank_model, cache_dir="/models/huggingface")
+        self.reranker = Reranker(model_name=rerank_model)
+
+    def _config_key(self) -> dict:
+        return {**super()._config_key(), "k_rerank": self.k_rerank, "rerank_model": self.reranker.model_name}
 
-    def retrieve(self, session: Session, query: str):
-        document_contents = super().retrieve(session, query)
+    def _retrieve(self, session: Session, query: str):
+        documents = self._retrieve_documents(session, query)
         with timer("rerank"):
-            document_contents = self._rerank(query, document_contents)
+            documents = self._rerank(query, documents)
 
-        return document_contents
+        return documents
 
-    def _rerank(self, query: str, document_contents: List[str]):
-        new_scores = self.reranker.rerank(query, document_contents)
+    def _rerank(self, query: str, documents):
+        new_scores = self.reranker.score(query, documents)
         ranking = [(i, score) for i, score in enumerate(new_scores)]
         ranking.sort(key=lambda x: x[1], reverse=True)
 
-        return [document_contents[i] for i, score in ranking[:self.k_rerank]]
\ No newline at end of file
+        return [documents[i] for i, score in ranking[:self.k_rerank]]
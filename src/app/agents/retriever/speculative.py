@@ -0,0 +1,127 @@
+from concurrent.futures import ThreadPoolExecutor, Future
+from contextvars import ContextVar
+from threading import Event, Lock
+from typing import Any, Dict, List, Optional
+
+from app.agents.metrics import timer, run_in_context, register_metrics
+from app.database import SessionLocal
+from app.config import get_settings
+
+import asyncio
+import time
+
+settings = get_settings()
+
+# Set inside a speculative retrieval, retrievers check it between stages
+_cancel_event: ContextVar[Optional[Event]] = ContextVar("retrieval_cancel_event", default=None)
+
+
+class RetrievalCancelled(Exception):
+    pass
+
+
+def check_cancelled() -> None:
+    """Stop a speculative retrieval at the next stage boundary once its result is no longer wanted.
+
+    A statement or model call that is already running still finishes,
+    only the stages after it are skipped.
+    """
+    event = _cancel_event.get()
+    if event is not None and event.is_set():
+        raise RetrievalCancelled()
+
+
+class Speculation():
+    """A retrieve_chunks call started before the intent of the question is known."""
+
+    def __init__(self, owner: "SpeculativeRetriever", query: str):
+        self.owner = owner
+        self.query = query
+        self.cancel_event = Event()
+        self.started_at = time.perf_counter()
+        self.elapsed_ms: Optional[float] = None
+        self.future: Optional[Future] = None
+
+    async def aresult(self) -> Optional[List]:
+        """Await the speculative chunks without blocking the event loop, None if the caller has to retrieve itself."""
+        if self.future.cancel():
+            self.owner._record("not_started")
+            return None
+
+        waited_at = time.perf_counter()
+        with timer("retrieval"):
+            chunks = await asyncio.wrap_future(self.future)
+
+        waited_ms = (time.perf_counter() - waited_at) * 1000
+        self.owner._record("used", saved_ms=max(self.elapsed_ms - waited_ms, 0.0))
+        return chunks
+
+    def cancel(self) -> None:
+        self.cancel_event.set()
+        if self.future.cancel():
+            self.owner._record("not_started")
+        else:
+            self.future.add_done_callback(self._discarded)
+
+    def _discarded(self, future: Future) -> None:
+        # A run that stopped at a stage boundary was already counted as cancelled_early, one that failed wasted nothing usable
+        if future.exception() is None and future.result() is not None:
+            self.owner._record("discarded", wasted_ms=self.elapsed_ms or 0.0)
+
+
+class SpeculativeRetriever():
+    """Run retrieval concurrently with the LLM intent router, since most questions end up as SEARCH.
+
+    Each speculation takes a worker and its own pooled connection. The
+    result is used when the label is SEARCH and cancelled otherwise, and
+    the metrics show how much retrieval time was hidden behind the router
+    and how much was thrown away.
+    """
+
+    def __init__(
+            self,
+            retriever,
+            max_workers: int = settings.SPECULATIVE_RETRIEVAL_MAX_WORKERS,
+    ):
+        self.retriever = retriever
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculative")
+
+        self._lock = Lock()
+        self.counts = {"started": 0, "used": 0, "discarded": 0, "not_started": 0, "cancelled_early": 0}
+        self.saved_ms = 0.0
+        self.wasted_ms = 0.0
+
+        register_metrics("speculative_retrieval", self.stats)
+
+    def start(self, query: str) -> Speculation:
+        speculation = Speculation(self, query)
+        speculation.future = run_in_context(self.executor, self._run, speculation)
+        self._record("started")
+        return speculation
+
+    def _run(self, speculation: Speculation):
+        _cancel_event.set(speculation.cancel_event)
+        start = time.perf_counter()
+        try:
+            with SessionLocal() as session, timer("speculative_retrieval"):
+                return self.retriever.retrieve_chunks(session, speculation.query)
+        except RetrievalCancelled:
+            self._record("cancelled_early")
+            return None
+        finally:
+            speculation.elapsed_ms = (time.perf_counter() - start) * 1000
+
+    def _record(self, outcome: str, saved_ms: float = 0.0, wasted_ms: float = 0.0) -> None:
+        with self._lock:
+            self.counts[outcome] += 1
+            self.saved_ms += saved_ms
+            self.wasted_ms += wasted_ms
+
+    def stats(self) -> Dict[str, Any]:
+        decided = self.counts["used"] + self.counts["discarded"]
+        return {
+            **self.counts,
+            "saved_ms": round(self.saved_ms, 2),
+            "wasted_ms": round(self.wasted_ms, 2),
+            "discard_rate": self.counts["discarded"] / decided if decided else 0.0,
+        }
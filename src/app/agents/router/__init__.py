@@ -0,0 +1 @@
+from app.agents.router.router import IntentRouter, IntentPrediction, INTENT_LABELS, llm_classify, allm_classify, parse_exemplars, parse_intent
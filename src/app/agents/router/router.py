@@ -0,0 +1,282 @@
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Literal, NamedTuple, Optional, Tuple
+
+from app.agents.prompts import ROUTER_SYSTEM_TEMPLATE, ROUTER_USER_TEMPLATE
+from app.agents.metrics import register_metrics
+from app.agents.models import LLMBusyError
+from app.agents.retriever.query import normalize_query
+from app.config import get_settings
+
+import csv
+import io
+import json
+import logging
+import os
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+INTENT_LABELS = ("SEARCH", "CHAT", "OOT")
+
+# Used until an admin uploads a labeled file, the LLM router covers whatever these don't
+DEFAULT_EXEMPLARS: List[Tuple[str, str]] = [
+    ("Bagaimana cara login aplikasi Dapodik versi terbaru?", "SEARCH"),
+    ("Apa saja program BPMP Papua tahun ini?", "SEARCH"),
+    ("Bagaimana cara mengajukan layanan di ULT BPMP?", "SEARCH"),
+    ("Kapan jadwal asesmen nasional untuk SD?", "SEARCH"),
+    ("Apa syarat sertifikasi guru?", "SEARCH"),
+    ("Cara sinkronisasi data sekolah di Dapodik gimana ya?", "SEARCH"),
+    ("Apa itu kurikulum merdeka?", "SEARCH"),
+    ("Bagaimana cara membaca rapor pendidikan sekolah?", "SEARCH"),
+    ("Regulasi terbaru tentang tunjangan profesi guru apa?", "SEARCH"),
+    ("Dimana alamat kantor BPMP Provinsi Papua?", "SEARCH"),
+    ("Halo Kasbi, gimana kabarnya!", "CHAT"),
+    ("Hai", "CHAT"),
+    ("Selamat pagi", "CHAT"),
+    ("Terima kasih banyak ya", "CHAT"),
+    ("Kamu siapa?", "CHAT"),
+    ("Oke makasih infonya", "CHAT"),
+    ("Siapa presiden Amerika saat ini?", "OOT"),
+    ("Resep rendang yang enak gimana?", "OOT"),
+    ("Rekomendasi film horor terbaru dong", "OOT"),
+    ("Buatkan kode python untuk web scraping", "OOT"),
+    ("Siapa yang menang pilpres kemarin?", "OOT"),
+    ("Aku lagi galau diputusin pacar", "OOT"),
+]
+
+
+class IntentPrediction(NamedTuple):
+    label: str
+    confidence: float
+    margin: float
+    source: Literal["local", "llm"]
+
+
+def parse_intent(raw: str) -> str:
+    """Force an LLM answer onto one of the labels, SEARCH when unclear."""
+    raw = raw.strip().upper()
+    for label in INTENT_LABELS:
+        if label in raw:
+            return label
+    return "SEARCH"
+
+
+def llm_classify(llm, message: str) -> str:
+    try:
+        classification = llm.invoke(
+            message=message,
+            system_template=ROUTER_SYSTEM_TEMPLATE,
+            user_template=ROUTER_USER_TEMPLATE,
+            prompt_format={"question": message},
+        )
+    except LLMBusyError:
+        # The answer would wait on the same saturated LLM, better to turn the request away now
+        raise
+    except Exception as e:
+        logger.warning("LLM router failed, defaulting to SEARCH: %s", e)
+        return "SEARCH"
+
+    return parse_intent(classification)
+
+
+async def allm_classify(llm, message: str) -> str:
+    try:
+        classification = await llm.ainvoke(
+            message=message,
+            system_template=ROUTER_SYSTEM_TEMPLATE,
+            user_template=ROUTER_USER_TEMPLATE,
+            prompt_format={"question": message},
+        )
+    except LLMBusyError:
+        # The answer would wait on the same saturated LLM, better to turn the request away now
+        raise
+    except Exception as e:
+        logger.warning("LLM router failed, defaulting to SEARCH: %s", e)
+        return "SEARCH"
+
+    return parse_intent(classification)
+
+
+def parse_exemplars(content: str, filename: str = "") -> List[Tuple[str, str]]:
+    """Read labeled exemplars from JSON lines ({"text", "label"}) or a CSV with a text,label header."""
+    if filename.endswith(".csv"):
+        rows = [(row.get("text", ""), row.get("label", "")) for row in csv.DictReader(io.StringIO(content))]
+    else:
+        rows = []
+        for line_number, line in enumerate(content.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Line {line_number} is not valid JSON: {e.msg}")
+            if not isinstance(row, dict):
+                raise ValueError(f"Line {line_number} is not a JSON object")
+            rows.append((row.get("text", ""), row.get("label", "")))
+
+    exemplars = []
+    for text, label in rows:
+        label = str(label).strip().upper()
+        if label not in INTENT_LABELS:
+            raise ValueError(f"Unknown intent label {label!r}, expected one of {', '.join(INTENT_LABELS)}")
+        if str(text).strip():
+            exemplars.append((str(text).strip(), label))
+
+    missing = set(INTENT_LABELS) - {label for _, label in exemplars}
+    if missing:
+        raise ValueError(f"No exemplars for {', '.join(sorted(missing))}")
+
+    return exemplars
+
+
+class IntentRouter():
+    """SEARCH/CHAT/OOT from the question embedding, with the LLM router as fallback.
+
+    Each label is the normalized mean of its exemplar embeddings. A
+    question is answered locally when its best centroid is at least
+    min_similarity away and beats the runner-up by min_margin, otherwise
+    the LLM prompt decides. The exemplars file is re-read when it
+    changes, so an upload through one worker reaches all of them.
+    """
+
+    def __init__(
+            self,
+            embed_model,
+            mode: Literal["local", "llm"] = settings.INTENT_ROUTER_MODE,
+            exemplars_path: str = settings.INTENT_EXEMPLARS_PATH,
+            min_similarity: float = settings.INTENT_ROUTER_MIN_SIMILARITY,
+            min_margin: float = settings.INTENT_ROUTER_MIN_MARGIN,
+    ):
+        self.embed_model = embed_model
+        self.mode = mode
+        self.exemplars_path = Path(exemplars_path)
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+
+        self._lock = Lock()
+        self._labels: Tuple[str, ...] = ()
+        self._centroids: Optional[np.ndarray] = None
+        self._exemplars_mtime: Optional[float] = None
+        self.counts = {f"{source}_{label}": 0 for source in ("local", "llm") for label in INTENT_LABELS}
+
+        if mode == "local":
+            try:
+                self.reload()
+            except ValueError as e:
+                # A bad file on disk must not take down startup, serve the built-in set until it is fixed
+                logger.error("Ignoring invalid intent exemplars file %s, using the defaults: %s", self.exemplars_path, e)
+                self.set_exemplars(DEFAULT_EXEMPLARS)
+                self._exemplars_mtime = self.exemplars_path.stat().st_mtime
+
+        register_metrics("intent_router", self.stats)
+
+    def route(self, message: str, embedding, llm) -> IntentPrediction:
+        return self.predict_local(embedding) or self.predict_llm(message, llm)
+
+    def predict_local(self, embedding) -> Optional[IntentPrediction]:
+        """The local prediction when it is confident, None when the LLM router has to decide."""
+        if self.mode != "local":
+            return None
+
+        prediction = self.classify(embedding)
+        if not self.is_confident(prediction):
+            return None
+
+        self._count(prediction)
+        return prediction
+
+    def predict_llm(self, message: str, llm) -> IntentPrediction:
+        prediction = IntentPrediction(llm_classify(llm, message), 0.0, 0.0, "llm")
+        self._count(prediction)
+        return prediction
+
+    async def apredict_llm(self, message: str, llm) -> IntentPrediction:
+        prediction = IntentPrediction(await allm_classify(llm, message), 0.0, 0.0, "llm")
+        self._count(prediction)
+        return prediction
+
+    def _count(self, prediction: IntentPrediction) -> None:
+        self.counts[f"{prediction.source}_{prediction.label}"] += 1
+
+    def classify(self, embedding) -> IntentPrediction:
+        """Local prediction only, callers decide what to do with a low-confidence one."""
+        self._reload_if_changed()
+
+        labels, centroids = self._labels, self._centroids
+        query = np.asarray(embedding, dtype=np.float32)
+        scores = centroids @ (query / np.linalg.norm(query))
+
+        order = np.argsort(-scores)
+        best = float(scores[order[0]])
+        runner_up = float(scores[order[1]]) if len(order) > 1 else -1.0
+
+        return IntentPrediction(labels[order[0]], best, best - runner_up, "local")
+
+    def is_confident(self, prediction: IntentPrediction) -> bool:
+        return prediction.confidence >= self.min_similarity and prediction.margin >= self.min_margin
+
+    def set_exemplars(self, exemplars: Iterable[Tuple[str, str]]) -> None:
+        exemplars = list(exemplars)
+        embeddings = np.array(
+            list(self.embed_model.query_embed([normalize_query(text) for text, _ in exemplars])),
+            dtype=np.float32,
+        )
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+        labels = tuple(label for label in INTENT_LABELS if any(exemplar[1] == label for exemplar in exemplars))
+        centroids = np.stack([
+            embeddings[[i for i, exemplar in enumerate(exemplars) if exemplar[1] == label]].mean(axis=0)
+            for label in labels
+        ])
+        centroids /= np.linalg.norm(centroids, axis=1, keepdims=True)
+
+        # Swapped together so a concurrent classify never sees labels and centroids out of step
+        self._labels, self._centroids = labels, centroids
+
+    def save_exemplars(self, exemplars: List[Tuple[str, str]]) -> None:
+        """Persist an uploaded set for every worker and apply it in this one."""
+        self.exemplars_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.exemplars_path.with_name(self.exemplars_path.name + f".{os.getpid()}.tmp")
+        tmp_path.write_text("".join(json.dumps({"text": text, "label": label}) + "\n" for text, label in exemplars), encoding="utf-8")
+        os.replace(tmp_path, self.exemplars_path)
+
+        self.reload()
+
+    def reload(self) -> None:
+        with self._lock:
+            if self.exemplars_path.exists():
+                mtime = self.exemplars_path.stat().st_mtime
+                exemplars = parse_exemplars(self.exemplars_path.read_text(encoding="utf-8"), self.exemplars_path.name)
+            else:
+                mtime = None
+                exemplars = DEFAULT_EXEMPLARS
+
+            self.set_exemplars(exemplars)
+            self._exemplars_mtime = mtime
+
+    def _reload_if_changed(self) -> None:
+        try:
+            mtime = self.exemplars_path.stat().st_mtime
+        except FileNotFoundError:
+            mtime = None
+
+        if mtime != self._exemplars_mtime:
+            try:
+                self.reload()
+            except ValueError as e:
+                # Keep serving the previous centroids rather than failing every question
+                logger.error("Ignoring invalid intent exemplars file %s: %s", self.exemplars_path, e)
+                self._exemplars_mtime = mtime
+
+    def stats(self) -> Dict[str, Any]:
+        local = sum(count for key, count in self.counts.items() if key.startswith("local_"))
+        total = local + sum(count for key, count in self.counts.items() if key.startswith("llm_"))
+        return {
+            "mode": self.mode,
+            "labels": list(self._labels),
+            **self.counts,
+            "local_rate": local / total if total else 0.0,
+        }
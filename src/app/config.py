@@ -1,6 +1,6 @@
 from functools import lru_cache
 from pathlib import Path
-from typing import List
+from typing import List, Literal, Optional
 
 from pydantic_settings import BaseSettings
 from pydantic import field_validator
@@ -8,8 +8,12 @@ from pydantic import field_validator
 class Settings(BaseSettings):
     API_PREFIX: str = "/api"
     DEBUG: bool = False
+    LOG_LEVEL: str = "INFO"
 
     DATABASE_URL: str
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_PREPARE_THRESHOLD: int = 1
 
     POSTGRES_DB: str
     POSTGRES_USER: str
@@ -28,13 +32,95 @@ class Settings(BaseSettings):
     CELERY_BROKER_URL: str
     CELERY_RESULT_BACKEND: str
 
+    REDIS_URL: Optional[str] = None
+
     VECTOR_DB_DIRECTORY: str
     EMBEDDING_MODEL: str
+    EMBED_BATCH_SIZE: int = 16
+    BULK_LOAD_MIN_CHUNKS: int = 2000
+    BULK_LOAD_MAINTENANCE_WORK_MEM: str = "1GB"
+    BULK_LOAD_LOCK_TIMEOUT: str = "5s"
     RERANK_MODEL: str
+
+    VECTOR_INDEX_TYPE: Literal["hnsw", "ivfflat"] = "hnsw"
+    HNSW_EF_SEARCH: int = 100
+    IVFFLAT_PROBES: int = 10
+    SEMANTIC_SEARCH_MODE: Literal["ann", "binary"] = "ann"
+    BINARY_SHORTLIST_FACTOR: int = 4
+    HYBRID_FUSION: Literal["python", "sql"] = "python"
+    DENSE_BACKEND: Literal["sql", "memory"] = "sql"
+    DENSE_INDEX_DTYPE: Literal["float32", "float16"] = "float32"
+    DENSE_INDEX_SYNC_INTERVAL: float = 5.0
+    RETRIEVER_CONCURRENT_LEGS: bool = True
+    RETRIEVER_MAX_WORKERS: int = 8
+    LEXICAL_MAX_TERMS: int = 24
+    LEXICAL_MAX_QUERY_CHARS: int = 2000
+    QUERY_EMBED_CACHE_SIZE: int = 10000
+    QUERY_EMBED_CACHE_TTL: int = 86400
+    RETRIEVAL_CACHE_SIZE: int = 2000
+    RETRIEVAL_CACHE_TTL: int = 3600
+    RERANK_ENABLED: bool = False
+    RERANK_CANDIDATES: int = 20
+    RERANK_MIN_FUSED_SCORE_RATIO: float = 0.0
+    RERANK_BATCH_SIZE: int = 16
+    RERANK_THREADS: int = 2
+    RERANK_CACHE_SIZE: int = 50000
+    LLM_MAX_CONNECTIONS: int = 50
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    LLM_KEEPALIVE_EXPIRY: float = 60.0
+    LLM_TIMEOUT: float = 60.0
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_SIZE: int = 5000
+    LLM_CACHE_TTL: int = 3600
+    LLM_PROVIDERS: str = "openrouter,groq"
+    LLM_MAX_RETRIES: int = 1
+    LLM_HEDGE_ENABLED: bool = True
+    LLM_HEDGE_MIN_DELAY: float = 0.5
+    LLM_HEDGE_DEFAULT_DELAY: float = 3.0
+    LLM_BREAKER_FAILURES: int = 5
+    LLM_BREAKER_COOLDOWN: float = 30.0
+    LLM_MAX_CONCURRENCY: int = 16
+    LLM_QUEUE_MAX: int = 500
+    LLM_QUEUE_TIMEOUT: float = 30.0
+    LLM_RATE_LIMIT_RPM: float = 0
+    LLM_RATE_LIMIT_BURST: int = 10
+    LLM_RATE_LIMIT_RETRIES: int = 3
+    LLM_BACKOFF_BASE: float = 1.0
+    LLM_BACKOFF_MAX: float = 30.0
+    LLM_PRICES: str = ""
+    INTENT_ROUTER_MODE: Literal["local", "llm"] = "local"
+    INTENT_EXEMPLARS_PATH: str = "data/intent_exemplars.jsonl"
+    INTENT_ROUTER_MIN_SIMILARITY: float = 0.6
+    INTENT_ROUTER_MIN_MARGIN: float = 0.05
+    SPECULATIVE_RETRIEVAL: bool = True
+    SPECULATIVE_RETRIEVAL_MAX_WORKERS: int = 4
+    ASYNC_BLOCKING_WORKERS: int = 16
+    CHECKPOINT_BACKEND: Literal["postgres", "memory"] = "postgres"
+    CHECKPOINT_POOL_SIZE: int = 4
+    CHECKPOINT_FLUSH_INTERVAL: float = 1.0
+    CHECKPOINT_KEEP_PER_THREAD: int = 2
+    CHECKPOINT_RETENTION_DAYS: int = 30
+    CONTEXT_TOKEN_BUDGET: int = 3000
+    CONTEXT_MERGE_ADJACENT: bool = True
+    CONTEXT_TOKEN_ENCODING: str = "cl100k_base"
+    MEMORY_RECENT_TURNS: int = 3
+    MEMORY_TOKEN_BUDGET: int = 800
+    MEMORY_SUMMARY_MAX_TOKENS: int = 300
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_THRESHOLD: float = 0.95
+    ANSWER_CACHE_TTL: int = 604800
+    ANSWER_CACHE_MAX_ENTRIES: int = 10000
+    REQUEST_METRICS_ENABLED: bool = True
+    REQUEST_METRICS_FLUSH_INTERVAL: float = 5.0
+    REQUEST_METRICS_MAX_PENDING: int = 10000
+    REQUEST_METRICS_RETENTION_DAYS: int = 90
     
     GROQ_API_KEY: str
     OPEN_ROUTER_API_KEY: str
     OPEN_ROUTER_MODEL: str
+    OPEN_ROUTER_BASE_URL: str = "https://openrouter.ai/api/v1"
+    GROQ_MODEL: Optional[str] = None
+    GROQ_BASE_URL: str = "https://api.groq.com"
     
     ALLOWED_ORIGINS: str
 
@@ -1,19 +1,51 @@
+from functools import lru_cache
+
 from sqlmodel import create_engine, SQLModel, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 
 from app.config import get_settings
 
 settings = get_settings()
+
+# psycopg 3 prepares a statement server-side once it has run prepare_threshold times on a connection
+connect_args = {}
+if make_url(settings.DATABASE_URL).get_driver_name() == "psycopg":
+    connect_args["prepare_threshold"] = settings.DB_PREPARE_THRESHOLD
+
 engine = create_engine(
     settings.DATABASE_URL,
     echo=settings.DEBUG,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    connect_args=connect_args,
 )
 
 def SessionLocal():
     return Session(engine)
 
+@lru_cache
+def get_async_engine() -> AsyncEngine:
+    # Same URL, postgresql+psycopg resolves to psycopg's async driver under create_async_engine
+    return create_async_engine(
+        settings.DATABASE_URL,
+        echo=settings.DEBUG,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        connect_args=connect_args,
+    )
+
+def AsyncSessionLocal():
+    return AsyncSession(get_async_engine(), expire_on_commit=False)
+
 def init_db() -> None:
     SQLModel.metadata.create_all(bind=engine)
 
 def get_db():
     with Session(engine) as session:
-        yield session
\ No newline at end of file
+        yield session
+
+async def get_async_db():
+    async with AsyncSessionLocal() as session:
+        yield session
@@ -8,12 +8,18 @@ import logging
 from app.security.jwt import decode_token
 
 from app.agents import instansiate_chatbot_resources
+from app.database import SessionLocal, get_async_engine
+from app.agents.models import get_http_client, get_async_http_client
+from app.agents.checkpoint import PostgresCheckpointSaver
+from app.agents.metrics import get_request_metrics_writer
 
 from app.routers import chatbot, auth, admin, whatsapp
 
 from app.config import get_settings
 
 settings = get_settings()
+
+logging.basicConfig(level=settings.LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
 logger = logging.getLogger(__name__)
 
 @asynccontextmanager
@@ -21,8 +27,26 @@ async def lifespan(app: FastAPI):
     app.state.chatbot_resources = {}
     instansiate_chatbot_resources(app)
 
+    retriever = app.state.chatbot_resources["retriever"]
+    if retriever.dense_index is not None:
+        with SessionLocal() as session:
+            retriever.dense_index.ensure_synced(session)
+
     yield
 
+    # Checkpoints still buffered are written before the pool closes
+    checkpointer = app.state.chatbot_resources["chatbot_graph"].checkpointer
+    if isinstance(checkpointer, PostgresCheckpointSaver):
+        checkpointer.close()
+
+    request_metrics_writer = get_request_metrics_writer()
+    if request_metrics_writer is not None:
+        request_metrics_writer.close()
+
+    get_http_client().close()
+    await get_async_http_client().aclose()
+    await get_async_engine().dispose()
+
 
 app = FastAPI(
     root_path="/api",
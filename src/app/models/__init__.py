@@ -1,4 +1,8 @@
 from app.models.document import Document
 from app.models.user import User
 from app.models.role import UserRole, Role
-from app.models.history import Thread, Chat
\ No newline at end of file
+from app.models.history import Thread, Chat
+from app.models.corpus import CorpusVersion
+from app.models.answer_cache import AnswerCache
+from app.models.checkpoint import GraphCheckpoint, GraphCheckpointWrite
+from app.models.request_metric import RequestMetric
\ No newline at end of file
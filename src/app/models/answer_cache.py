@@ -0,0 +1,18 @@
+from datetime import datetime
+from typing import Optional, List, Any
+from sqlmodel import SQLModel, Field, JSON
+from pgvector.sqlalchemy import Vector
+
+from app.models.base import TimestampedModel, IDModel
+
+
+class AnswerCache(IDModel, TimestampedModel, table=True):
+    __tablename__ = "answer_cache"
+
+    question: str = Field(nullable=False)
+    question_embedding: Any = Field(sa_type=Vector(384))
+    answer: str = Field(nullable=False)
+    context: List[str] = Field(default_factory=list, sa_type=JSON, nullable=False)
+    corpus_version: int = Field(index=True, nullable=False)
+    hit_count: int = Field(default=0, nullable=False)
+    last_hit_at: Optional[datetime] = Field(default=None, nullable=True)
@@ -0,0 +1,38 @@
+from typing import Optional
+from sqlmodel import SQLModel, Field, LargeBinary, Index
+
+from app.models.base import TimestampedModel
+
+
+class GraphCheckpoint(TimestampedModel, table=True):
+    """LangGraph checkpoints, written by PostgresCheckpointSaver. Only the newest few per thread are kept."""
+    __tablename__ = "graph_checkpoints"
+
+    thread_id: str = Field(primary_key=True, nullable=False)
+    checkpoint_ns: str = Field(default="", primary_key=True, nullable=False)
+    checkpoint_id: str = Field(primary_key=True, nullable=False)
+    parent_checkpoint_id: Optional[str] = Field(default=None, nullable=True)
+    checkpoint_type: str = Field(nullable=False)
+    checkpoint: bytes = Field(sa_type=LargeBinary, nullable=False)
+    metadata_type: str = Field(nullable=False)
+    checkpoint_metadata: bytes = Field(sa_type=LargeBinary, nullable=False)
+
+    __table_args__ = (
+        # Age based retention scans by creation time
+        Index("ix_graph_checkpoints_created_at", "created_at"),
+    )
+
+
+class GraphCheckpointWrite(SQLModel, table=True):
+    """Pending writes of a checkpoint, removed together with it."""
+    __tablename__ = "graph_checkpoint_writes"
+
+    thread_id: str = Field(primary_key=True, nullable=False)
+    checkpoint_ns: str = Field(default="", primary_key=True, nullable=False)
+    checkpoint_id: str = Field(primary_key=True, nullable=False)
+    task_id: str = Field(primary_key=True, nullable=False)
+    idx: int = Field(primary_key=True, nullable=False)
+    channel: str = Field(nullable=False)
+    value_type: str = Field(nullable=False)
+    value: bytes = Field(sa_type=LargeBinary, nullable=False)
+    task_path: str = Field(default="", nullable=False)
@@ -0,0 +1,10 @@
+from sqlmodel import SQLModel, Field
+
+from app.models.base import TimestampedModel
+
+
+class CorpusVersion(TimestampedModel, table=True):
+    __tablename__ = "corpus_version"
+
+    id: int = Field(default=1, primary_key=True)
+    version: int = Field(default=0, nullable=False)
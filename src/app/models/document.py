@@ -2,7 +2,7 @@ from datetime import datetime, timezone
 from typing import Optional, TYPE_CHECKING, List, Literal, Any
 from enum import Enum
 from sqlmodel import SQLModel, Field, Relationship, Column, ForeignKey
-from pgvector.sqlalchemy import Vector
+from pgvector.sqlalchemy import HALFVEC
 
 from app.models.base import TimestampedModel, IDModel
 
@@ -30,8 +30,9 @@ class Document(IDModel, TimestampedModel, table=True):
 class DocumentVector(IDModel, TimestampedModel, table=True):
     __tablename__ = "document_vectors"
 
-    dense_embedding: Any = Field(sa_type=Vector(384))
+    dense_embedding: Any = Field(sa_type=HALFVEC(384))
     content: str = Field(default=None, nullable=False)
+    token_count: Optional[int] = Field(default=None, nullable=True)
     document_id: int = Field(index=True, foreign_key="documents.id", nullable=False, ondelete="CASCADE")
 
     
@@ -20,6 +20,10 @@ class Thread(TimestampedModel, table=True):
     thread_id: int = Field(index=True, primary_key=True, nullable=False)
     thread_title: str = Field(nullable=False, unique=False)
 
+    # Rolling summary of every chat up to summarized_until (a chats.id), the turns after it are kept verbatim
+    summary: Optional[str] = Field(default=None, nullable=True)
+    summarized_until: Optional[int] = Field(default=None, nullable=True)
+
     user: "User" = Relationship(back_populates="threads")
     chats: List["Chat"] = Relationship(back_populates="thread", cascade_delete=True)
 
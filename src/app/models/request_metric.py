@@ -0,0 +1,28 @@
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from sqlmodel import SQLModel, Field, JSON
+
+from app.models.base import IDModel
+
+
+class RequestMetric(IDModel, table=True):
+    """One row per chatbot request: stage timings, LLM tokens and cost, written in batches off the request path."""
+    __tablename__ = "request_metrics"
+
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), index=True, nullable=False)
+
+    # The chatbot's answer, None for channels that don't store chats (WhatsApp)
+    chat_id: Optional[int] = Field(default=None, index=True, foreign_key="chats.id", nullable=True, ondelete="SET NULL")
+    channel: str = Field(nullable=False)
+    # SEARCH, CHAT or OOT, CACHE when answered from the semantic answer cache
+    intent: Optional[str] = Field(default=None, nullable=True)
+
+    total_ms: float = Field(nullable=False)
+    ttft_ms: Optional[float] = Field(default=None, nullable=True)
+    # Stage name (classification, embedding, semantic, lexical, fusion, rerank, answer, ...) -> milliseconds
+    stages: Dict[str, float] = Field(default_factory=dict, sa_type=JSON, nullable=False)
+
+    prompt_tokens: int = Field(default=0, nullable=False)
+    completion_tokens: int = Field(default=0, nullable=False)
+    cost_usd: float = Field(default=0.0, nullable=False)
+    model: Optional[str] = Field(default=None, nullable=True)
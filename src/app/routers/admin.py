@@ -7,7 +7,7 @@ from typing import Optional
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, Cookie, Response, BackgroundTasks, Request, UploadFile, File
 from sqlalchemy.orm import selectinload
-from sqlalchemy import func, text, case
+from sqlalchemy import func, text, case, delete
 from sqlmodel import Session, select
 
 from app.worker import celery_app
@@ -17,8 +17,9 @@ from app.models.document import Document
 from app.models.user import User
 from app.models.role import Role, UserRole
 from app.models.history import Chat
+from app.models.answer_cache import AnswerCache
 
-from app.schemas.admin import FileStatus, DocumentResponse, DeleteDocRequest, CreateUserRequest, DeleteUserRequest, UserRead, UpdateUserRequest, UserResponse, DashboardResponse
+from app.schemas.admin import FileStatus, DocumentResponse, DeleteDocRequest, CreateUserRequest, DeleteUserRequest, UserRead, UpdateUserRequest, UserResponse, DashboardResponse, AnswerCacheResponse, PurgeAnswerCacheRequest, IntentExemplarsResponse, RequestMetricsResponse
 from app.schemas.common import APIResponse
 
 from app.security.permissions import RequireRole
@@ -27,12 +28,51 @@ from app.security.passwords import hash_password
 
 from app.tasks import embed_document
 
+from app.agents.metrics import collect_metrics
+from app.agents.database import bump_corpus_version, get_corpus_version
+from app.agents.router import parse_exemplars
+from app.agents import instansiate_chatbot_resources
+
 super_admin_router = APIRouter(prefix="/v1/superadmin", tags=["Admin"], dependencies=[Depends(RequireRole("superadmin"))])
 admin_router = APIRouter(prefix="/v1/admin", tags=["Admin"], dependencies=[Depends(RequireRole("admin", "superadmin"))])
 
 
 MAX_FILE_SIZE = 5 * 1024 * 1024
 
+# Per day (UTC) totals and p50/p95 of every stage recorded in request_metrics.stages
+REQUEST_METRICS_DAYS = text("""
+    SELECT date_trunc('day', created_at) AS day,
+           count(*) AS requests,
+           percentile_cont(0.5) WITHIN GROUP (ORDER BY total_ms) AS p50_ms,
+           percentile_cont(0.95) WITHIN GROUP (ORDER BY total_ms) AS p95_ms,
+           sum(prompt_tokens) AS prompt_tokens,
+           sum(completion_tokens) AS completion_tokens,
+           sum(cost_usd) AS cost_usd
+    FROM request_metrics
+    WHERE created_at >= :since AND (CAST(:channel AS VARCHAR) IS NULL OR channel = :channel)
+    GROUP BY day
+    ORDER BY day
+""")
+
+REQUEST_METRICS_INTENTS = text("""
+    SELECT date_trunc('day', created_at) AS day, coalesce(intent, 'UNKNOWN') AS intent, count(*) AS requests
+    FROM request_metrics
+    WHERE created_at >= :since AND (CAST(:channel AS VARCHAR) IS NULL OR channel = :channel)
+    GROUP BY day, intent
+""")
+
+REQUEST_METRICS_STAGES = text("""
+    SELECT date_trunc('day', created_at) AS day,
+           stage.key AS stage,
+           count(*) AS count,
+           percentile_cont(0.5) WITHIN GROUP (ORDER BY stage.value::float) AS p50_ms,
+           percentile_cont(0.95) WITHIN GROUP (ORDER BY stage.value::float) AS p95_ms
+    FROM request_metrics, json_each_text(stages) AS stage
+    WHERE created_at >= :since AND (CAST(:channel AS VARCHAR) IS NULL OR channel = :channel)
+    GROUP BY day, stage.key
+    ORDER BY day, stage.key
+""")
+
 @admin_router.post("/insertdoc", response_model=APIResponse[FileStatus], status_code=201)
 def insert_document(
     file: UploadFile = File(), 
@@ -104,6 +144,7 @@ def del_documents(
 
 
     session.delete(documents)
+    bump_corpus_version(session)
     session.commit()
 
     return APIResponse(
@@ -306,4 +347,142 @@ def dashboard(
     return APIResponse(
         status_code=200, 
         message="Data returned successfully", 
-        data=DashboardResponse(user_counts=dict(user_counts._mapping), chat_counts=dict(chat_counts._mapping)))
\ No newline at end of file
+        data=DashboardResponse(user_counts=dict(user_counts._mapping), chat_counts=dict(chat_counts._mapping)))
+
+@admin_router.get("/metrics", response_model=APIResponse[dict])
+def get_metrics() -> APIResponse[dict]:
+    return APIResponse(
+        status_code=200,
+        message="Metrics returned successfully",
+        data=collect_metrics())
+
+
+@admin_router.get("/request-metrics", response_model=APIResponse[RequestMetricsResponse])
+def get_request_metrics(
+    days: int = 7,
+    channel: Optional[str] = None,
+    session: Session = Depends(get_db),
+) -> APIResponse[RequestMetricsResponse]:
+
+    # created_at is stored as naive UTC
+    today = datetime.now(timezone.utc).replace(tzinfo=None, hour=0, minute=0, second=0, microsecond=0)
+    since = today - timedelta(days=max(days, 1) - 1)
+    params = {"since": since, "channel": channel}
+
+    intents = {}
+    for row in session.execute(REQUEST_METRICS_INTENTS, params):
+        intents.setdefault(row.day, {})[row.intent] = row.requests
+
+    stages = {}
+    for row in session.execute(REQUEST_METRICS_STAGES, params):
+        stages.setdefault(row.day, []).append({
+            "stage": row.stage,
+            "count": row.count,
+            "p50_ms": round(row.p50_ms, 2),
+            "p95_ms": round(row.p95_ms, 2),
+        })
+
+    return APIResponse(
+        status_code=200,
+        message="Request metrics returned successfully",
+        data={
+            "days": [
+                {
+                    "day": row.day,
+                    "requests": row.requests,
+                    "p50_ms": round(row.p50_ms, 2),
+                    "p95_ms": round(row.p95_ms, 2),
+                    "prompt_tokens": row.prompt_tokens,
+                    "completion_tokens": row.completion_tokens,
+                    "cost_usd": round(row.cost_usd, 6),
+                    "intents": intents.get(row.day, {}),
+                    "stages": stages.get(row.day, []),
+                }
+                for row in session.execute(REQUEST_METRICS_DAYS, params)
+            ]
+        })
+
+
+@admin_router.get("/answer-cache", response_model=APIResponse[AnswerCacheResponse])
+def get_answer_cache(
+    session: Session = Depends(get_db),
+    offset: int = 0,
+    limit: int = 10,
+) -> APIResponse[AnswerCacheResponse]:
+
+    corpus_version = get_corpus_version(session)
+    entries = session.exec(
+        select(AnswerCache)
+        .order_by(AnswerCache.hit_count.desc(), AnswerCache.id.desc())
+        .offset(offset)
+        .limit(limit)
+    ).all()
+
+    return APIResponse(
+        status_code=200,
+        message="Answer cache returned successfully",
+        data={
+            "current_corpus_version": corpus_version,
+            "answer_cache_items": [
+                {
+                    "id": entry.id,
+                    "question": entry.question,
+                    "answer": entry.answer,
+                    "context": entry.context,
+                    "corpus_version": entry.corpus_version,
+                    "is_stale": entry.corpus_version != corpus_version,
+                    "hit_count": entry.hit_count,
+                    "created_at": entry.created_at,
+                    "last_hit_at": entry.last_hit_at,
+                }
+                for entry in entries
+            ]
+        })
+
+@admin_router.delete("/answer-cache", response_model=APIResponse[dict])
+def purge_answer_cache(
+    payload: PurgeAnswerCacheRequest,
+    session: Session = Depends(get_db),
+) -> APIResponse[dict]:
+
+    statement = delete(AnswerCache)
+    if payload.entry_id is not None:
+        statement = statement.where(AnswerCache.id == payload.entry_id)
+    if payload.stale_only:
+        statement = statement.where(AnswerCache.corpus_version != get_corpus_version(session))
+
+    result = session.exec(statement)
+    session.commit()
+
+    return APIResponse(
+        status_code=200,
+        message="Answer cache purged successfully",
+        data={"deleted": result.rowcount})
+
+
+@admin_router.post("/intent-exemplars", response_model=APIResponse[IntentExemplarsResponse], status_code=201)
+def upload_intent_exemplars(
+    request: Request,
+    file: UploadFile = File(),
+) -> APIResponse[IntentExemplarsResponse]:
+
+    content = file.file.read()
+    if len(content) > MAX_FILE_SIZE:
+        raise HTTPException(status_code=413, detail="Exemplars file exceeds maximum allowed size")
+
+    try:
+        exemplars = parse_exemplars(content.decode("utf-8"), file.filename or "")
+    except (UnicodeDecodeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail={"error_code": "invalid_exemplars", "message": str(e)})
+
+    intent_router = instansiate_chatbot_resources(request.app)["intent_router"]
+    intent_router.save_exemplars(exemplars)
+
+    label_counts = {}
+    for _, label in exemplars:
+        label_counts[label] = label_counts.get(label, 0) + 1
+
+    return APIResponse(
+        status_code=201,
+        message="Intent exemplars uploaded successfully",
+        data={"total": len(exemplars), "label_counts": label_counts})
@@ -1,10 +1,17 @@
 import uuid
+import json
+import math
+import time
+import logging
 from typing import Optional
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, Cookie, Response, BackgroundTasks, Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from sqlmodel import Session, select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.database import get_db
+from app.database import get_db, get_async_db, AsyncSessionLocal
 from app.models.role import Role, UserRole
 from app.models.user import User
 from app.models.history import Thread, Chat
@@ -16,39 +23,42 @@ from app.security.permissions import RequireRole
 from app.security.dependencies import GetUser
 
 from app.agents import instansiate_chatbot_resources
-from app.agents.models import GroqModel, GroqModelStructured, OpenRouterModel
+from app.agents.models import GroqModel, GroqModelStructured, OpenRouterModel, LLMBusyError, get_llm_scheduler
 from app.agents.retriever import BaseRetriever
+from app.agents.metrics import collect_timings, collect_usage, record_request_metrics, register_metrics, LatencyWindow
+from app.agents.memory import ConversationMemory, ConversationHistory
 
 from app.config import get_settings
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(
     prefix="/v1/chatbot",
     tags=["chatbot"],
 )
 
+# Time from request to the first token event of /query/stream
+stream_ttft = LatencyWindow()
+register_metrics("chatbot_stream_ttft", stream_ttft.stats)
+
+conversation_memory = ConversationMemory()
+
 def get_session_id(session_id: Optional[str] = Cookie(None)) -> str:
     if not session_id:
         session_id = str(uuid.uuid4())
     return session_id
 
-@router.post("/query", response_model=APIResponse[ChatbotState])
-def ask_chatbot(
-    payload: ChatbotState,
-    response: Response,
-    background_tasks: BackgroundTasks,
-    request: Request,
-    session_id: str = Depends(get_session_id),
-    session: Session = Depends(get_db),
-    user: User = Depends(GetUser())
-) -> APIResponse[ChatbotState]:
-    
-    response.set_cookie(key="session_id", value=session_id, httponly=True)
+async def start_chat(payload: ChatbotState, session: AsyncSession, user: User) -> Chat:
+    """Open a new thread when the payload has none and return the user's message, unsaved.
 
+    The message is stored together with the answer, so a question that
+    fails (busy LLM, error, disconnect) leaves no unanswered Chat behind.
+    """
     if payload.thread_id is None:
-        max_thread_id = session.exec(
+        max_thread_id = (await session.exec(
             select(func.max(Thread.thread_id))
             .where(Thread.user_id == user.id)
-        ).one()
+        )).one()
 
         next_thread_id = (max_thread_id or 0) + 1
         thread = Thread(
@@ -58,34 +68,80 @@ def ask_chatbot(
         )
 
         session.add(thread)
-        session.commit()
+        await session.commit()
 
         payload.thread_id = next_thread_id
 
-    user_chat = Chat(
+    return Chat(
         role="user",
         message=payload.query,
         thread_id=payload.thread_id,
         user_id=user.id
     )
 
-    session.add(user_chat)
-    session.commit()
+async def load_history(user_id: int, thread_id: Optional[int]) -> Optional[ConversationHistory]:
+    """History of the thread before the new question, None for a new thread.
+
+    Read on a short-lived session of its own, like GetUser: on the request's
+    session the SELECT would leave a transaction open, and its pooled
+    connection held, for the whole graph run.
+    """
+    if thread_id is None:
+        return None
+    async with AsyncSessionLocal() as history_session:
+        return await conversation_memory.load(history_session, user_id, thread_id)
+
+def checkpoint_thread_id(user_id: int, thread_id: int) -> str:
+    # Thread ids are numbered per user, the checkpointer needs them unique across users
+    return f"{user_id}:{thread_id}"
+
+def llm_busy_exception(error: LLMBusyError) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail={"error_code": "llm_busy", "message": "Chatbot is busy, please try again"},
+        headers={"Retry-After": str(math.ceil(error.retry_after))},
+    )
+
+@router.post("/query", response_model=APIResponse[ChatbotState])
+async def ask_chatbot(
+    payload: ChatbotState,
+    response: Response,
+    background_tasks: BackgroundTasks,
+    request: Request,
+    session_id: str = Depends(get_session_id),
+    session: AsyncSession = Depends(get_async_db),
+    user: User = Depends(GetUser())
+) -> APIResponse[ChatbotState]:
+    started_at = time.perf_counter()
+
+    response.set_cookie(key="session_id", value=session_id, httponly=True)
 
+    # Loaded before the new question is stored, so it only holds earlier turns
+    history = await load_history(user.id, payload.thread_id)
+
+    user_chat = await start_chat(payload, session, user)
+
+    # Queued fairly against other users and WhatsApp when the LLM is saturated
+    llm = get_llm_scheduler().for_caller("web", user.id)
     config = {
         "configurable": {
-            "llm": OpenRouterModel(
-                model=get_settings().OPEN_ROUTER_MODEL,
-            ),
-            "session": session,
+            "llm": llm,
+            "history": history,
 
             # ID buat checkpointing
-            "thread_id": str(payload.thread_id)
+            "thread_id": checkpoint_thread_id(user.id, payload.thread_id)
         }
     }
 
+    # ainvoke runs the async node, which keeps the event loop free while waiting on the LLM
     graph = instansiate_chatbot_resources(request.app)["chatbot_graph"]
-    result_state: ChatbotState = graph.invoke(payload, config=config)
+    with collect_timings() as timings, collect_usage() as usage:
+        try:
+            result_state: ChatbotState = await graph.ainvoke(payload, config=config)
+        except LLMBusyError as e:
+            raise llm_busy_exception(e)
+    logger.info("chatbot query timings (ms): %s", {stage: round(ms, 2) for stage, ms in timings.items()})
+
     chatbot_chat = Chat(
         role="chatbot",
         message=result_state["answer"],
@@ -93,12 +149,112 @@ def ask_chatbot(
         user_id=user.id
     )
 
+    # Added in order, so the question keeps the lower id
+    session.add(user_chat)
     session.add(chatbot_chat)
-    session.commit()
+    await session.commit()
+
+    record_request_metrics("web", timings, usage, started_at, result_state, chatbot_chat.id)
+
+    # Summarizing turns that left the recent window doesn't hold up the answer
+    background_tasks.add_task(conversation_memory.update, user.id, payload.thread_id, llm)
 
     return APIResponse(status_code=201, message="Generated response", data=result_state)
 
 
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+@router.post("/query/stream")
+async def ask_chatbot_stream(
+    payload: ChatbotState,
+    request: Request,
+    session_id: str = Depends(get_session_id),
+    session: AsyncSession = Depends(get_async_db),
+    user: User = Depends(GetUser())
+) -> StreamingResponse:
+    """Same as /query, but answers as Server-Sent Events.
+
+    Emits a retrieval event once the context is packed, token events as
+    the LLM produces them and a done event with the final state. The
+    user and chatbot Chat rows are stored when the answer is complete.
+    """
+    started_at = time.perf_counter()
+
+    history = await load_history(user.id, payload.thread_id)
+
+    user_chat = await start_chat(payload, session, user)
+    user_id = user.id
+    graph = instansiate_chatbot_resources(request.app)["chatbot_graph"]
+
+    llm = get_llm_scheduler().for_caller("web", user_id)
+    config = {
+        "configurable": {
+            "llm": llm,
+            "history": history,
+            "stream": True,
+            "thread_id": checkpoint_thread_id(user.id, payload.thread_id)
+        }
+    }
+
+    async def event_stream():
+        # A client disconnect cancels this generator and the graph run with it, nothing is stored then
+        try:
+            with collect_timings() as timings, collect_usage() as usage:
+                ttft_ms = None
+                result_state = {}
+                async for mode, chunk in graph.astream(payload, config=config, stream_mode=["custom", "values"]):
+                    if mode == "values":
+                        result_state = chunk
+                        continue
+
+                    if chunk["event"] == "token" and ttft_ms is None:
+                        ttft_ms = (time.perf_counter() - started_at) * 1000
+                        stream_ttft.record(ttft_ms)
+
+                    yield sse_event(chunk["event"], {key: value for key, value in chunk.items() if key != "event"})
+
+                # The request's session may already be closed once the response is streaming
+                async with AsyncSessionLocal() as stream_session:
+                    chatbot_chat = Chat(
+                        role="chatbot",
+                        message=result_state["answer"],
+                        thread_id=payload.thread_id,
+                        user_id=user_id
+                    )
+                    stream_session.add(user_chat)
+                    stream_session.add(chatbot_chat)
+                    await stream_session.commit()
+
+            record_request_metrics("web_stream", timings, usage, started_at, result_state, chatbot_chat.id, ttft_ms)
+            total_ms = (time.perf_counter() - started_at) * 1000
+            logger.info("chatbot stream ttft %.2f ms, total %.2f ms, timings (ms): %s",
+                        ttft_ms or 0.0, total_ms, {stage: round(ms, 2) for stage, ms in timings.items()})
+
+            yield sse_event("done", {
+                "thread_id": payload.thread_id,
+                "answer": result_state["answer"],
+                "context": result_state.get("context", []),
+                "ttft_ms": round(ttft_ms, 2) if ttft_ms is not None else None,
+                "total_ms": round(total_ms, 2),
+            })
+        except LLMBusyError as e:
+            logger.warning("chatbot stream rejected, LLM busy: %s", e)
+            yield sse_event("error", {"message": "Chatbot is busy, please try again", "retry_after": math.ceil(e.retry_after)})
+        except Exception:
+            logger.exception("chatbot stream failed")
+            yield sse_event("error", {"message": "Failed to generate response"})
+
+    streaming_response = StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(conversation_memory.update, user_id, payload.thread_id, llm),
+    )
+    streaming_response.set_cookie(key="session_id", value=session_id, httponly=True)
+    return streaming_response
+
+
 @router.get("/threads", response_model=APIResponse[ThreadResponse])
 def get_threads(
     response: Response,
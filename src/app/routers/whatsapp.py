@@ -1,5 +1,7 @@
 import uuid
 import os
+import time
+import logging
 import requests
 from datetime import datetime, timezone
 
@@ -7,6 +9,7 @@ from pathlib import Path
 from typing import Optional
 from datetime import datetime
 from fastapi import APIRouter, HTTPException, BackgroundTasks, Request, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import selectinload
 from sqlmodel import Session, select
 
@@ -14,12 +17,17 @@ from app.schemas.common import APIResponse
 from app.schemas.chatbot import ChatbotState
 
 from app.agents import instansiate_chatbot_resources
-from app.agents.models import OpenRouterModel
+from app.agents.models import LLMBusyError, get_llm_scheduler
+from app.agents.metrics import collect_timings, collect_usage, record_request_metrics
 
 from app.config import get_settings
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/v1/whatsapp", tags=["Whatsapp"])
 
+BUSY_ANSWER = "Mohon maaf, Kasbi sedang melayani banyak pertanyaan. Silakan kirim ulang pertanyaan Anda beberapa saat lagi. 🙏"
+
 settings = get_settings()
 
 def send_whatsapp_message(to: str, body: str):
@@ -55,56 +63,57 @@ async def whatsapp_webhook(request: Request, background_tasks: BackgroundTasks):
         message="Message received")
 
 async def process_whatsapp_message(data: dict, request: Request):
-    
-    from app.database import engine
-    from sqlmodel import Session
 
-    with Session(engine) as session:
-
-        entry = data.get("entry", [{}])[0]
-        changes = entry.get("changes", [{}])[0]
-        value = changes.get("value", {})
+    entry = data.get("entry", [{}])[0]
+    changes = entry.get("changes", [{}])[0]
+    value = changes.get("value", {})
     
-        if "messages" not in value:
-            return
-
-        messages = value["messages"]
-        if not messages:
-            return
-        # Extract user message
-        message = messages[0]
-        from_number = message["from"]
-
-        if "text" in message.keys():
-            user_text = message["text"]["body"]
-
-            payload = ChatbotState(
-                query=user_text
-            )
-
-            config = {
-                "configurable": {
-                    "llm": OpenRouterModel(
-                        model=get_settings().OPEN_ROUTER_MODEL,
-                    ),
-                    "session": session,
-
-                    # ID buat checkpointing
-                    "thread_id": None
-                }
+    if "messages" not in value:
+        return
+
+    messages = value["messages"]
+    if not messages:
+        return
+    # Extract user message
+    message = messages[0]
+    from_number = message["from"]
+
+    if "text" in message.keys():
+        started_at = time.perf_counter()
+        user_text = message["text"]["body"]
+
+        payload = ChatbotState(
+            query=user_text
+        )
+
+        config = {
+            "configurable": {
+                "llm": get_llm_scheduler().for_caller("whatsapp", from_number),
+
+                # ID buat checkpointing, satu thread per nomor WhatsApp
+                "thread_id": f"whatsapp:{from_number}"
             }
+        }
+
+        graph = instansiate_chatbot_resources(request.app)["chatbot_graph"]
+        try:
+            with collect_timings() as timings, collect_usage() as usage:
+                result_state: ChatbotState = await graph.ainvoke(payload, config=config)
+        except LLMBusyError as e:
+            logger.warning("whatsapp message from %s rejected, LLM busy: %s", from_number, e)
+            await run_in_threadpool(send_whatsapp_message, to=from_number, body=BUSY_ANSWER)
+            return
+        logger.info("whatsapp query timings (ms): %s", {stage: round(ms, 2) for stage, ms in timings.items()})
+        record_request_metrics("whatsapp", timings, usage, started_at, result_state)
 
-            graph = instansiate_chatbot_resources(request.app)["chatbot_graph"]
-            result_state: ChatbotState = graph.invoke(payload, config=config)
-
-            send_whatsapp_message(to=from_number, body=result_state["answer"])
-        else:
-            intro_template = """
+        await run_in_threadpool(send_whatsapp_message, to=from_number, body=result_state["answer"])
+    else:
+        intro_template = """
                 Halo! Selamat datang di layanan informasi Balai Penjaminan Mutu Pendidikan (BPMP) Provinsi Papua. Saya Kasbi, Kawan Setia Berbagi Informasi, siap membantu Anda. 
                 
                 Apa yang bisa saya bantu hari ini? Apakah Anda ingin mengetahui informasi tentang program BPMP Papua, Dapodik, kurikulum, asesmen nasional, atau layanan ULT kami? Silakan sampaikan pertanyaan Anda! 😊
             """
-            send_whatsapp_message(to=from_number, body=intro_template)
+        await run_in_threadpool(send_whatsapp_message, to=from_number, body=intro_template)
 
 
 @router.get("/webhook")
@@ -59,4 +59,47 @@ class UserRead(UserBase):
 
 class DashboardResponse(BaseModel):
     user_counts: Dict
-    chat_counts: Dict
\ No newline at end of file
+    chat_counts: Dict
+
+class AnswerCacheItem(BaseModel):
+    id: int
+    question: str
+    answer: str
+    context: List[str]
+    corpus_version: int
+    is_stale: bool
+    hit_count: int
+    created_at: datetime
+    last_hit_at: Optional[datetime] = None
+
+class AnswerCacheResponse(BaseModel):
+    current_corpus_version: int
+    answer_cache_items: List[AnswerCacheItem]
+
+class PurgeAnswerCacheRequest(BaseModel):
+    entry_id: Optional[int] = None
+    stale_only: bool = False
+
+class IntentExemplarsResponse(BaseModel):
+    total: int
+    label_counts: Dict[str, int]
+
+class StageLatency(BaseModel):
+    stage: str
+    count: int
+    p50_ms: float
+    p95_ms: float
+
+class RequestMetricsDay(BaseModel):
+    day: datetime
+    requests: int
+    p50_ms: float
+    p95_ms: float
+    prompt_tokens: int
+    completion_tokens: int
+    cost_usd: float
+    intents: Dict[str, int]
+    stages: List[StageLatency]
+
+class RequestMetricsResponse(BaseModel):
+    days: List[RequestMetricsDay]
@@ -11,6 +11,7 @@ class ChatbotState(BaseModel):
     )
     answer: Optional[str] = Field(None, description="Chatbot's answer to the query")
     thread_id: Optional[int] = Field(None, description="Thread id to continue from specific thread")
+    intent: Optional[str] = Field(None, description="SEARCH, CHAT or OOT, CACHE when answered from the semantic answer cache")
 
 class ThreadItem(BaseModel):
     thread_id: int
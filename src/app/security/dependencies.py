@@ -1,9 +1,10 @@
-from fastapi import Depends, HTTPException, Security
+from fastapi import HTTPException, Security
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.orm import selectinload
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.database import get_db
+from app.database import AsyncSessionLocal
 from app.models.user import User
 from app.security.jwt import TokenType, decode_token, JWTRequest
 
@@ -15,18 +16,21 @@ class GetUser():
     ):
         pass
 
-    def __call__(
+    async def __call__(
             self,
             credentials: HTTPAuthorizationCredentials | None = Security(bearer_scheme),
-            session: Session = Depends(get_db)
     ) -> User:
         
-        self.session = session
-        return self.get_current_user(credentials)
+        # A short-lived session of its own. The request's session would keep its pooled connection in an open
+        # transaction until the response is finished, for /query that is the whole LLM round trip.
+        # Roles are loaded eagerly, so the returned User is usable after the session closes.
+        async with AsyncSessionLocal() as session:
+            return await self.get_current_user(credentials, session)
 
-    def get_current_user(
+    async def get_current_user(
             self,
             credentials: HTTPAuthorizationCredentials,
+            session: AsyncSession,
     ) -> User:
         if credentials is None:
             raise HTTPException(status_code=401, detail={"error_code": "auth_required", "message": "Authorization header missing"})
@@ -34,7 +38,7 @@ class GetUser():
         payload = self.check_token(credentials)
         token_version = payload.get("token_version")
         user_id = payload.get("sub")
-        user = self.check_user(user_id)
+        user = await self.check_user(user_id, session)
 
         if user.token_version != token_version:
             raise HTTPException(status_code=401, detail={"error_code": "token_revoked", "message": "Token revoked"})
@@ -54,16 +58,17 @@ class GetUser():
         return payload
     
 
-    def check_user(
+    async def check_user(
             self,
             user_id: int,
+            session: AsyncSession,
     ) -> User:
         if user_id is None:
             raise HTTPException(status_code=401, detail={"error_code": "invalid_token", "message": "Missing user id"})
         
-        user = self.session.exec(
+        user = (await session.exec(
             select(User).options(selectinload(User.roles)).where(User.id == int(user_id))
-        ).one_or_none()
+        )).one_or_none()
 
         if not user or not user.is_active:
             raise HTTPException(status_code=401, detail={"error_code": "user_not_active", "message": "Missing or inactive user"})
@@ -5,6 +5,7 @@ from app.database import SessionLocal
 from app.models.document import Document
 from app.agents import instansiate_vector_db
 from celery import Task
+from sqlmodel import select
 from celery.exceptions import WorkerLostError
 
 
@@ -16,17 +17,24 @@ class EmbedDocumentTask(Task):
     def on_success(self, retval, task_id, args, kwargs):
         pass  # status is set inside the task itself
 
-    def _mark_failed(self, document_id):
+    def _mark_failed(self, *document_ids):
         session = SessionLocal()
         try:
-            document = session.get(Document, document_id)
-            if document:
-                document.status = "failed"
-                session.commit()
+            for document_id in document_ids:
+                document = session.get(Document, document_id)
+                if document and document.status == "pending":
+                    document.status = "failed"
+            session.commit()
         finally:
             session.close()
 
 
+class BulkEmbedDocumentsTask(EmbedDocumentTask):
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        document_ids = args[0] if args else kwargs["document_ids"]
+        self._mark_failed(*document_ids)
+
+
 @celery_app.task(
     base=EmbedDocumentTask,
     name="embed_document",
@@ -44,7 +52,40 @@ def embed_document(document_id, file_path):
         if document is None:
             return
 
-        document.status = "done"
+        # insert_documents already marked it done or failed, only a document without chunks is left pending
+        if document.status == "pending":
+            document.status = "done"
+        session.commit()
+    finally:
+        session.close()
+
+
+@celery_app.task(
+    base=BulkEmbedDocumentsTask,
+    name="bulk_embed_documents",
+    acks_late=True,
+    reject_on_worker_lost=False,
+)
+def bulk_embed_documents(document_ids, file_paths, defer_indexes=False):
+    """Background task to load many documents at once with COPY.
+
+    Runs next to live traffic, so the indexes stay in place unless the
+    caller asks for defer_indexes, which locks document_vectors for the
+    whole task and is meant for a maintenance window only.
+    """
+    session = SessionLocal()
+    try:
+        vector_db = instansiate_vector_db()
+        vector_db.insert_documents(
+            session,
+            [Path(file_path) for file_path in file_paths],
+            document_ids=document_ids,
+            defer_indexes=defer_indexes,
+        )
+
+        for document in session.exec(select(Document).where(Document.id.in_(document_ids))).all():
+            if document.status == "pending":
+                document.status = "done"
         session.commit()
     finally:
         session.close()
\ No newline at end of file
@@ -0,0 +1,63 @@
+import asyncio
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from app.agents.graph import GraphBuilder
+from app.agents.models import LLMBusyError
+from app.agents.retriever import SpeculativeRetriever
+from app.agents.retriever.speculative import check_cancelled
+from app.schemas.chatbot import ChatbotState
+
+
+class SlowRetriever():
+    """Checks for cancellation between stages for a few seconds, like retrieve_chunks does."""
+
+    def embed_query(self, message):
+        return [1.0, 0.0]
+
+    def retrieve_chunks(self, session, query):
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            check_cancelled()
+            time.sleep(0.01)
+        return ["chunk"]
+
+
+class BusyIntentRouter():
+    def predict_local(self, embedding):
+        return None
+
+    async def apredict_llm(self, message, llm):
+        raise LLMBusyError("LLM queue is full", 1.0)
+
+
+class SimpleNodeSpeculationTest(unittest.TestCase):
+    def setUp(self):
+        retriever = SlowRetriever()
+        self.builder = GraphBuilder.__new__(GraphBuilder)
+        self.builder.retriever = retriever
+        self.builder.answer_cache = None
+        self.builder.intent_router = BusyIntentRouter()
+        self.builder.speculative_retriever = SpeculativeRetriever(retriever, max_workers=1)
+        self.builder.blocking_executor = ThreadPoolExecutor(max_workers=1)
+
+    def tearDown(self):
+        self.builder.blocking_executor.shutdown(wait=True)
+
+    def test_llm_router_error_cancels_speculation(self):
+        config = {"configurable": {"llm": object()}}
+        with mock.patch("app.agents.graph.get_stream_writer", return_value=lambda event: None):
+            with self.assertRaises(LLMBusyError):
+                asyncio.run(self.builder.simple_node(ChatbotState(query="Apa syarat sertifikasi guru?"), config))
+
+        speculative = self.builder.speculative_retriever
+        speculative.executor.shutdown(wait=True)
+        self.assertEqual(speculative.counts["started"], 1)
+        self.assertEqual(speculative.counts["cancelled_early"] + speculative.counts["not_started"], 1)
+        self.assertEqual(speculative.counts["used"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
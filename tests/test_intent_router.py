@@ -0,0 +1,35 @@
+import json
+import unittest
+
+from app.agents.router.router import parse_exemplars
+
+
+def jsonl(*rows) -> str:
+    return "".join(json.dumps(row) + "\n" for row in rows)
+
+
+class ParseExemplarsTest(unittest.TestCase):
+    def test_jsonl(self):
+        content = jsonl(
+            {"text": "Apa itu kurikulum merdeka?", "label": "search"},
+            {"text": "Hai", "label": "CHAT"},
+            {"text": "Resep rendang?", "label": "OOT"},
+        )
+        self.assertEqual(
+            parse_exemplars(content, "exemplars.jsonl"),
+            [("Apa itu kurikulum merdeka?", "SEARCH"), ("Hai", "CHAT"), ("Resep rendang?", "OOT")],
+        )
+
+    def test_line_that_is_not_an_object(self):
+        for line in ('"foo"', "[1, 2]", "3", "null"):
+            content = jsonl({"text": "Hai", "label": "CHAT"}) + line + "\n"
+            with self.subTest(line=line), self.assertRaisesRegex(ValueError, "Line 2 is not a JSON object"):
+                parse_exemplars(content, "exemplars.jsonl")
+
+    def test_invalid_json(self):
+        with self.assertRaisesRegex(ValueError, "Line 1 is not valid JSON"):
+            parse_exemplars("{not json\n", "exemplars.jsonl")
+
+
+if __name__ == "__main__":
+    unittest.main()